@@ -0,0 +1,99 @@
+# bench/bench_parser.py
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import main
+from bench.common import benchmark, rate
+from parsing import MONTH_MAP, WEEKDAY_MAP, parse_date_flexible, parse_reminder, scan
+
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), "parser_golden.json")
+# fixed "now" the golden answers were computed against (a Wednesday)
+GOLDEN_NOW = (2025, 1, 15, 10, 0)
+
+
+def corpus(n, rng):
+    """`n` reminder texts in the shapes users actually type."""
+    months = list(MONTH_MAP)
+    days = list(WEEKDAY_MAP)
+    shapes = (
+        lambda: f"{rng.randint(0, 23):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+        lambda: f"{rng.randint(1, 28)} {rng.choice(months)} {rng.randint(0, 23)}:{rng.randrange(60):02d}",
+        lambda: f"{rng.choice(months)} {rng.randint(1, 28)} {rng.randint(0, 23)}.{rng.randrange(60):02d}",
+        lambda: f"{rng.randint(0, 23)}:00 {rng.randint(1, 28)}/{rng.randint(1, 12)}",
+        lambda: f"{rng.choice(days)} {rng.randint(0, 23):02d}:30",
+        lambda: f"{rng.choice(days)},{rng.choice(days)} 08:00",
+        lambda: f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/2027 07:45",
+        lambda: f"setiap {rng.choice(('hari', '2 hari'))} {rng.randint(0, 23):02d}:00",
+        lambda: f"tiap {rng.randint(1, 6)} jam",
+        lambda: f"tanggal {rng.randint(1, 31)} {rng.randint(0, 23):02d}:15",
+        lambda: f"{rng.choice(days)} {rng.choice(('pertama', 'terakhir'))} 09:00",
+    )
+    words = ("minum air", "meeting tim", "ulang tahun 17", "kelas 10:00 di lab", "bayar tagihan", "")
+    return [f"{rng.choice(shapes)()} {rng.choice(words)}".strip() for _ in range(n)]
+
+
+@benchmark("parser")
+async def bench_parser(opts):
+    """parse_reminder / parse_date_flexible throughput, cold (unique texts) and warm (cached scan)."""
+    rng = random.Random(opts.seed)
+    texts = corpus(opts.parses, rng)
+    now = datetime.now(main.TZ)
+
+    scan.cache_clear()
+    t0 = time.perf_counter()
+    for text in texts:
+        parse_reminder(text, main.TZ, now)
+    cold = time.perf_counter() - t0
+
+    hot = texts[:200]
+    t0 = time.perf_counter()
+    for i in range(len(texts)):
+        parse_reminder(hot[i % len(hot)], main.TZ, now)
+    warm = time.perf_counter() - t0
+
+    scan.cache_clear()
+    t0 = time.perf_counter()
+    for text in texts:
+        parse_date_flexible(text, main.TZ, now)
+    flexible = time.perf_counter() - t0
+    return {
+        "texts": len(texts),
+        "cold_per_s": rate(len(texts), cold),
+        "warm_per_s": rate(len(texts), warm),
+        "parse_date_flexible_per_s": rate(len(texts), flexible),
+    }
+
+
+def encode(parsed, message):
+    """parse_reminder's result in the JSON shape stored in parser_golden.json."""
+    if parsed is None:
+        return None
+    if parsed[0] == "one_time":
+        return ["one_time", parsed[1].isoformat(), message]
+    if parsed[0] == "recurring":
+        return ["recurring", list(parsed[1]), message]
+    _, wds, h, m = parsed
+    return ["weekly", sorted(wds), h, m, message]
+
+
+def golden_now():
+    return main.TZ.localize(datetime(*GOLDEN_NOW))
+
+
+@benchmark("parser_golden")
+async def bench_parser_golden(opts):
+    """Time parsing every text in parser_golden.json (answers are checked by tests/test_parser_golden.py)."""
+    with open(GOLDEN_FILE, encoding="utf-8") as f:
+        texts = [case["text"] for case in json.load(f)]
+    now = golden_now()
+    rounds = max(1, opts.parses // len(texts))
+    scan.cache_clear()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            parse_reminder(text, main.TZ, now)
+    elapsed = time.perf_counter() - t0
+    return {"cases": len(texts), "parses": rounds * len(texts), "per_s": rate(rounds * len(texts), elapsed)}
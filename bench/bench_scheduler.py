@@ -0,0 +1,165 @@
+# bench/bench_scheduler.py
+import asyncio
+import collections
+import random
+import time
+
+import main
+from bench.common import Clock, benchmark, fresh_db, rate, stats_ms
+from bench.stubs import FakeChannel, FakeGateway
+from bench.workload import Workload, seed
+from dispatch import Delivery, Dispatcher
+from scheduler import ReminderScheduler
+
+
+@benchmark("tick")
+async def bench_tick(opts):
+    """
+    One incremental scheduler window refill over `size` rows, then the
+    busiest due cluster of the next day: pop_due + fire_due (fetch, claim,
+    submit).
+    Nothing is sent; the dispatcher is not started.
+    """
+    with FakeGateway().install(main.bot):
+        async with fresh_db() as storage:
+            now = time.time()
+            wl = Workload(opts.size, now, opts.seed)
+            await seed(storage, wl.rows())
+            busiest = await storage.fetchone(
+                "SELECT next_fire_utc, COUNT(*) FROM reminders WHERE next_fire_utc <= ? GROUP BY next_fire_utc ORDER BY 2 DESC LIMIT 1",
+                (int(now) + 86400,))
+            fire_at, cluster = busiest
+            clock = Clock(fire_at - 60)
+            main.scheduler = ReminderScheduler(main.fire_due, loader=main.fetch_schedule_window, clock=clock)
+            # steady state: the window already covers everything before the last minute
+            main.scheduler.loaded_until = int(clock.now) - 60
+
+            t0 = time.perf_counter()
+            await main.scheduler.refill()
+            refill = time.perf_counter() - t0
+
+            clock.now = fire_at
+            t0 = time.perf_counter()
+            due = main.scheduler.pop_due(clock.now)
+            pop = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            await main.fire_due(due)
+            fire = time.perf_counter() - t0
+            queued = main.dispatcher.pending
+            window = len(main.scheduler) + len(due)
+    return {
+        "rows": opts.size,
+        "window_rows": window,
+        "refill_ms": round(refill * 1000, 3),
+        "due": len(due),
+        "cluster": cluster,
+        "pop_due_ms": round(pop * 1000, 3),
+        "fire_due_ms": round(fire * 1000, 3),
+        "tick_ms": round((pop + fire) * 1000, 3),
+        "queued": queued,
+    }
+
+
+@benchmark("dispatch")
+async def bench_dispatch(opts):
+    """
+    Due-to-sent lag through the Dispatcher: `deliveries` due at once over
+    `channels` stub channels with `send_latency` and a share of 429s.
+    """
+    rng = random.Random(opts.seed)
+    channels = [FakeChannel(i, latency=opts.send_latency, rate_limit_p=opts.rate_limit_p, rng=rng)
+                for i in range(opts.channels)]
+    acked = []
+
+    async def on_complete(batch):
+        acked.extend(batch)
+
+    dispatcher = Dispatcher(on_complete)
+    dispatcher.start()
+    now = time.time()
+    for i in range(opts.deliveries):
+        dispatcher.submit(Delivery(channels[i % len(channels)], f"⏰ {i}", [(i, now, None)]))
+    await dispatcher.join()
+    elapsed = time.time() - now
+    await dispatcher.close()
+    status = collections.Counter(d.status for d in acked)
+    return {
+        "deliveries": opts.deliveries,
+        "channels": opts.channels,
+        "send_latency_ms": opts.send_latency * 1000,
+        "rate_limit_p": opts.rate_limit_p,
+        "rate_limited": sum(ch.rate_limited for ch in channels),
+        "status": dict(status),
+        "lag": stats_ms([d.lag for d in acked if d.status == "sent"]),
+        "sent_per_s": rate(status["sent"], elapsed),
+    }
+
+
+@benchmark("fair_share")
+async def bench_fair_share(opts):
+    """
+    One guild's burst (`deliveries` over `channels`) submitted just before
+    one message each from 50 small guilds: lag of the small guilds, with
+    guild round-robin and with every delivery in one group (guild_id None).
+    """
+    out = {"burst": opts.deliveries, "burst_channels": opts.channels, "small_guilds": 50}
+    for label, grouped in (("fifo", False), ("fair_share", True)):
+        rng = random.Random(opts.seed)
+        burst = [FakeChannel(i, latency=opts.send_latency, rng=rng) for i in range(opts.channels)]
+        small = [FakeChannel(10**6 + i, latency=opts.send_latency, rng=rng) for i in range(50)]
+        acked = []
+
+        async def on_complete(batch):
+            acked.extend(batch)
+
+        dispatcher = Dispatcher(on_complete)
+        dispatcher.start()
+        now = time.time()
+        for i in range(opts.deliveries):
+            dispatcher.submit(Delivery(burst[i % len(burst)], f"⏰ {i}", [(i, now, None)], guild_id=1 if grouped else None))
+        for i, ch in enumerate(small):
+            dispatcher.submit(Delivery(ch, "⏰ kecil", [(-i, now, None)], guild_id=100 + i if grouped else None))
+        await dispatcher.join()
+        await dispatcher.close()
+        out[label] = {
+            "small_guild_lag": stats_ms([d.lag for d in acked if d.channel_id >= 10**6]),
+            "burst_lag": stats_ms([d.lag for d in acked if d.channel_id < 10**6]),
+        }
+    return out
+
+
+@benchmark("fire_to_send")
+async def bench_fire_to_send(opts):
+    """Scheduler -> fire_due -> dispatcher -> stub send, end to end, for one due cluster."""
+    gateway = FakeGateway(latency=opts.send_latency)
+    acked = []
+
+    async def on_complete(batch):
+        acked.extend(batch)
+        await main.ack_deliveries(batch)
+
+    with gateway.install(main.bot):
+        async with fresh_db() as storage:
+            now = int(time.time())
+            rows = Workload(opts.cluster, now, opts.seed).rows()
+            # everything due one second from now, like a popular round hour
+            await seed(storage, (r[:9] + (now + 1,) + r[10:] for r in rows))
+            main.dispatcher = Dispatcher(on_complete)
+            main.dispatcher.start()
+            main.scheduler.start()
+            try:
+                while len(acked) < opts.cluster:
+                    await asyncio.sleep(0.05)
+                    if time.time() - now > opts.timeout:
+                        break
+            finally:
+                main.scheduler.stop()
+                await main.dispatcher.close()
+            left = await storage.fetchone("SELECT COUNT(*) FROM reminders WHERE repeat = 0")
+    sent = [d for d in acked if d.status == "sent"]
+    return {
+        "reminders": opts.cluster,
+        "sent": gateway.sent,
+        "one_time_rows_left": left[0],
+        "lag": stats_ms([d.lag for d in sent]),
+    }
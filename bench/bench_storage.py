@@ -0,0 +1,221 @@
+# bench/bench_storage.py
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+import main
+from bench.common import benchmark, fresh_db, rate, stats_ms
+from bench.stubs import fake_ctx, fake_interaction
+from bench.workload import Workload, seed
+
+
+@benchmark("storage_pool")
+async def bench_storage_pool(opts):
+    """Point lookups through the pooled Storage vs a fresh aiosqlite connection per call."""
+    queries = opts.queries
+    async with fresh_db() as storage:
+        rows = await seed(storage, Workload(opts.size, time.time(), opts.seed).rows())
+        rng = random.Random(opts.seed)
+        ids = [rng.randint(1, rows) for _ in range(queries)]
+        sql = "SELECT id, guild_id, channel_id, user_id, message FROM reminders WHERE id = ?"
+
+        start = time.perf_counter()
+        for rid in ids:
+            await storage.fetchone(sql, (rid,))
+        pooled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for rid in ids:
+            async with aiosqlite.connect(storage.path) as db:
+                async with db.execute(sql, (rid,)) as cur:
+                    await cur.fetchone()
+        per_call = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(storage.fetchone(sql, (rid,)) for rid in ids))
+        pooled_concurrent = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "queries": queries,
+        "pooled_per_s": rate(queries, pooled),
+        "pooled_concurrent_per_s": rate(queries, pooled_concurrent),
+        "connect_per_call_per_s": rate(queries, per_call),
+        "speedup": round(per_call / pooled, 2),
+    }
+
+
+@benchmark("insert")
+async def bench_insert(opts):
+    """add_one_time / add_weekly throughput, one at a time and as a concurrent burst."""
+    n = opts.inserts
+    tz = main.TZ
+    when = (datetime.now(tz) + timedelta(days=1)).replace(second=0, microsecond=0).isoformat()
+    results = {"inserts": n}
+    async with fresh_db():
+        start = time.perf_counter()
+        for i in range(n):
+            await main.add_one_time(1, 2, 3, f"pesan {i}", when)
+        results["one_time_per_s"] = rate(n, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(n):
+            await main.add_weekly(1, 2, 3, f"pesan {i}", 8, 30, 0x1F)
+        results["weekly_per_s"] = rate(n, time.perf_counter() - start)
+
+        latencies = []
+
+        async def one(i):
+            t0 = time.perf_counter()
+            await main.add_one_time(1, 2, 3, f"burst {i}", when)
+            latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n)))
+        results["burst_per_s"] = rate(n, time.perf_counter() - start)
+        results["burst_latency"] = stats_ms(latencies)
+    return results
+
+
+@benchmark("cmd_list")
+async def bench_cmd_list(opts):
+    """First-page latency of rem!list by guild size, on top of `size` background rows."""
+    sizes = [s for s in (10, 100, 1000, 10000, 100000) if s <= max(opts.size, 10)]
+    out = {"background_rows": opts.size, "guilds": {}}
+    async with fresh_db() as storage:
+        wl = Workload(opts.size, time.time(), opts.seed)
+        await seed(storage, wl.rows())
+        for size in sizes:
+            guild_id = 10**17 + size
+            rows = (
+                (guild_id, 5 + i % 4, 7 + i % 50) + wl.row()[3:]
+                for i in range(size)
+            )
+            await seed(storage, rows)
+            timings = {}
+            for label, args in (("all", ()), ("mine", ("mine",)), ("weekly", ("weekly",))):
+                samples = []
+                for _ in range(opts.repeat):
+                    ctx = fake_ctx(main.bot, guild_id, 5, 7)
+                    t0 = time.perf_counter()
+                    await main.cmd_list(ctx, *args)
+                    samples.append(time.perf_counter() - t0)
+                timings[label] = stats_ms(samples)
+            out["guilds"][str(size)] = timings
+    return out
+
+
+@benchmark("group_commit")
+async def bench_group_commit(opts):
+    """
+    A burst of concurrent rem!rem / rem!edit / rem!hapus commands, with
+    group commit and with one transaction per write (group_max=1, no window).
+    """
+    n = opts.inserts
+    out = {"commands": n * 3}
+    for label, window, group_max in (("per_write", 0, 1), ("group", None, None)):
+        async with fresh_db() as storage:
+            if group_max is not None:
+                storage.group_window, storage.group_max = window, group_max
+            latencies = []
+
+            async def timed(coro):
+                t0 = time.perf_counter()
+                await coro
+                latencies.append(time.perf_counter() - t0)
+
+            def ctx():
+                return fake_ctx(main.bot, 1, 2, 3)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(timed(main.cmd_rem(ctx(), rest=f"senin 08:{i % 60:02d} pesan {i}")) for i in range(n)))
+            await asyncio.gather(*(timed(main.cmd_edit(ctx(), i + 1, rest=f"09:{i % 60:02d} ubah {i}")) for i in range(n)))
+            await asyncio.gather(*(timed(main.cmd_delete(ctx(), i + 1)) for i in range(n)))
+            elapsed = time.perf_counter() - start
+            (left,) = await storage.fetchone("SELECT COUNT(*) FROM reminders")
+            out[label] = {"commands_per_s": rate(n * 3, elapsed), "latency": stats_ms(latencies), "rows_left": left}
+    out["speedup"] = round(out["group"]["commands_per_s"] / out["per_write"]["commands_per_s"], 2)
+    return out
+
+
+@benchmark("autocomplete")
+async def bench_autocomplete(opts):
+    """
+    /edit `id` autocomplete for one user with many reminders: the first
+    keystroke (loads the index), later ones (memory only), and the indexed
+    query a DB-backed answer would run per keystroke instead.
+    """
+    sizes = [s for s in (10, 100, 1000, 10000) if s <= max(opts.size, 10)]
+    out = {"background_rows": opts.size, "users": {}}
+    async with fresh_db() as storage:
+        wl = Workload(opts.size, time.time(), opts.seed)
+        await seed(storage, wl.rows())
+        for size in sizes:
+            guild_id, user_id = 10**17 + size, 5
+            await seed(storage, ((guild_id, 7, user_id) + wl.row()[3:] for _ in range(size)))
+            typed = [str(i % 10) for i in range(opts.repeat * 10)]
+
+            t0 = time.perf_counter()
+            await main.reminder_id_autocomplete(fake_interaction(main.bot, guild_id, 7, user_id), "")
+            cold = time.perf_counter() - t0
+
+            warm = []
+            for current in typed:
+                t0 = time.perf_counter()
+                await main.reminder_id_autocomplete(fake_interaction(main.bot, guild_id, 7, user_id), current)
+                warm.append(time.perf_counter() - t0)
+
+            db = []
+            for current in typed:
+                t0 = time.perf_counter()
+                await storage.fetchall(
+                    "SELECT id, message FROM reminders WHERE guild_id = ? AND user_id = ? AND (CAST(id AS TEXT) LIKE ? OR message LIKE ?) ORDER BY next_fire_utc LIMIT 25",
+                    (guild_id, user_id, f"{current}%", f"%{current}%"))
+                db.append(time.perf_counter() - t0)
+            out["users"][str(size)] = {"cold_ms": round(cold * 1000, 3), "warm": stats_ms(warm), "db_query": stats_ms(db)}
+            main.reminder_index.forget(guild_id, user_id)
+    return out
+
+
+@benchmark("search")
+async def bench_search(opts):
+    """
+    rem!cari in the largest guild on top of `size` rows: the FTS5 queries
+    behind it (total + first page) against the LIKE scan over the guild's
+    rows they replace, for a rare word, common words and a phrase.
+    """
+    needle = "kondangan"
+    out = {"background_rows": opts.size, "cases": {}}
+    async with fresh_db() as storage:
+        wl = Workload(opts.size, time.time(), opts.seed)
+        t0 = time.perf_counter()
+        await seed(storage, wl.rows())
+        out["seed_s"] = round(time.perf_counter() - t0, 2)
+        guild_id = wl.guild_ids[0]
+        await seed(storage, ((guild_id, 7, 5) + wl.row()[3:] for _ in range(100)))
+        await storage.execute("UPDATE reminders SET message = message || ' ' || ? WHERE id IN (SELECT id FROM reminders WHERE guild_id = ? ORDER BY id DESC LIMIT 100)",
+                              (needle, guild_id))
+        (out["guild_rows"],) = await storage.fetchone("SELECT COUNT(*) FROM reminders WHERE guild_id = ?", (guild_id,))
+        cases = (("rare", needle, {}), ("common", "meeting", {}), ("two_words", "bayar tagihan", {}),
+                 ("phrase", '"ulang tahun"', {}), ("common_weekly", "meeting", {"repeat": 1}))
+        for label, text, filters in cases:
+            query = main.fts_query(text)
+            words = [w.strip('"') for w in text.split()] if '"' not in text else [text.strip('"')]
+            where, params = main._guild_filter(guild_id, **filters)
+            like = " AND ".join(["message LIKE ?"] * len(words))
+            fts, scan = [], []
+            for _ in range(opts.repeat):
+                t0 = time.perf_counter()
+                total, _ = await main.search_guild_reminders(guild_id, query, 0, main.LIST_PAGE_SIZE + 1, **filters)
+                fts.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                scanned = await storage.fetchall(
+                    f"SELECT id, message, COUNT(*) OVER () FROM reminders WHERE {where} AND {like} ORDER BY id LIMIT ?",
+                    (*params, *(f"%{w}%" for w in words), main.LIST_PAGE_SIZE + 1))
+                scan.append(time.perf_counter() - t0)
+            out["cases"][label] = {"matches": total, "ranked": total <= main.SEARCH_RANK_MAX,
+                                   "like_matches": scanned[0][-1] if scanned else 0,
+                                   "fts": stats_ms(fts), "like": stats_ms(scan)}
+    return out
@@ -0,0 +1,78 @@
+# bench/common.py
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import main
+from dispatch import Dispatcher
+from index import ReminderIndex
+from quota import ActiveCounts, RateLimiter
+from scheduler import ReminderScheduler
+from storage import Storage
+
+# name -> async fn(opts) returning a JSON-able dict; filled by @benchmark
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def stats_ms(samples):
+    """p50/p90/p99/max of `samples` (seconds), in milliseconds."""
+    if not samples:
+        return {}
+    s = sorted(samples)
+
+    def pct(p):
+        return round(s[min(len(s) - 1, int(p * len(s)))] * 1000, 3)
+
+    return {"n": len(s), "p50_ms": pct(0.50), "p90_ms": pct(0.90), "p99_ms": pct(0.99),
+            "max_ms": round(s[-1] * 1000, 3)}
+
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+class Clock:
+    """Settable clock for the scheduler/dispatcher."""
+
+    def __init__(self, now=None):
+        self.now = time.time() if now is None else now
+
+    def __call__(self):
+        return self.now
+
+
+@asynccontextmanager
+async def fresh_db():
+    """
+    Point main at a new, migrated database in a temp dir, with an idle
+    scheduler and dispatcher (nothing is started), an empty reminder index
+    and active counts, and remove it afterwards.
+    Quotas are off: benchmarks drive thousands of commands from one user.
+    """
+    tmp = tempfile.mkdtemp(prefix="rembench-")
+    saved = main.storage, main.scheduler, main.dispatcher, main.reminder_index, main.active_counts
+    saved_quotas = main.user_commands, main.guild_commands, main.USER_MAX_ACTIVE, main.GUILD_MAX_ACTIVE
+    main.storage = Storage(os.path.join(tmp, "reminders.db"))
+    main.scheduler = ReminderScheduler(main.fire_due, loader=main.fetch_schedule_window)
+    main.dispatcher = Dispatcher(main.ack_deliveries)
+    main.reminder_index = ReminderIndex(main.fetch_user_index)
+    main.active_counts = ActiveCounts()
+    main.user_commands, main.guild_commands = RateLimiter(0, 0), RateLimiter(0, 0)
+    main.USER_MAX_ACTIVE = main.GUILD_MAX_ACTIVE = 0
+    try:
+        await main.init_db()
+        yield main.storage
+    finally:
+        await main.storage.close()
+        main.storage, main.scheduler, main.dispatcher, main.reminder_index, main.active_counts = saved
+        main.user_commands, main.guild_commands, main.USER_MAX_ACTIVE, main.GUILD_MAX_ACTIVE = saved_quotas
+        shutil.rmtree(tmp, ignore_errors=True)
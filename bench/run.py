@@ -0,0 +1,115 @@
+# bench/run.py
+"""
+Offline benchmarks for the scheduler, dispatcher, parser and storage paths.
+
+    python -m bench.run                          # every benchmark, 10k rows
+    python -m bench.run --size 1000000 --only tick,cmd_list
+    python -m bench.run --out new.json --compare old.json
+
+Nothing talks to Discord: bot.get_guild / channel.send are stubs from
+bench/stubs.py, and each benchmark gets its own temporary database.
+Results are printed (and optionally written) as JSON, so runs on two
+commits can be diffed with --compare.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+
+from bench import bench_parser, bench_scheduler, bench_storage  # noqa: F401  (register)
+from bench.common import BENCHMARKS
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.strip().splitlines()[0])
+    p.add_argument("--size", type=int, default=10000, help="rows in the synthetic table (10k-10M)")
+    p.add_argument("--only", default="", help="comma separated benchmark names: " + ", ".join(BENCHMARKS))
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--queries", type=int, default=2000, help="point lookups for storage_pool")
+    p.add_argument("--inserts", type=int, default=500, help="rows per insert variant")
+    p.add_argument("--parses", type=int, default=50000, help="texts for the parser benchmark")
+    p.add_argument("--repeat", type=int, default=20, help="samples per cmd_list case")
+    p.add_argument("--deliveries", type=int, default=2000)
+    p.add_argument("--channels", type=int, default=500)
+    p.add_argument("--cluster", type=int, default=500, help="reminders due together for fire_to_send")
+    p.add_argument("--send-latency", type=float, default=0.02, help="stub channel.send latency, seconds")
+    p.add_argument("--rate-limit-p", type=float, default=0.05, help="share of sends answered with 429")
+    p.add_argument("--timeout", type=float, default=120.0, help="give up on fire_to_send after this many seconds")
+    p.add_argument("--out", help="also write the JSON here")
+    p.add_argument("--compare", help="earlier JSON result to diff against")
+    return p.parse_args(argv)
+
+
+async def run(opts):
+    names = [n for n in opts.only.split(",") if n] or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(unknown)}")
+    results = {}
+    for name in names:
+        print(f"… {name}", file=sys.stderr)
+        t0 = time.perf_counter()
+        results[name] = await BENCHMARKS[name](opts)
+        results[name]["wall_s"] = round(time.perf_counter() - t0, 3)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "time": int(time.time()),
+            "size": opts.size,
+            "seed": opts.seed,
+        },
+        "results": results,
+    }
+
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            yield from _flatten(v, key + ".")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, v
+
+
+def compare(old, new):
+    """Print every numeric metric present in both runs with its ratio new/old."""
+    before = dict(_flatten(old["results"]))
+    for key, value in _flatten(new["results"]):
+        if key in before and before[key]:
+            ratio = value / before[key]
+            flag = ""
+            if key.endswith("_ms") and ratio > 1.2 or key.endswith("_per_s") and ratio < 0.8:
+                flag = "  <-- slower"
+            print(f"{key:60} {before[key]:>12} -> {value:>12}  x{ratio:.2f}{flag}", file=sys.stderr)
+
+
+def main(argv=None):
+    opts = parse_args(argv)
+    report = asyncio.run(run(opts))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if opts.compare:
+        with open(opts.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench/stubs.py
+import asyncio
+import random
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import discord
+
+# Offline stand-ins for the discord objects main.py touches, so the
+# benchmarks never open a gateway connection.
+
+
+class FakeChannel:
+    """`send` sleeps `latency` seconds and answers 429 with probability `rate_limit_p`."""
+
+    def __init__(self, channel_id, latency=0.0, rate_limit_p=0.0, retry_after=0.05, rng=None):
+        self.id = channel_id
+        self.latency = latency
+        self.rate_limit_p = rate_limit_p
+        self.retry_after = retry_after
+        self.rng = rng or random.Random(channel_id)
+        self.sent = []
+        self.rate_limited = 0
+
+    async def send(self, content=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_p and self.rng.random() < self.rate_limit_p:
+            self.rate_limited += 1
+            raise discord.RateLimited(self.retry_after)
+        self.sent.append(content)
+
+
+class FakeGuild:
+    def __init__(self, guild_id, **channel_kwargs):
+        self.id = guild_id
+        self.channel_kwargs = channel_kwargs
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        ch = self.channels.get(channel_id)
+        if ch is None:
+            ch = self.channels[channel_id] = FakeChannel(channel_id, **self.channel_kwargs)
+        return ch
+
+    get_channel_or_thread = get_channel
+
+
+class FakeGateway:
+    """Replaces `bot.get_guild`; every guild exists unless listed in `missing`."""
+
+    def __init__(self, missing=(), **channel_kwargs):
+        self.missing = set(missing)
+        self.channel_kwargs = channel_kwargs
+        self.guilds = {}
+
+    def get_guild(self, guild_id):
+        if guild_id in self.missing:
+            return None
+        g = self.guilds.get(guild_id)
+        if g is None:
+            g = self.guilds[guild_id] = FakeGuild(guild_id, **self.channel_kwargs)
+        return g
+
+    @contextmanager
+    def install(self, bot):
+        """`with gateway.install(bot):` swaps `bot.get_guild` in, and back out afterwards."""
+        shadowed = vars(bot).get("get_guild")
+        bot.get_guild = self.get_guild
+        try:
+            yield self
+        finally:
+            if shadowed is None:
+                del bot.get_guild
+            else:
+                bot.get_guild = shadowed
+
+    @property
+    def sent(self):
+        return sum(len(ch.sent) for g in self.guilds.values() for ch in g.channels.values())
+
+
+def fake_ctx(bot, guild_id, channel_id, user_id, manage_guild=False):
+    """Minimal commands.Context: replies are collected in `ctx.replies`, `invoke` calls the command's callback."""
+    replies = []
+
+    async def send(content=None, **kwargs):
+        replies.append(content)
+
+    async def invoke(command, *args, **kwargs):
+        return await command.callback(ctx, *args, **kwargs)
+
+    ctx = SimpleNamespace(
+        bot=bot,
+        guild=SimpleNamespace(id=guild_id),
+        channel=SimpleNamespace(id=channel_id),
+        author=SimpleNamespace(id=user_id, guild_permissions=SimpleNamespace(manage_guild=manage_guild)),
+        send=send,
+        invoke=invoke,
+        replies=replies,
+    )
+    return ctx
+
+
+def fake_interaction(bot, guild_id, channel_id, user_id, **options):
+    """Minimal discord.Interaction for app-command callbacks; `options` fill `namespace`, replies go to `replies`."""
+    replies = []
+
+    async def send_message(content=None, **kwargs):
+        replies.append(content)
+
+    return SimpleNamespace(
+        client=bot,
+        guild_id=guild_id,
+        channel_id=channel_id,
+        user=SimpleNamespace(id=user_id),
+        namespace=SimpleNamespace(**options),
+        response=SimpleNamespace(send_message=send_message),
+        replies=replies,
+    )
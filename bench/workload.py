@@ -0,0 +1,108 @@
+# bench/workload.py
+import random
+from datetime import datetime, timedelta, timezone
+
+# Synthetic reminders shaped like real usage: most fire on the hour or half
+# hour, mornings and evenings are busiest, a few large guilds own most rows,
+# weekly rows use office-day / weekend / single-day patterns.
+
+JAKARTA = timezone(timedelta(hours=7))  # no DST, so a fixed offset is exact
+DISCORD_EPOCH_MS = 1420070400000
+
+HOUR_WEIGHTS = (1, 1, 1, 1, 2, 6, 14, 16, 10, 6, 5, 5, 8, 5, 4, 4, 6, 9, 12, 12, 10, 8, 4, 2)
+MINUTE_CHOICES = ((0, 55), (30, 20), (15, 5), (45, 5), (None, 15))  # None = any minute
+WEEKLY_MASKS = ((0x1F, 45), (0x7F, 15), (0x60, 10), (0x15, 10), (None, 20))  # None = one day
+WEEKLY_SHARE = 0.3
+WORDS = ("minum", "air", "meeting", "olahraga", "ulang", "tahun", "kelas", "shift", "deadline",
+         "tugas", "sholat", "makan", "obat", "standup", "raid", "event", "bayar", "tagihan")
+
+ROW_COLUMNS = ("guild_id", "channel_id", "user_id", "message", "dt_iso", "hour", "minute",
+               "weekday_mask", "repeat", "next_fire_utc", "created_at")
+INSERT_SQL = f"INSERT INTO reminders ({', '.join(ROW_COLUMNS)}) VALUES ({', '.join('?' * len(ROW_COLUMNS))})"
+
+
+def snowflake(i, rng):
+    """A plausible Discord id; the timestamp bits spread guilds over shards."""
+    ms = DISCORD_EPOCH_MS + rng.randrange(2 * 10**11)
+    return ((ms - DISCORD_EPOCH_MS) << 22) | (i & 0x3FFFFF)
+
+
+class Workload:
+    def __init__(self, n, now, seed=1, guilds=None):
+        self.n = n
+        self.now = int(now)
+        self.rng = random.Random(seed)
+        self.guild_ids = [snowflake(i, self.rng) for i in range(guilds or max(10, n // 200))]
+        # zipf-ish: guild k gets weight 1/(k+1)
+        self._guild_cum = []
+        total = 0.0
+        for k in range(len(self.guild_ids)):
+            total += 1.0 / (k + 1)
+            self._guild_cum.append(total)
+
+    def _pick(self, weighted):
+        values, weights = zip(*weighted)
+        return self.rng.choices(values, weights)[0]
+
+    def guild(self):
+        return self.rng.choices(self.guild_ids, cum_weights=self._guild_cum)[0]
+
+    def message(self):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(1, 6)))
+
+    def hour_minute(self):
+        hour = self.rng.choices(range(24), HOUR_WEIGHTS)[0]
+        minute = self._pick(MINUTE_CHOICES)
+        return hour, self.rng.randrange(60) if minute is None else minute
+
+    def weekly_mask(self):
+        mask = self._pick(WEEKLY_MASKS)
+        return 1 << self.rng.randrange(7) if mask is None else mask
+
+    def _local_day(self, days_ahead):
+        return (datetime.fromtimestamp(self.now, JAKARTA) + timedelta(days=days_ahead)).date()
+
+    def _at(self, day, hour, minute):
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=JAKARTA)
+
+    def row(self):
+        """One tuple in ROW_COLUMNS order."""
+        guild_id = self.guild()
+        channel_id = guild_id + self.rng.randrange(8)
+        user_id = snowflake(self.rng.randrange(10**6), self.rng)
+        hour, minute = self.hour_minute()
+        created = datetime.fromtimestamp(self.now, JAKARTA).isoformat()
+        if self.rng.random() < WEEKLY_SHARE:
+            mask = self.weekly_mask()
+            for ahead in range(8):
+                day = self._local_day(ahead)
+                fire = self._at(day, hour, minute)
+                if mask >> day.weekday() & 1 and fire.timestamp() > self.now:
+                    break
+            return (guild_id, channel_id, user_id, self.message(), None, hour, minute, mask, 1,
+                    int(fire.timestamp()), created)
+        ahead = min(int(self.rng.expovariate(1 / 3.0)), 365)
+        fire = self._at(self._local_day(ahead), hour, minute)
+        if fire.timestamp() <= self.now:
+            fire += timedelta(days=1)
+        return (guild_id, channel_id, user_id, self.message(), fire.isoformat(), None, None, None, 0,
+                int(fire.timestamp()), created)
+
+    def rows(self, n=None):
+        for _ in range(self.n if n is None else n):
+            yield self.row()
+
+
+async def seed(storage, rows, chunk=10000):
+    """Bulk insert `rows` (ROW_COLUMNS tuples) in chunked transactions; returns the count."""
+    count, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            await storage.executemany(INSERT_SQL, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await storage.executemany(INSERT_SQL, batch)
+        count += len(batch)
+    return count
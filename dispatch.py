@@ -0,0 +1,290 @@
+# dispatch.py
+import asyncio
+import collections
+import time
+import traceback
+from dataclasses import dataclass, field
+
+import discord
+
+# Discord's bucket for POST /channels/{id}/messages is 5 messages per 5 s
+# per channel. Channels over it are parked instead of letting discord.py
+# sleep inside send() while holding a worker.
+CHANNEL_BURST = 5
+CHANNEL_WINDOW = 5.0
+SEND_TIMEOUT = 30.0
+MAX_ATTEMPTS = 3
+# A failed on_complete batch is put back and retried after this many
+# seconds, doubling up to MAX_ACK_BACKOFF while it keeps failing.
+ACK_BACKOFF = 1
+MAX_ACK_BACKOFF = 60
+
+
+@dataclass
+class Delivery:
+    """One outgoing message and the reminder rows it covers."""
+    channel: object
+    content: str
+    # (rid, fire_at, next_fire) per reminder; next_fire None = row is done
+    items: list
+    nonce: str = None                # idempotency key, see main.make_nonce
+    guild_id: int = None             # fair-share group; None = one shared group
+    status: str = "pending"          # pending | sent | failed | skipped
+    error: str = None
+    attempts: int = 0
+    send_seconds: float = 0.0        # time spent inside channel.send, all attempts
+    delivered_at: float = None
+    fire_at: float = field(init=False)
+
+    def __post_init__(self):
+        self.fire_at = min(item[1] for item in self.items)
+
+    @property
+    def channel_id(self):
+        return self.channel.id if self.channel is not None else None
+
+    @property
+    def lag(self):
+        """Seconds from the (earliest) due time to the end of the send."""
+        return None if self.delivered_at is None else self.delivered_at - self.fire_at
+
+
+class Dispatcher:
+    """
+    Bounded worker pool over per-channel FIFO queues.
+
+    A channel is handled by at most one worker at a time (keeps message
+    order and its rate-limit bucket), and goes to the back of its guild's
+    ready channels after each message. Workers take guilds round-robin,
+    one message per turn, so a guild with thousands of due channels gets
+    the same share of workers as one with a single message, and a busy or
+    slow channel can't starve the others. Finished deliveries are handed
+    to `on_complete` in batches of up to `ack_batch`, or every
+    `ack_interval` seconds; a batch whose `on_complete` raises is put back
+    and retried with a backoff. A delivery counts as unacked from intake
+    until the `on_complete` call that covers it returns.
+    """
+
+    def __init__(self, on_complete, workers=8, ack_batch=100, ack_interval=1.0, clock=time.time):
+        self.on_complete = on_complete
+        self.workers = workers
+        self.ack_batch = ack_batch
+        self.ack_interval = ack_interval
+        self.clock = clock
+        self.pending = 0
+        self._queues = {}
+        self._active = set()      # channels queued, in flight or parked
+        self._guild_of = {}       # channel id -> guild id, for active channels
+        self._channels = {}       # guild id -> deque of its ready channels
+        self._sent = {}           # channel id -> deque of recent send times
+        self._ready = asyncio.Queue()  # guilds with ready channels, each once
+        self._done = []
+        self._unacked = collections.Counter()  # fire_at -> deliveries not yet acked
+        self._flush = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+
+    # -----------------------
+    # Intake
+    # -----------------------
+    def submit(self, delivery):
+        cid = delivery.channel_id
+        q = self._queues.get(cid)
+        if q is None:
+            q = self._queues[cid] = collections.deque()
+        q.append(delivery)
+        self._unacked[delivery.fire_at] += 1
+        self.pending += 1
+        self._idle.clear()
+        if cid not in self._active:
+            self._active.add(cid)
+            self._guild_of[cid] = delivery.guild_id
+            self._make_ready(cid)
+
+    @property
+    def ready_guilds(self):
+        return len(self._channels)
+
+    def skip(self, delivery, reason=None):
+        """Acknowledge without sending (guild/channel gone)."""
+        delivery.status = "skipped"
+        delivery.error = reason
+        self._unacked[delivery.fire_at] += 1
+        self._finish(delivery, counted=False)
+
+    def oldest_unacked(self):
+        """Earliest fire time among deliveries whose ack hasn't committed, or None."""
+        return min(self._unacked) if self._unacked else None
+
+    # -----------------------
+    # Workers
+    # -----------------------
+    def _bucket_wait(self, cid):
+        sent = self._sent.get(cid)
+        if not sent or len(sent) < CHANNEL_BURST:
+            return 0.0
+        return sent[0] + CHANNEL_WINDOW - self.clock()
+
+    def _make_ready(self, cid):
+        gid = self._guild_of.get(cid)
+        chans = self._channels.get(gid)
+        if chans is None:
+            chans = self._channels[gid] = collections.deque()
+            self._ready.put_nowait(gid)
+        chans.append(cid)
+
+    def _next_channel(self, gid):
+        chans = self._channels[gid]
+        cid = chans.popleft()
+        if chans:
+            self._ready.put_nowait(gid)  # back of the line, behind the other guilds
+        else:
+            del self._channels[gid]
+        return cid
+
+    def _park(self, cid, delay):
+        asyncio.get_running_loop().call_later(delay, self._make_ready, cid)
+
+    async def _worker(self):
+        while True:
+            cid = self._next_channel(await self._ready.get())
+            q = self._queues.get(cid)
+            if not q:
+                self._release(cid)
+                continue
+            wait = self._bucket_wait(cid)
+            if wait > 0:
+                self._park(cid, wait)
+                continue
+            delivery = q.popleft()
+            retry_after = await self._send(delivery)
+            if retry_after is not None:
+                q.appendleft(delivery)
+                self._park(cid, retry_after)
+                continue
+            self._finish(delivery)
+            if delivery.status == "failed" and delivery.error in ("Forbidden", "NotFound"):
+                # dead channel: fail the rest of its queue without trying
+                while q:
+                    rest = q.popleft()
+                    rest.status, rest.error = "failed", delivery.error
+                    self._finish(rest)
+            if q:
+                self._make_ready(cid)
+            else:
+                self._release(cid)
+
+    def _release(self, cid):
+        self._queues.pop(cid, None)
+        self._active.discard(cid)
+        self._guild_of.pop(cid, None)
+        sent = self._sent.get(cid)
+        if sent and sent[-1] + CHANNEL_WINDOW < self.clock():
+            del self._sent[cid]
+
+    async def _send(self, delivery):
+        """Send once; returns a retry delay, or None when the delivery is finished."""
+        delivery.attempts += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(delivery.channel.send(delivery.content, nonce=delivery.nonce), SEND_TIMEOUT)
+        except discord.RateLimited as e:
+            return e.retry_after
+        except discord.HTTPException as e:
+            if e.status == 429:
+                return getattr(e, "retry_after", None) or 1.0
+            if e.status >= 500 and delivery.attempts < MAX_ATTEMPTS:
+                return float(2 ** delivery.attempts)
+            delivery.status, delivery.error = "failed", type(e).__name__
+            return None
+        except asyncio.TimeoutError:
+            # may still have gone through, never retried
+            delivery.status, delivery.error = "failed", "timeout"
+            return None
+        except Exception as e:
+            traceback.print_exc()
+            delivery.status, delivery.error = "failed", type(e).__name__
+            return None
+        finally:
+            delivery.send_seconds += time.perf_counter() - started
+        sent = self._sent.setdefault(delivery.channel_id, collections.deque(maxlen=CHANNEL_BURST))
+        sent.append(self.clock())
+        delivery.status = "sent"
+        return None
+
+    # -----------------------
+    # Acknowledgement
+    # -----------------------
+    def _finish(self, delivery, counted=True):
+        delivery.delivered_at = self.clock()
+        self._done.append(delivery)
+        if len(self._done) >= self.ack_batch:
+            self._flush.set()
+        if counted:
+            self.pending -= 1
+            if self.pending == 0:
+                self._idle.set()
+
+    async def _flusher(self):
+        backoff = ACK_BACKOFF
+        while True:
+            try:
+                await asyncio.wait_for(self._flush.wait(), self.ack_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush.clear()
+            if await self.flush():
+                backoff = ACK_BACKOFF
+            else:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_ACK_BACKOFF)
+
+    async def flush(self):
+        """Hand finished deliveries to on_complete; False if a batch failed and was put back."""
+        while self._done:
+            batch, self._done = self._done[:self.ack_batch], self._done[self.ack_batch:]
+            try:
+                await self.on_complete(batch)
+            except asyncio.CancelledError:
+                # close() cancelled the flusher mid-ack; its final flush redoes the batch
+                self._done[:0] = batch
+                raise
+            except Exception:
+                # back to the front, still unacked: the next flush retries it
+                traceback.print_exc()
+                self._done[:0] = batch
+                return False
+            for delivery in batch:
+                self._unacked[delivery.fire_at] -= 1
+                if not self._unacked[delivery.fire_at]:
+                    del self._unacked[delivery.fire_at]
+        return True
+
+    # -----------------------
+    # Lifecycle
+    # -----------------------
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._flusher()))
+
+    def is_running(self):
+        return bool(self._tasks)
+
+    async def join(self, timeout=None):
+        """Wait until everything submitted so far has been sent or failed."""
+        await asyncio.wait_for(self._idle.wait(), timeout)
+
+    async def close(self, timeout=10):
+        if self._tasks:
+            try:
+                await self.join(timeout)
+            except asyncio.TimeoutError:
+                pass
+            for t in self._tasks:
+                t.cancel()
+            # let a cancelled flusher put its batch back before the last flush
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        await self.flush()
@@ -0,0 +1,133 @@
+# index.py
+import asyncio
+from collections import OrderedDict
+from typing import NamedTuple
+
+# How many (guild, user) keys stay in memory; the least recently used go first.
+MAX_USERS = 10000
+
+
+class Entry(NamedTuple):
+    message: str
+    schedule: str     # text parse_reminder reads back, e.g. "setiap senin 08:00"
+    fire_at: int      # next fire (epoch), None when there is none
+
+
+class ReminderIndex:
+    """
+    In-memory (guild_id, user_id) -> {id: Entry} of a user's reminders, for
+    slash-command autocomplete, which has to answer without a DB round trip.
+
+    A key is loaded on first use with `await loader(guild_id, user_id)` ->
+    [(id, Entry)] and from then on kept current by the code that writes the
+    reminders table: put() for inserts, update()/advance()/remove() by id,
+    forget() when many rows change at once (the key is reloaded next time).
+    Writes that land while a key is loading are replayed over the loaded
+    rows, so a load never brings back a row deleted meanwhile.
+    """
+
+    def __init__(self, loader, max_users=MAX_USERS):
+        self.loader = loader
+        self.max_users = max_users
+        self._users = OrderedDict()  # key -> {id: Entry}, LRU order
+        self._owner = {}             # id -> key, for rows of loaded keys
+        self._tasks = {}             # key -> running load
+        self._loading = {}           # key -> {id: Entry|None} writes seen during its load
+        self._orphans = {}           # id -> Entry|None, id-only writes while any load runs
+
+    def __len__(self):
+        return len(self._users)
+
+    def peek(self, guild_id, user_id):
+        """Entries of a loaded key, or None; never loads."""
+        return self._users.get((guild_id, user_id))
+
+    async def get(self, guild_id, user_id, timeout=None):
+        """
+        Entries for the key, loading it first if needed. With `timeout`,
+        returns None when the load takes longer; it keeps running and the
+        next call finds the key loaded.
+        """
+        key = (guild_id, user_id)
+        entries = self._users.get(key)
+        if entries is not None:
+            self._users.move_to_end(key)
+            return entries
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.create_task(self._load(key))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _load(self, key):
+        changes = self._loading[key] = {}
+        try:
+            entries = dict(await self.loader(*key))
+        finally:
+            current = self._loading.get(key) is changes
+            if current:
+                del self._loading[key]
+                self._tasks.pop(key, None)
+        for rid, entry in list(self._orphans.items()) + list(changes.items()):
+            if entry is None:
+                entries.pop(rid, None)
+            elif rid in entries or rid in changes:
+                entries[rid] = entry
+        if not self._loading:
+            self._orphans.clear()
+        if current:  # not forgotten while loading
+            self._users[key] = entries
+            for rid in entries:
+                self._owner[rid] = key
+            while len(self._users) > self.max_users:
+                _, old = self._users.popitem(last=False)
+                for rid in old:
+                    self._owner.pop(rid, None)
+        return entries
+
+    def _set(self, rid, entry, key=None):
+        key = key or self._owner.get(rid)
+        if key in self._users:
+            if entry is None:
+                self._users[key].pop(rid, None)
+                self._owner.pop(rid, None)
+            else:
+                self._users[key][rid] = entry
+                self._owner[rid] = key
+        elif key in self._loading:
+            self._loading[key][rid] = entry
+        elif key is None and self._loading:
+            self._orphans[rid] = entry
+
+    def put(self, guild_id, user_id, rid, entry):
+        self._set(rid, entry, (guild_id, user_id))
+
+    def update(self, rid, entry):
+        self._set(rid, entry)
+
+    def remove(self, rid, fire_at=None):
+        """Drop `rid`; with `fire_at`, only if that is still its fire time (an edit meanwhile wins)."""
+        key = self._owner.get(rid)
+        if fire_at is not None and key is not None and self._users[key][rid].fire_at != fire_at:
+            return
+        self._set(rid, None)
+
+    def advance(self, rid, fire_at, nxt):
+        key = self._owner.get(rid)
+        if key is not None:
+            entry = self._users[key][rid]
+            if entry.fire_at == fire_at:
+                self._users[key][rid] = entry._replace(fire_at=nxt)
+
+    def forget(self, guild_id, user_id):
+        key = (guild_id, user_id)
+        for rid in self._users.pop(key, ()):
+            self._owner.pop(rid, None)
+        self._loading.pop(key, None)
+        self._tasks.pop(key, None)
+
+    def forget_guild(self, guild_id):
+        for key in [k for k in (*self._users, *self._loading) if k[0] == guild_id]:
+            self.forget(*key)
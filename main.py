@@ -1,264 +1,1505 @@
 # main.py
 import os
-import re
+import io
+import csv
 import json
-import aiosqlite
+import re
+import hashlib
+import heapq
+import functools
+import tempfile
+import time
+import traceback
 import discord
-from discord.ext import commands, tasks
+from discord import app_commands
+from discord.ext import commands
 import asyncio
-from datetime import datetime, timedelta, time as dt_time
+from datetime import datetime
 import pytz
-from flask import Flask
-from threading import Thread
-app = Flask(__name__) 
+import aiohttp
+from aiohttp import web
+import metrics
+import profiling
+import transfer
+from dispatch import Delivery, Dispatcher
+from index import Entry, ReminderIndex
+from parsing import WEEKDAY_MAP, parse_reminder
+from quota import ActiveCounts, RateLimiter
+import recurrence
+from recurrence import Rule
+from scheduler import MAX_SLEEP, ReminderScheduler
+from storage import Storage
 # -----------------------
 # Konfigurasi
 # -----------------------
 TOKEN = os.environ.get("reminder_bot")  # nama env var sesuai kesepakatan
-TZ = pytz.timezone("Asia/Jakarta")
+TZ = pytz.timezone("Asia/Jakarta")  # default zone; users/servers pick theirs with rem!timezone
 DB_FILE = "reminders.db"
+PORT = int(os.environ.get("PORT", 5000))
+
+# Sharding: SHARD_COUNT total shards, SHARD_IDS the ones this process runs
+# ("0,1" or "0-3"). Unset = one process owning every shard.
+def parse_shard_ids(spec):
+    if not spec:
+        return None
+    ids = set()
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        ids.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(ids)
+
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+SHARD_IDS = parse_shard_ids(os.environ.get("SHARD_IDS"))
+
+# Quotas, 0 = no limit. Commands that write (rem, edit, hapus, import,
+# export, and their slash twins) draw from a token bucket per user and per
+# guild; stored reminders are capped per user and per guild.
+USER_MAX_ACTIVE = int(os.environ.get("USER_MAX_ACTIVE", 500))
+GUILD_MAX_ACTIVE = int(os.environ.get("GUILD_MAX_ACTIVE", 20000))
+USER_COMMANDS_PER_MIN = float(os.environ.get("USER_COMMANDS_PER_MIN", 20))
+USER_COMMAND_BURST = int(os.environ.get("USER_COMMAND_BURST", 10))
+GUILD_COMMANDS_PER_MIN = float(os.environ.get("GUILD_COMMANDS_PER_MIN", 120))
+GUILD_COMMAND_BURST = int(os.environ.get("GUILD_COMMAND_BURST", 60))
+
+# Delivery history: fired and cancelled reminders are kept HISTORY_DAYS
+# (0 = forever). Pruning it and handing free pages back to the file system
+# run in small steps during MAINTENANCE_HOURS ("3-5" = 03:00 to 05:00 in TZ,
+# may wrap past midnight) while nothing is being sent.
+HISTORY_DAYS = int(os.environ.get("HISTORY_DAYS", 90))
+MAINTENANCE_HOURS = tuple(int(h) for h in os.environ.get("MAINTENANCE_HOURS", "3-5").split("-"))
+
+# Diagnostics, see rem!profile. PROFILE_SAMPLE > 0 records that share of
+# timing spans from startup on; LOOP_BLOCK_MS > 0 prints a warning with the
+# blocking stack whenever the event loop is stuck for longer.
+PROFILE_SAMPLE = float(os.environ.get("PROFILE_SAMPLE", 0))
+LOOP_BLOCK_MS = float(os.environ.get("LOOP_BLOCK_MS", 0))
 
 # -----------------------
 # Intents & Bot setup
 # -----------------------
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix=["rem!", "Rem!", "REM!"],
-                   intents=intents,
-                   case_insensitive=True,
-                   help_command=None)
-
-# -----------------------
-# Helper: month + weekday maps
-# -----------------------
-MONTH_MAP = {
-    # English full
-    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
-    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
-    # English abbr
-    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
-    "oct": 10, "nov": 11, "dec": 12,
-    # Indonesian full
-    "januari": 1, "februari": 2, "maret": 3, "april": 4, "mei": 5, "juni": 6,
-    "juli": 7, "agustus": 8, "september": 9, "oktober": 10, "november": 11, "desember": 12,
-    # Indonesian abbr variations
-    "janv":1, "okt": 10, "okt.": 10, "des": 12, "sept":9, "oktober":10, "okt":10, "okt.":10
-}
 
-WEEKDAY_MAP = {
-    "monday": 0, "mon": 0, "senin": 0,
-    "tuesday": 1, "tue": 1, "selasa": 1,
-    "wednesday": 2, "wed": 2, "rabu": 2,
-    "thursday": 3, "thu": 3, "kamis": 3,
-    "friday": 4, "fri": 4, "jumat": 4, "jum":4,
-    "saturday": 5, "sat": 5, "sabtu": 5,
-    "sunday": 6, "sun": 6, "minggu": 6
-}
+class ReminderTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        interaction.extras["started_at"] = time.perf_counter()  # for COMMAND_SECONDS
+        return True
+
+class ReminderBot(commands.AutoShardedBot):
+    http_runner = None
+    recovery_task = None
+    watermark_task = None
+    reconcile_task = None
+    maintenance_task = None
+
+    async def setup_hook(self):
+        # runs once, before the first gateway connect: migrations, the FTS
+        # rebuild and a one-off VACUUM finish before any shard sees an event
+        await init_db()
+        await self.load_extension("reminder")
+        self.http_runner = await start_http_server()
+
+    async def close(self):
+        scheduler.stop()
+        watchdog.stop()
+        for task in (self.watermark_task, self.reconcile_task, self.maintenance_task):
+            if task:
+                task.cancel()
+        if self.recovery_task and not self.recovery_task.done():
+            self.recovery_task.cancel()
+        await dispatcher.close()
+        if self.recovery_task and self.recovery_task.done() and not self.recovery_task.cancelled() and storage.is_open:
+            await save_watermark(current_watermark())
+        await storage.close()
+        if self.http_runner:
+            await self.http_runner.cleanup()
+        await super().close()
+
+bot = ReminderBot(command_prefix=["rem!", "Rem!", "REM!"],
+                  intents=intents,
+                  case_insensitive=True,
+                  help_command=None,
+                  tree_cls=ReminderTree,
+                  shard_count=SHARD_COUNT,
+                  shard_ids=SHARD_IDS)
+
+def shard_of(guild_id, shard_count):
+    # Discord's guild -> shard mapping
+    return (guild_id >> 22) % shard_count
+
+def owns_guild(guild_id):
+    return SHARD_IDS is None or shard_of(guild_id, SHARD_COUNT) in SHARD_IDS
+
+# -----------------------
+# Metrics (served on /metrics)
+# -----------------------
+QUOTA_REJECTED = metrics.Counter("reminder_quota_rejected_total", "Commands or rows refused by a quota", ("limit",))
+CLEANUP = metrics.Counter("reminder_cleanup_total", "Reminders parked, restored or deleted for departed guilds and deleted channels, history rows pruned", ("action",))
+LATE_REMINDERS = metrics.Counter("reminder_late_total", "Reminders fired late, by how the guild's policy handled them", ("action",))
+SCHEDULER_LAG = metrics.Histogram("reminder_scheduler_lag_seconds", "Due time to scheduler pick-up", buckets=metrics.LAG_BUCKETS)
+DISPATCH_SECONDS = metrics.Histogram("reminder_dispatch_seconds", "Due time to end of send, per delivery", ("status",), buckets=metrics.LAG_BUCKETS)
+DELIVERIES = metrics.Counter("reminder_deliveries_total", "Finished deliveries", ("status",))
+DB_QUERY_SECONDS = metrics.Histogram("reminder_db_query_seconds", "DB helper run time", ("helper",))
+COMMAND_SECONDS = metrics.Histogram("reminder_command_seconds", "Command handler run time", ("command",))
+LOOP_SECONDS = metrics.Histogram("reminder_loop_seconds", "Run time of one background loop iteration", ("loop",))
+SEND_SECONDS = metrics.Histogram("reminder_send_seconds", "Time spent in channel.send per delivery, retries included", ("status",))
+LOOP_BLOCKED = metrics.Counter("reminder_loop_blocked_total", "Event loop stalls longer than the watchdog threshold")
+AUTOCOMPLETE_SECONDS = metrics.Histogram("reminder_autocomplete_seconds", "Slash-command autocomplete answer time, by index state", ("index",))
+metrics.Gauge("reminder_scheduler_heap_size", "Reminders held by the scheduler", lambda: len(scheduler))
+metrics.Gauge("reminder_scheduler_last_tick_seconds", "Epoch of the last scheduler tick", lambda: scheduler.last_tick)
+metrics.Gauge("reminder_dispatch_queue_depth", "Deliveries waiting to be sent", lambda: dispatcher.pending)
+metrics.Gauge("reminder_dispatch_ready_guilds", "Guilds with a message ready to send, served round-robin", lambda: dispatcher.ready_guilds)
+metrics.Gauge("reminder_index_users", "(guild, user) keys held by the autocomplete index", lambda: len(reminder_index))
+DB_FREE_PAGES = metrics.Gauge("reminder_db_free_pages", "Free pages left in the DB file after the last maintenance run")
+metrics.Gauge("reminder_gateway_latency_seconds", "Discord heartbeat latency", lambda: bot.latency if bot.is_ready() else None)
+
+def db_timed(fn):
+    return metrics.timed(DB_QUERY_SECONDS, helper=fn.__name__)(fn)
+
+@bot.before_invoke
+async def _command_started(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def _command_finished(ctx):
+    started = getattr(ctx, "started_at", None)
+    if started is not None:
+        COMMAND_SECONDS.observe(time.perf_counter() - started, command=ctx.command.qualified_name)
+
+@bot.listen("on_app_command_completion")
+async def _app_command_finished(interaction, command):
+    started = interaction.extras.get("started_at")
+    if started is not None:
+        COMMAND_SECONDS.observe(time.perf_counter() - started, command=f"/{command.qualified_name}")
+
+# Spans for rem!profile are these histograms' observations; nothing is
+# recorded, and nothing extra runs, while no trace window is open.
+tracer = profiling.Tracer([DB_QUERY_SECONDS.name, COMMAND_SECONDS.name, LOOP_SECONDS.name,
+                           SEND_SECONDS.name, AUTOCOMPLETE_SECONDS.name])
+watchdog = profiling.LoopWatchdog(on_block=lambda seconds: LOOP_BLOCKED.inc())
+
+# -----------------------
+# Helper: weekday masks
+# -----------------------
+# Weekly reminders store their days as a 7-bit mask, bit d = weekday d (Mon=0).
+# Display names and the label for every possible mask are precomputed once.
+WEEKDAY_NAMES = tuple(next(k for k, v in WEEKDAY_MAP.items() if v == d) for d in range(7))
+WEEKDAY_MASK_LABELS = tuple(
+    ", ".join(WEEKDAY_NAMES[d] for d in range(7) if mask >> d & 1).title() or "N/A"
+    for mask in range(128)
+)
+
+def weekdays_to_mask(weekdays):
+    mask = 0
+    for d in weekdays:
+        mask |= 1 << d
+    return mask
+
+def format_weekdays(mask):
+    return WEEKDAY_MASK_LABELS[mask & 0x7F]
+
+def row_rule(repeat, hour, minute, weekday_mask, interval, month_day, nth):
+    """recurrence.Rule for a stored row (repeat != 0)."""
+    return Rule(repeat, hour, minute, weekday_mask, interval or 1, month_day, nth)
+
+# -----------------------
+# Helper: message packing
+# -----------------------
+MESSAGE_LIMIT = 2000
+
+def pack_lines(lines, limit=MESSAGE_LIMIT, header=""):
+    """
+    Greedily pack `lines` into as few messages as fit in `limit` chars.
+    Returns [(content, [line indexes])]; an over-long line is truncated.
+    """
+    packed = []
+    buf, idx, size = [], [], len(header)
+    for i, line in enumerate(lines):
+        if len(header) + len(line) > limit:
+            line = line[:limit - len(header) - 1] + "…"
+        if buf and size + 1 + len(line) > limit:
+            packed.append((header + "\n".join(buf), idx))
+            buf, idx, size = [], [], len(header)
+        size += len(line) + (1 if buf else 0)
+        buf.append(line)
+        idx.append(i)
+    if buf:
+        packed.append((header + "\n".join(buf), idx))
+    return packed
 
 # -----------------------
 # DB helpers (aiosqlite)
 # -----------------------
-async def init_db():
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS reminders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                channel_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                message TEXT NOT NULL,
-                dt_iso TEXT,             -- for one-time reminders (ISO in TZ)
-                hour INTEGER,            -- for weekly reminders
-                minute INTEGER,          -- for weekly reminders
-                weekdays TEXT,           -- JSON list of ints for weekly reminders
-                repeat INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL
-            )
-        """)
-        await db.commit()
-
-async def add_one_time(guild_id, channel_id, user_id, message, dt_iso):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("""
-            INSERT INTO reminders (guild_id, channel_id, user_id, message, dt_iso, repeat, created_at)
-            VALUES (?, ?, ?, ?, ?, 0, ?)
-        """, (str(guild_id), channel_id, user_id, message, dt_iso, datetime.now(TZ).isoformat()))
-        await db.commit()
-
-async def add_weekly(guild_id, channel_id, user_id, message, hour, minute, weekdays):
-    wd_json = json.dumps(weekdays)
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("""
-            INSERT INTO reminders (guild_id, channel_id, user_id, message, hour, minute, weekdays, repeat, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
-        """, (str(guild_id), channel_id, user_id, message, hour, minute, wd_json, datetime.now(TZ).isoformat()))
-        await db.commit()
-
-async def fetch_due_one_time(now_iso):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT id, guild_id, channel_id, user_id, message FROM reminders WHERE dt_iso = ? AND repeat = 0", (now_iso,))
+# One long-lived storage layer (WAL, pooled readers, single writer) instead
+# of a fresh aiosqlite connection + thread per call. Opened in init_db.
+# Command writes use storage.write, which group-commits concurrent ones.
+storage = Storage(DB_FILE)
+
+# Schema migrations, applied in order by init_db; PRAGMA user_version holds
+# how many have run. Append new steps, never edit shipped ones.
+async def _schema_v1(db):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id TEXT NOT NULL,
+            channel_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            dt_iso TEXT,             -- for one-time reminders (ISO in TZ)
+            hour INTEGER,            -- for weekly reminders
+            minute INTEGER,          -- for weekly reminders
+            weekdays TEXT,           -- JSON list of ints for weekly reminders
+            repeat INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+    """)
+
+async def _schema_v2(db):
+    # integer guild_id + indexed next_fire_utc; SQLite can't change a column
+    # type in place, so rebuild the table
+    await db.execute("""
+        CREATE TABLE reminders_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            dt_iso TEXT,             -- for one-time reminders (ISO in TZ)
+            hour INTEGER,            -- for weekly reminders
+            minute INTEGER,          -- for weekly reminders
+            weekdays TEXT,           -- JSON list of ints for weekly reminders
+            repeat INTEGER DEFAULT 0,
+            next_fire_utc INTEGER,   -- next fire time, UTC epoch seconds
+            created_at TEXT NOT NULL
+        )
+    """)
+    await db.execute("""
+        INSERT INTO reminders_v2 (id, guild_id, channel_id, user_id, message, dt_iso, hour, minute, weekdays, repeat, next_fire_utc, created_at)
+        SELECT id, CAST(guild_id AS INTEGER), channel_id, user_id, message, dt_iso, hour, minute, weekdays, repeat,
+               CASE WHEN repeat = 0 AND dt_iso IS NOT NULL THEN CAST(strftime('%s', dt_iso) AS INTEGER) END,
+               created_at
+        FROM reminders
+    """)
+    await db.execute("DROP TABLE reminders")
+    await db.execute("ALTER TABLE reminders_v2 RENAME TO reminders")
+    await db.execute("CREATE INDEX idx_reminders_guild ON reminders (guild_id, id)")
+    await db.execute("CREATE INDEX idx_reminders_due ON reminders (repeat, next_fire_utc)")
+
+async def _schema_v3(db):
+    # weekdays JSON -> weekday_mask bits, decoded once here instead of per fire
+    await db.execute("ALTER TABLE reminders ADD COLUMN weekday_mask INTEGER")
+    async with db.execute("SELECT id, weekdays FROM reminders WHERE weekdays IS NOT NULL") as cur:
         rows = await cur.fetchall()
-        return rows
+    await db.executemany("UPDATE reminders SET weekday_mask = ? WHERE id = ?",
+                         [(weekdays_to_mask(json.loads(wd_json)), rid) for rid, wd_json in rows])
+    await db.execute("ALTER TABLE reminders DROP COLUMN weekdays")
+
+async def _schema_v4(db):
+    await db.execute("""
+        CREATE TABLE guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            digest INTEGER NOT NULL DEFAULT 0   -- 1: pack due reminders per channel
+        )
+    """)
+
+async def _schema_v5(db):
+    # outbox marker: set (durably) before a fire is sent, cleared by its ack
+    await db.execute("ALTER TABLE reminders ADD COLUMN attempt_id TEXT")
+    await db.execute("ALTER TABLE reminders ADD COLUMN attempt_at INTEGER")
+
+async def _schema_v6(db):
+    # keyset pages for rem!list mine / channel filters
+    await db.execute("CREATE INDEX idx_reminders_user ON reminders (guild_id, user_id, id)")
+    await db.execute("CREATE INDEX idx_reminders_channel ON reminders (guild_id, channel_id, id)")
 
-async def delete_reminder_by_id(rid):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute("DELETE FROM reminders WHERE id = ?", (rid,))
-        await db.commit()
+async def _schema_v7(db):
+    # recurrence rules beyond weekly, see recurrence.Rule
+    await db.execute("ALTER TABLE reminders ADD COLUMN interval INTEGER")
+    await db.execute("ALTER TABLE reminders ADD COLUMN month_day INTEGER")
+    await db.execute("ALTER TABLE reminders ADD COLUMN nth INTEGER")
 
-async def fetch_weekly_for_time(hour, minute, weekday):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT id, guild_id, channel_id, user_id, message, weekdays FROM reminders WHERE repeat = 1 AND hour = ? AND minute = ?", (hour, minute))
+async def _schema_v8(db):
+    # time zones: per reminder (NULL = TZ, which every older row was made in),
+    # per guild and per user
+    await db.execute("ALTER TABLE reminders ADD COLUMN tz TEXT")
+    await db.execute("ALTER TABLE guild_settings ADD COLUMN tz TEXT")
+    await db.execute("""
+        CREATE TABLE user_settings (
+            user_id INTEGER PRIMARY KEY,
+            tz TEXT
+        )
+    """)
+
+async def _schema_v9(db):
+    # late-reminder policy per guild, the downtime watermark, and a partial
+    # index so recovery finds claimed-but-unacked rows without a scan
+    await db.execute("ALTER TABLE guild_settings ADD COLUMN late_policy TEXT NOT NULL DEFAULT 'terlambat'")
+    await db.execute("ALTER TABLE guild_settings ADD COLUMN late_max INTEGER")  # minutes, for 'drop'
+    await db.execute("""
+        CREATE TABLE bot_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """)
+    await db.execute("CREATE INDEX idx_reminders_attempt ON reminders (next_fire_utc) WHERE attempt_id IS NOT NULL")
+
+async def _schema_v10(db):
+    # rows of guilds the bot left are parked (next_fire_utc NULL) until
+    # it is invited back or PARK_DAYS pass
+    await db.execute("ALTER TABLE reminders ADD COLUMN parked_at INTEGER")
+    await db.execute("CREATE INDEX idx_reminders_parked ON reminders (parked_at) WHERE parked_at IS NOT NULL")
+
+async def _schema_v11(db):
+    # delivery record of rows that left `reminders`, append-only; a plain
+    # rowid, ids only serve batched pruning
+    await db.execute("""
+        CREATE TABLE reminder_history (
+            id INTEGER PRIMARY KEY,
+            reminder_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            repeat INTEGER NOT NULL,
+            fire_at INTEGER,         -- due time of the fire; next fire time when cancelled
+            done_at INTEGER NOT NULL,
+            status TEXT NOT NULL,    -- sent | failed | skipped | cancelled | channel_deleted | purged
+            latency_ms INTEGER,      -- due time to end of send
+            error TEXT
+        )
+    """)
+    await db.execute("CREATE INDEX idx_history_done ON reminder_history (done_at)")
+
+async def _schema_v12(db):
+    # full-text index of messages for rem!cari. External content: the index
+    # holds only tokens and reads text back from `reminders`; triggers keep
+    # it in step. guild_id is indexed as one more token, so a search walks
+    # the doclists of its terms and its guild, not every matching row, and
+    # the rank ignores that column.
+    await db.execute("""
+        CREATE VIRTUAL TABLE reminders_fts USING fts5(
+            message, guild_id,
+            content='reminders', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    await db.execute("INSERT INTO reminders_fts (reminders_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')")
+    await db.execute("""
+        CREATE TRIGGER reminders_fts_insert AFTER INSERT ON reminders BEGIN
+            INSERT INTO reminders_fts (rowid, message, guild_id) VALUES (new.id, new.message, new.guild_id);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER reminders_fts_delete AFTER DELETE ON reminders BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, message, guild_id) VALUES ('delete', old.id, old.message, old.guild_id);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER reminders_fts_update AFTER UPDATE OF message ON reminders BEGIN
+            INSERT INTO reminders_fts (reminders_fts, rowid, message, guild_id) VALUES ('delete', old.id, old.message, old.guild_id);
+            INSERT INTO reminders_fts (rowid, message, guild_id) VALUES (new.id, new.message, new.guild_id);
+        END
+    """)
+    await db.execute("INSERT INTO reminders_fts (reminders_fts) VALUES ('rebuild')")
+
+async def _schema_v13(db):
+    # first fire time of recurring rows carried over from v1, which v2 leaves
+    # NULL (it only had the weekdays JSON); rows that already have one, or
+    # are parked, are left alone
+    now = datetime.now(TZ)
+    async with db.execute("SELECT id, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz FROM reminders "
+                          "WHERE repeat != 0 AND next_fire_utc IS NULL AND parked_at IS NULL") as cur:
         rows = await cur.fetchall()
-        result = []
-        for r in rows:
-            rid, guild_id, channel_id, user_id, message, weekdays_json = r
-            wds = json.loads(weekdays_json)
-            if weekday in wds:
-                result.append((rid, guild_id, channel_id, user_id, message))
-        return result
-
-# -----------------------
-# Parsing input
-# -----------------------
-time_regex = re.compile(r'(?P<h>\d{1,2})[:.](\d{2})') # Ubah regex agar lebih fleksibel
-
-def extract_time(text):
-    m = time_regex.search(text)
-    if not m:
-        return None, text
-    h = int(m.group(1)) % 24
-    minute = int(m.group(2)) % 60
-    # remove the time token from text
-    new_text = (text[:m.start()] + text[m.end():]).strip()
-    return (h, minute), new_text
-
-def find_month_in_tokens(tokens):
-    for i, t in enumerate(tokens):
-        key = t.lower().strip(",. ")
-        if key in MONTH_MAP:
-            return i, key
-    return None, None
-
-def parse_date_flexible(text):
-    """
-    Returns:
-      - ('one_time', dt) with tz-aware datetime in TZ
-      - ('weekly', [weekday_ints], hour, minute)
-      - ('time_only', hour, minute)
-      - None on fail
-    Acceptable input examples:
-      "10 Oktober 17:00", "Oktober 10 17:00", "17:00 10/10", "senin 17:00", "senin,rabu 08:30"
-    """
-    text = text.strip()
-    # normalize commas
-    text = text.replace("/", " ").replace("-", " ").replace(".", " ")
-    tokens = text.split()
-    # extract time first
-    time_part, rest = extract_time(text)
-    # rest tokens:
-    rest_tokens = rest.split()
-    # if rest contains weekday words
-    weekdays = []
-    for t in rest_tokens:
-        key = t.lower().strip(",")
-        if key in WEEKDAY_MAP:
-            weekdays.append(WEEKDAY_MAP[key])
-    if weekdays:
-        if time_part:
-            return ("weekly", weekdays, time_part[0], time_part[1])
+    updates = []
+    for rid, repeat, *rule, tz_name in rows:
+        tz = zone(tz_name)
+        nxt = recurrence.next_fire(row_rule(repeat, *rule), now.astimezone(tz), tz)
+        if nxt:
+            updates.append((_epoch(nxt), rid))
+    await db.executemany("UPDATE reminders SET next_fire_utc = ? WHERE id = ?", updates)
+
+MIGRATIONS = [_schema_v1, _schema_v2, _schema_v3, _schema_v4, _schema_v5, _schema_v6, _schema_v7, _schema_v8, _schema_v9, _schema_v10, _schema_v11, _schema_v12, _schema_v13]
+
+# repeat values; listed explicitly in due queries so SQLite can walk
+# idx_reminders_due (repeat, next_fire_utc) as one range per kind
+REPEAT_KINDS = recurrence.KINDS
+_KINDS_SQL = ", ".join(map(str, REPEAT_KINDS))
+
+# When this process runs only some shards, the scheduler loads only rows of
+# guilds on them; the others are fired by the processes that own them.
+if SHARD_IDS is not None:
+    _SHARD_SQL = f" AND (guild_id >> 22) % {SHARD_COUNT} IN ({', '.join(map(str, SHARD_IDS))})"
+else:
+    _SHARD_SQL = ""
+
+async def init_db():
+    await storage.open()
+    await storage.migrate(MIGRATIONS)
+    if await storage.use_incremental_vacuum():
+        print("🗜️ File DB diubah ke auto_vacuum=INCREMENTAL (VACUUM penuh sekali)")
+    await load_guild_settings()
+    await load_user_timezones()
+    await load_active_counts()
+
+# Per-guild settings, read on every fire, so kept in memory; writes go to
+# the DB and the cache together.
+GUILD_DEFAULTS = {"digest": 0, "tz": None, "late_policy": "terlambat", "late_max": None}
+guild_settings = {}
+
+@db_timed
+async def load_guild_settings():
+    cols = ", ".join(GUILD_DEFAULTS)
+    guild_settings.clear()
+    for row in await storage.fetchall(f"SELECT guild_id, {cols} FROM guild_settings"):
+        guild_settings[row[0]] = dict(zip(GUILD_DEFAULTS, row[1:]))
+
+def get_guild_setting(guild_id, key):
+    settings = guild_settings.get(guild_id)
+    return settings[key] if settings else GUILD_DEFAULTS[key]
+
+@db_timed
+async def set_guild_setting(guild_id, key, value):
+    if key not in GUILD_DEFAULTS:
+        raise KeyError(key)
+    await storage.execute(f"""
+        INSERT INTO guild_settings (guild_id, {key}) VALUES (?, ?)
+        ON CONFLICT(guild_id) DO UPDATE SET {key} = excluded.{key}
+    """, (guild_id, value))
+    guild_settings.setdefault(guild_id, dict(GUILD_DEFAULTS))[key] = value
+
+# Per-user zone names, read on every command, cached the same way.
+user_timezones = {}
+
+@db_timed
+async def load_user_timezones():
+    user_timezones.clear()
+    user_timezones.update(await storage.fetchall("SELECT user_id, tz FROM user_settings WHERE tz IS NOT NULL"))
+
+@db_timed
+async def set_user_timezone(user_id, name):
+    """`name` None clears the user's zone."""
+    if name is None:
+        await storage.execute("DELETE FROM user_settings WHERE user_id = ?", (user_id,))
+        user_timezones.pop(user_id, None)
+        return
+    await storage.execute("""
+        INSERT INTO user_settings (user_id, tz) VALUES (?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET tz = excluded.tz
+    """, (user_id, name))
+    user_timezones[user_id] = name
+
+# -----------------------
+# Helper: time zones
+# -----------------------
+# Every schedule is stored as one UTC epoch (next_fire_utc), so the scheduler
+# runs the same indexed range query however many zones are in use. The zone
+# only matters when parsing, displaying, and advancing a recurring row; the
+# row keeps the zone it was made in, so DST is applied in that zone.
+TZ_ALIASES = {"wib": "Asia/Jakarta", "wita": "Asia/Makassar", "wit": "Asia/Jayapura", "gmt": "UTC", "utc": "UTC"}
+_TZ_NAMES = {name.lower(): name for name in pytz.all_timezones}
+
+def lookup_timezone(name):
+    """'europe/london', 'WITA', ... -> canonical IANA name, or None."""
+    key = name.strip().lower()
+    return TZ_ALIASES.get(key) or _TZ_NAMES.get(key)
+
+@functools.lru_cache(maxsize=None)
+def zone(name):
+    """pytz zone for a stored zone name; None is the default TZ."""
+    return pytz.timezone(name) if name else TZ
+
+def user_tz(guild_id, user_id):
+    """The zone a user's times are read and shown in: theirs, else the guild's, else TZ."""
+    return zone(user_timezones.get(user_id) or get_guild_setting(guild_id, "tz"))
+
+def format_dt(dt, tz):
+    return dt.astimezone(tz).strftime("%d %b %Y %H:%M %Z")
+
+def _epoch(dt):
+    return int(dt.timestamp())
+
+@db_timed
+async def add_one_time(guild_id, channel_id, user_id, message, dt_iso, tz=TZ):
+    fire_at = _epoch(datetime.fromisoformat(dt_iso))
+    rid, _ = await storage.write("""
+        INSERT INTO reminders (guild_id, channel_id, user_id, message, dt_iso, repeat, next_fire_utc, tz, created_at)
+        VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)
+    """, (guild_id, channel_id, user_id, message, dt_iso, fire_at, tz.zone, datetime.now(TZ).isoformat()))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.put(guild_id, user_id, rid, Entry(message, recurrence.describe_once(datetime.fromisoformat(dt_iso)), fire_at))
+    active_counts.add(guild_id, user_id)
+    return rid
+
+@db_timed
+async def add_weekly(guild_id, channel_id, user_id, message, hour, minute, weekday_mask, tz=TZ):
+    fire_at = _epoch(next_weekly_fire(hour, minute, weekday_mask, datetime.now(tz), tz))
+    rid, _ = await storage.write("""
+        INSERT INTO reminders (guild_id, channel_id, user_id, message, hour, minute, weekday_mask, repeat, next_fire_utc, tz, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+    """, (guild_id, channel_id, user_id, message, hour, minute, weekday_mask, fire_at, tz.zone, datetime.now(TZ).isoformat()))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.put(guild_id, user_id, rid, Entry(message, recurrence.describe(Rule(recurrence.WEEKLY, hour, minute, weekday_mask)), fire_at))
+    active_counts.add(guild_id, user_id)
+    return rid
+
+@db_timed
+async def update_one_time(rid, message, dt_iso, tz=TZ):
+    fire_at = _epoch(datetime.fromisoformat(dt_iso))
+    await storage.write("UPDATE reminders SET dt_iso = ?, hour = NULL, minute = NULL, weekday_mask = NULL, interval = NULL, month_day = NULL, nth = NULL, repeat = 0, next_fire_utc = ?, tz = ?, attempt_id = NULL, message = ? WHERE id = ?",
+                        (dt_iso, fire_at, tz.zone, message, rid))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.update(rid, Entry(message, recurrence.describe_once(datetime.fromisoformat(dt_iso)), fire_at))
+
+@db_timed
+async def update_weekly(rid, message, hour, minute, weekday_mask, tz=TZ):
+    fire_at = _epoch(next_weekly_fire(hour, minute, weekday_mask, datetime.now(tz), tz))
+    await storage.write("UPDATE reminders SET dt_iso = NULL, hour = ?, minute = ?, weekday_mask = ?, interval = NULL, month_day = NULL, nth = NULL, repeat = 1, next_fire_utc = ?, tz = ?, attempt_id = NULL, message = ? WHERE id = ?",
+                        (hour, minute, weekday_mask, fire_at, tz.zone, message, rid))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.update(rid, Entry(message, recurrence.describe(Rule(recurrence.WEEKLY, hour, minute, weekday_mask)), fire_at))
+
+@db_timed
+async def add_recurring(guild_id, channel_id, user_id, message, rule, tz=TZ):
+    fire_at = _epoch(recurrence.next_fire(rule, datetime.now(tz), tz))
+    rid, _ = await storage.write("""
+        INSERT INTO reminders (guild_id, channel_id, user_id, message, hour, minute, weekday_mask, interval, month_day, nth, repeat, next_fire_utc, tz, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (guild_id, channel_id, user_id, message, *rule[1:], rule.kind, fire_at, tz.zone, datetime.now(TZ).isoformat()))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.put(guild_id, user_id, rid, Entry(message, recurrence.describe(rule), fire_at))
+    active_counts.add(guild_id, user_id)
+    return rid
+
+@db_timed
+async def update_recurring(rid, message, rule, tz=TZ):
+    fire_at = _epoch(recurrence.next_fire(rule, datetime.now(tz), tz))
+    await storage.write("UPDATE reminders SET dt_iso = NULL, hour = ?, minute = ?, weekday_mask = ?, interval = ?, month_day = ?, nth = ?, repeat = ?, next_fire_utc = ?, tz = ?, attempt_id = NULL, message = ? WHERE id = ?",
+                        (*rule[1:], rule.kind, fire_at, tz.zone, message, rid))
+    scheduler.schedule(rid, fire_at)
+    reminder_index.update(rid, Entry(message, recurrence.describe(rule), fire_at))
+
+@db_timed
+async def fetch_reminders(rids, chunk=500):
+    """Rows for `rids` as {id: row}, one IN (...) query per `chunk` ids."""
+    rows = {}
+    for i in range(0, len(rids), chunk):
+        part = rids[i:i + chunk]
+        marks = ", ".join("?" * len(part))
+        for row in await storage.fetchall(f"SELECT id, guild_id, channel_id, user_id, message, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz, attempt_id, attempt_at, next_fire_utc FROM reminders WHERE id IN ({marks})", part):
+            rows[row[0]] = row
+    return rows
+
+@db_timed
+async def fetch_schedule_window(lo, hi):
+    """(id, next_fire_utc) with lo < next_fire_utc <= hi, an indexed range scan; lo=None includes everything overdue."""
+    if lo is None:
+        return await storage.fetchall(f"SELECT id, next_fire_utc FROM reminders WHERE repeat IN ({_KINDS_SQL}) AND next_fire_utc <= ?{_SHARD_SQL}", (hi,))
+    return await storage.fetchall(f"SELECT id, next_fire_utc FROM reminders WHERE repeat IN ({_KINDS_SQL}) AND next_fire_utc > ? AND next_fire_utc <= ?{_SHARD_SQL}", (lo, hi))
+
+def _guild_filter(guild_id, user_id=None, channel_id=None, repeat=None, recurring=False):
+    where, params = ["guild_id = ?"], [guild_id]
+    for col, value in (("user_id", user_id), ("channel_id", channel_id), ("repeat", repeat)):
+        if value is not None:
+            where.append(f"{col} = ?")
+            params.append(value)
+    if recurring:
+        where.append("repeat != 0")
+    return " AND ".join(where), params
+
+@db_timed
+async def fetch_guild_page(guild_id, after_id=0, limit=20, **filters):
+    """Keyset page: up to `limit` rows with id > after_id, in id order."""
+    where, params = _guild_filter(guild_id, **filters)
+    return await storage.fetchall(
+        f"SELECT id, message, dt_iso, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz FROM reminders WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+        (*params, after_id, limit))
+
+# bm25 costs ~4 µs per match; past this many, results are listed newest
+# first instead, which a common word in a big guild would otherwise pay for
+# on every page.
+SEARCH_RANK_MAX = 5000
+
+@db_timed
+async def search_guild_reminders(guild_id, query, offset=0, limit=20, **filters):
+    """
+    (total, page) of rows matching the FTS5 expression `query` (see
+    fts_query): best match first, or newest first past SEARCH_RANK_MAX.
+    The guild is part of the match, so without other filters both the
+    count and the page come from the index alone and only the page's rows
+    are read; filters need every match joined with its row first.
+    """
+    match = f'guild_id : "{int(guild_id)}" AND message : ({query})'
+    cols = "reminders.id, message, dt_iso, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz"
+    if not filters:
+        (total,) = await storage.fetchone("SELECT COUNT(*) FROM reminders_fts WHERE reminders_fts MATCH ?", (match,))
+        score, order = ("rank", "score, id") if total <= SEARCH_RANK_MAX else ("NULL", "id DESC")
+        return total, await storage.fetchall(f"""
+            SELECT {cols} FROM (SELECT rowid AS id, {score} AS score FROM reminders_fts WHERE reminders_fts MATCH ? ORDER BY {order} LIMIT ? OFFSET ?) AS hits
+            CROSS JOIN reminders USING (id) ORDER BY hits.{order}
+        """, (match, limit, offset)) if total else []
+    where, params = _guild_filter(guild_id, **filters)
+    hits = "WITH hits AS MATERIALIZED (SELECT rowid AS id{} FROM reminders_fts WHERE reminders_fts MATCH ?) "
+    (total,) = await storage.fetchone(hits.format("") + f"SELECT COUNT(*) FROM hits JOIN reminders USING (id) WHERE {where}", (match, *params))
+    if not total:
+        return 0, []
+    rank, order = (", rank", "hits.rank, reminders.id") if total <= SEARCH_RANK_MAX else ("", "reminders.id DESC")
+    return total, await storage.fetchall(
+        hits.format(rank) + f"SELECT {cols} FROM hits JOIN reminders USING (id) WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+        (match, *params, limit, offset))
+
+@db_timed
+async def count_guild_reminders(guild_id, **filters):
+    where, params = _guild_filter(guild_id, **filters)
+    (count,) = await storage.fetchone(f"SELECT COUNT(*) FROM reminders WHERE {where}", params)
+    return count
+
+@db_timed
+async def fetch_reminder_message(rid, guild_id):
+    """Stored message of `rid` if it belongs to `guild_id`, else None."""
+    row = await storage.fetchone("SELECT message FROM reminders WHERE id = ? AND guild_id = ?", (rid, guild_id))
+    return row[0] if row else None
+
+# Rows leave `reminders` through reminder_history: an INSERT ... SELECT of
+# the row runs in the same transaction (or group-commit op) as its DELETE.
+HISTORY_INSERT = "INSERT INTO reminder_history (reminder_id, guild_id, channel_id, user_id, message, repeat, fire_at, done_at, status, latency_ms, error) "
+# params: done_at, status, then the WHERE clause's
+HISTORY_CANCELLED = HISTORY_INSERT + "SELECT id, guild_id, channel_id, user_id, message, repeat, next_fire_utc, ?, ?, NULL, NULL FROM reminders WHERE "
+# params: fire_at, done_at, status, latency_ms, error, id
+HISTORY_FIRED = HISTORY_INSERT + "SELECT id, guild_id, channel_id, user_id, message, repeat, ?, ?, ?, ?, ? FROM reminders WHERE id = ?"
+
+@db_timed
+async def delete_guild_reminder(rid, guild_id):
+    """Delete `rid` if it belongs to `guild_id`; returns True when a row was removed."""
+    deleted = await storage.write([
+        (HISTORY_CANCELLED + "id = ? AND guild_id = ?", (int(time.time()), "cancelled", rid, guild_id)),
+        ("DELETE FROM reminders WHERE id = ? AND guild_id = ? RETURNING user_id", (rid, guild_id)),
+    ], fetch=True)
+    if deleted:
+        scheduler.cancel(rid)
+        reminder_index.remove(rid)
+        active_counts.remove(guild_id, deleted[0][0])
+    return bool(deleted)
+
+@db_timed
+async def fetch_user_index(guild_id, user_id):
+    """ReminderIndex loader: (id, Entry) for every active row of one user, over idx_reminders_user."""
+    rows = await storage.fetchall(
+        "SELECT id, message, dt_iso, repeat, hour, minute, weekday_mask, interval, month_day, nth, next_fire_utc FROM reminders WHERE guild_id = ? AND user_id = ? AND parked_at IS NULL",
+        (guild_id, user_id))
+    out = []
+    for rid, message, dt_iso, repeat, *rule, fire_at in rows:
+        if repeat == recurrence.ONCE:
+            schedule = recurrence.describe_once(datetime.fromisoformat(dt_iso))
         else:
-            return None  # need a time with weekday
-    # try to find month name
-    idx, month_key = find_month_in_tokens(rest_tokens)
-    if idx is not None:
-        # expect day near it (either before or after)
-        # try day before
-        day = None
-        month = MONTH_MAP[month_key]
-        # look left
-        if idx - 1 >= 0:
-            try:
-                day_candidate = int(re.sub(r'\D','', rest_tokens[idx-1]))
-                day = day_candidate
-            except:
-                day = None
-        # look right
-        if day is None and idx + 1 < len(rest_tokens):
+            schedule = recurrence.describe(row_rule(repeat, *rule))
+        out.append((rid, Entry(message, schedule, fire_at)))
+    return out
+
+# -----------------------
+# Scheduler
+# -----------------------
+def next_weekly_fire(hour, minute, weekday_mask, after, tz=TZ):
+    """Next tz-aware datetime strictly after `after` on a day in `weekday_mask` at hour:minute in `tz`."""
+    return recurrence.weekly(hour, minute, weekday_mask, after, tz)
+
+# Discord drops a send whose nonce matches a message the bot posted in the
+# last few minutes. Unacknowledged attempts younger than this are re-sent
+# with the same nonce (exactly once); older ones are acknowledged without
+# sending again, since the first send may well have gone through.
+NONCE_WINDOW = 120
+
+def make_nonce(items):
+    key = ",".join(f"{rid}:{fire_at}" for rid, fire_at, _ in items)
+    return hashlib.blake2b(key.encode(), digest_size=10).hexdigest()
+
+# A fire more than LATE_GRACE seconds after its due time (bot was down, loop
+# stalled) is handled by the guild's late_policy: 'terlambat' sends it with a
+# marker, 'digest' collapses a channel's late ones into one message, 'drop'
+# acknowledges ones older than late_max minutes without sending.
+LATE_GRACE = 120
+LATE_POLICIES = ("terlambat", "digest", "drop")
+LATE_DIGEST_HEADER = "📬 **Reminder yang terlewat** (bot sempat offline):\n"
+
+def format_lateness(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{max(minutes, 1)} menit"
+    if minutes < 48 * 60:
+        return f"{minutes // 60} jam"
+    return f"{minutes // (24 * 60)} hari"
+
+@metrics.timed(LOOP_SECONDS, loop="fire_due")
+async def fire_due(due, expire_until=None):
+    """
+    Scheduler callback: turn due rows into deliveries; the dispatcher sends
+    them. Fires at or before `expire_until` are acknowledged without sending.
+    """
+    rows = await fetch_reminders([rid for rid, _ in due])
+    now = time.time()
+    fresh = []
+    digests = {}  # channel id -> (channel, guild id, [(line, item)]) for guilds in digest mode
+    late_digests = {}  # channel id -> (channel, guild id, [(line, item)]) late ones, late_policy 'digest'
+    retries = {}  # attempt id -> (channel, guild id, [(line, item)]) interrupted by a restart
+    for rid, fire_at in due:
+        SCHEDULER_LAG.observe(max(0.0, now - fire_at))
+        row = rows.get(rid)
+        if not row or not owns_guild(row[1]):
+            continue  # gone, or fired by the process running that guild's shard
+        if row[15] != fire_at:
+            continue  # edited since it was popped; the scheduler holds the new time
+        rid, guild_id, channel_id, user_id, message, repeat = row[:6]
+        attempt_id, attempt_at = row[13:15]
+        nxt = None
+        if repeat != recurrence.ONCE:
+            # only the next occurrence after this fire (or after now, when it
+            # is late: occurrences missed while down are not replayed one by one),
+            # in the row's own zone so DST shifts land on the right UTC time
+            tz = zone(row[12])
+            nxt = recurrence.next_fire(row_rule(*row[5:12]), datetime.fromtimestamp(max(fire_at, now), tz), tz)
+            nxt = _epoch(nxt) if nxt else None
+            if nxt:
+                scheduler.schedule(rid, nxt)
+        guild = bot.get_guild(guild_id)
+        channel = guild.get_channel_or_thread(channel_id) if guild else None
+        line, item = f"⏰ <@{user_id}> {message}", (rid, fire_at, nxt)
+        late = now - fire_at
+        if not channel:
+            dispatcher.skip(Delivery(channel, line, [item]), "guild/channel hilang")
+        elif expire_until is not None and fire_at <= expire_until:
+            LATE_REMINDERS.inc(action="expired")
+            dispatcher.skip(Delivery(channel, line, [item]), "terlewat sebelum watermark pertama")
+        elif attempt_id and now - attempt_at < NONCE_WINDOW:
+            retries.setdefault(attempt_id, (channel, guild_id, []))[2].append((line, item))
+        elif attempt_id:
+            dispatcher.skip(Delivery(channel, line, [item]), "sudah dicoba sebelum restart")
+        elif late > LATE_GRACE:
+            policy = get_guild_setting(guild_id, "late_policy")
+            max_age = get_guild_setting(guild_id, "late_max")
+            if policy == "drop" and max_age is not None and late > max_age * 60:
+                LATE_REMINDERS.inc(action="dropped")
+                dispatcher.skip(Delivery(channel, line, [item]), "terlambat, dibuang")
+                continue
+            line = f"{line} _(terlambat {format_lateness(late)})_"
+            if policy == "digest":
+                LATE_REMINDERS.inc(action="digest")
+                late_digests.setdefault(channel.id, (channel, guild_id, []))[2].append((line, item))
+            else:
+                LATE_REMINDERS.inc(action="marked")
+                fresh.append(Delivery(channel, line, [item], guild_id=guild_id))
+        elif get_guild_setting(guild_id, "digest"):
+            digests.setdefault(channel.id, (channel, guild_id, []))[2].append((line, item))
+        else:
+            fresh.append(Delivery(channel, line, [item], guild_id=guild_id))
+    for channel, guild_id, entries in digests.values():
+        for content, idx in pack_lines([line for line, _ in entries]):
+            fresh.append(Delivery(channel, content, [entries[i][1] for i in idx], guild_id=guild_id))
+    for channel, guild_id, entries in late_digests.values():
+        for content, idx in pack_lines([line for line, _ in entries], header=LATE_DIGEST_HEADER):
+            fresh.append(Delivery(channel, content, [entries[i][1] for i in idx], guild_id=guild_id))
+    for delivery in fresh:
+        delivery.nonce = make_nonce(delivery.items)
+    # the claim must be committed before anything is sent
+    await claim_attempts(fresh, int(now))
+    for nonce, (channel, guild_id, entries) in retries.items():
+        dispatcher.submit(Delivery(channel, "\n".join(line for line, _ in entries), [item for _, item in entries], nonce=nonce, guild_id=guild_id))
+    for delivery in fresh:
+        dispatcher.submit(delivery)
+
+@db_timed
+async def claim_attempts(deliveries, now):
+    claims = [(d.nonce, now, rid, fire_at) for d in deliveries for rid, fire_at, _ in d.items]
+    if claims:
+        await storage.executemany("UPDATE reminders SET attempt_id = ?, attempt_at = ? WHERE id = ? AND next_fire_utc = ?", claims)
+
+@db_timed
+async def ack_deliveries(batch):
+    """
+    Dispatcher callback: one transaction per batch. Every fire goes to
+    reminder_history, one-time rows are deleted, recurring rows get their
+    advanced next_fire_utc and lose the attempt marker. Both only apply if
+    the row still has the fire time we sent for, so an edit made meanwhile
+    wins.
+    """
+    fired, deletes, advances = [], [], []
+    for delivery in batch:
+        done_at = delivery.delivered_at or time.time()
+        for rid, fire_at, nxt in delivery.items:
+            latency = int(max(0.0, done_at - fire_at) * 1000) if delivery.status != "skipped" else None
+            fired.append((fire_at, int(done_at), delivery.status, latency, delivery.error, rid))
+            if nxt is None:
+                deletes.append((rid, fire_at))
+            else:
+                advances.append((nxt, rid, fire_at))
+    removed = []
+    async with storage.transaction() as db:
+        await db.executemany(HISTORY_FIRED, fired)
+        # one statement per row: RETURNING tells which deletes happened, and whose rows they were
+        for params in deletes:
+            async with db.execute("DELETE FROM reminders WHERE id = ? AND next_fire_utc = ? RETURNING guild_id, user_id", params) as cur:
+                removed += await cur.fetchall()
+        if advances:
+            await db.executemany("UPDATE reminders SET next_fire_utc = ?, attempt_id = NULL WHERE id = ? AND next_fire_utc = ?", advances)
+    # only once committed: the dispatcher retries a batch whose ack raised
+    for guild_id, user_id in removed:
+        active_counts.remove(guild_id, user_id)
+    for rid, fire_at in deletes:
+        reminder_index.remove(rid, fire_at)
+    for nxt, rid, fire_at in advances:
+        reminder_index.advance(rid, fire_at, nxt)
+    for delivery in batch:
+        DELIVERIES.inc(status=delivery.status)
+        if delivery.attempts:
+            SEND_SECONDS.observe(delivery.send_seconds, status=delivery.status)
+        if delivery.lag is not None and delivery.status != "skipped":
+            DISPATCH_SECONDS.observe(max(0.0, delivery.lag), status=delivery.status)
+        if delivery.status == "failed":
+            print(f"⚠️ Gagal kirim reminder {[i[0] for i in delivery.items]}: {delivery.error}")
+
+dispatcher = Dispatcher(ack_deliveries)
+scheduler = ReminderScheduler(fire_due, loader=fetch_schedule_window)
+reminder_index = ReminderIndex(fetch_user_index)
+
+# -----------------------
+# Downtime recovery
+# -----------------------
+# The bot persists a watermark every WATERMARK_INTERVAL seconds: everything
+# due up to it has been fired and acknowledged. On startup the scheduler only
+# loads fire times after now, and recover_missed takes the range between
+# the watermark and now (plus claimed rows that never got their ack) with
+# two indexed queries, feeding it to fire_due in batches while the
+# dispatcher has room, so the backlog can't crowd out reminders due now.
+WATERMARK_INTERVAL = 30
+RECOVERY_SLACK = 900       # re-check this far before the watermark (slow sends, clock steps)
+RECOVERY_BATCH = 500
+RECOVERY_MAX_PENDING = 200  # dispatcher queue depth to wait for before the next batch
+RECOVERY_POLL = 0.5
+# one watermark per process when shards are split over processes
+WATERMARK_KEY = "last_tick" + (f":{','.join(map(str, SHARD_IDS))}" if SHARD_IDS is not None else "")
+
+@db_timed
+async def load_watermark():
+    row = await storage.fetchone("SELECT value FROM bot_state WHERE key = ?", (WATERMARK_KEY,))
+    return row[0] if row else None
+
+@db_timed
+async def save_watermark(value):
+    await storage.execute("""
+        INSERT INTO bot_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (WATERMARK_KEY, value))
+
+def current_watermark():
+    # stays below every fire time still owed: the heap's head, the batch
+    # fire_due is handling, and deliveries whose ack hasn't committed
+    owed = [t for t in (scheduler.next_fire(), scheduler.in_flight, dispatcher.oldest_unacked()) if t is not None]
+    return int(min([time.time()] + [t - 1 for t in owed]))
+
+@db_timed
+async def fetch_claimed(until):
+    """Rows claimed for a send that was never acknowledged, due at or before `until`."""
+    return await storage.fetchall(f"SELECT id, next_fire_utc FROM reminders WHERE attempt_id IS NOT NULL AND next_fire_utc <= ?{_SHARD_SQL}", (until,))
+
+async def recover_missed(since, until):
+    """
+    Fire everything due in (since - RECOVERY_SLACK, until]. `since` None is a
+    first start without a watermark: only the last RECOVERY_SLACK is fired,
+    older overdue rows are acknowledged unsent (recurring ones move on to
+    their next occurrence) instead of all firing at once.
+    """
+    if since is None:
+        expire_until = until - RECOVERY_SLACK
+        due = dict(await fetch_schedule_window(None, until))
+    else:
+        expire_until = None
+        due = dict(await fetch_schedule_window(since - RECOVERY_SLACK, until))
+        due.update(await fetch_claimed(since - RECOVERY_SLACK))
+    due = sorted(due.items(), key=lambda item: item[1])
+    # recurring rows get rescheduled past `until`; let the scheduler's first
+    # load widen its window first so they land on the heap
+    while scheduler.loaded_until is not None and scheduler.loaded_until <= until:
+        await asyncio.sleep(RECOVERY_POLL)
+    for i in range(0, len(due), RECOVERY_BATCH):
+        while dispatcher.pending > RECOVERY_MAX_PENDING:
+            await asyncio.sleep(RECOVERY_POLL)
+        await fire_due(due[i:i + RECOVERY_BATCH], expire_until)
+    if due:
+        down = f" (offline sejak {datetime.fromtimestamp(since, TZ):%d %b %H:%M})" if since else ""
+        print(f"♻️ Pemulihan: {len(due)} reminder terlewat diproses{down}")
+    expired = sum(1 for _, fire_at in due if expire_until is not None and fire_at <= expire_until)
+    if expired:
+        print(f"⏭️ {expired} reminder lebih dari {RECOVERY_SLACK // 60} menit terlewat dilewati (belum ada watermark)")
+    return len(due)
+
+async def watermark_loop(recovery):
+    # the old watermark stays until the backlog has been handed over, so a
+    # crash during recovery recovers the same range again
+    await recovery
+    while True:
+        try:
+            await save_watermark(current_watermark())
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(WATERMARK_INTERVAL)
+
+# -----------------------
+# Dead targets
+# -----------------------
+# Rows of a guild the bot left are parked: next_fire_utc goes NULL, so no due
+# query or scheduler window sees them, and they come back if the bot is
+# invited again within PARK_DAYS. Rows of a deleted channel are deleted.
+# Gateway events do both with one indexed statement each; reconcile() catches
+# what happened while the bot was offline by comparing the stored guild and
+# channel ids with the bot's cache.
+PARK_DAYS = 30
+RECONCILE_INTERVAL = 6 * 3600
+
+@db_timed
+async def park_guild(guild_id):
+    async with storage.transaction() as db:
+        async with db.execute("UPDATE reminders SET parked_at = ?, next_fire_utc = NULL, attempt_id = NULL WHERE guild_id = ? AND parked_at IS NULL RETURNING id",
+                              (int(time.time()), guild_id)) as cur:
+            rids = [rid for (rid,) in await cur.fetchall()]
+    for rid in rids:
+        scheduler.cancel(rid)
+    reminder_index.forget_guild(guild_id)
+    CLEANUP.inc(len(rids), action="parked")
+    return len(rids)
+
+@db_timed
+async def unpark_guild(guild_id):
+    """Give a returning guild's parked rows their next fire time; one-time ones that came due meanwhile fire late."""
+    now = datetime.now(TZ)
+    async with storage.transaction() as db:
+        async with db.execute("SELECT id, dt_iso, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz FROM reminders WHERE guild_id = ? AND parked_at IS NOT NULL",
+                              (guild_id,)) as cur:
+            rows = await cur.fetchall()
+        updates = []
+        for rid, dt_iso, repeat, *rule, tz_name in rows:
+            if repeat == recurrence.ONCE:
+                fire_at = _epoch(datetime.fromisoformat(dt_iso))
+            else:
+                tz = zone(tz_name)
+                nxt = recurrence.next_fire(row_rule(repeat, *rule), now.astimezone(tz), tz)
+                fire_at = _epoch(nxt) if nxt else None
+            updates.append((fire_at, rid))
+        await db.executemany("UPDATE reminders SET parked_at = NULL, next_fire_utc = ? WHERE id = ?", updates)
+    for fire_at, rid in updates:
+        if fire_at is not None:
+            scheduler.schedule(rid, fire_at)
+    reminder_index.forget_guild(guild_id)
+    CLEANUP.inc(len(updates), action="restored")
+    return len(updates)
+
+@db_timed
+async def delete_channel_reminders(guild_id, channel_id):
+    async with storage.transaction() as db:
+        await db.execute(HISTORY_CANCELLED + "guild_id = ? AND channel_id = ?", (int(time.time()), "channel_deleted", guild_id, channel_id))
+        async with db.execute("DELETE FROM reminders WHERE guild_id = ? AND channel_id = ? RETURNING id, user_id", (guild_id, channel_id)) as cur:
+            rows = await cur.fetchall()
+    for rid, user_id in rows:
+        scheduler.cancel(rid)
+        reminder_index.remove(rid)
+        active_counts.remove(guild_id, user_id)
+    CLEANUP.inc(len(rows), action="deleted")
+    return len(rows)
+
+@db_timed
+async def purge_parked(before):
+    async with storage.transaction() as db:
+        await db.execute(HISTORY_CANCELLED + "parked_at IS NOT NULL AND parked_at < ?", (int(time.time()), "purged", before))
+        async with db.execute("DELETE FROM reminders WHERE parked_at IS NOT NULL AND parked_at < ? RETURNING guild_id, user_id", (before,)) as cur:
+            rows = await cur.fetchall()
+    for guild_id, user_id in rows:
+        active_counts.remove(guild_id, user_id)
+    CLEANUP.inc(len(rows), action="purged")
+    return len(rows)
+
+@db_timed
+async def fetch_stored_guilds():
+    # DISTINCT over idx_reminders_guild, no table reads
+    return {gid for (gid,) in await storage.fetchall(f"SELECT DISTINCT guild_id FROM reminders WHERE 1{_SHARD_SQL}")}
+
+@db_timed
+async def fetch_stored_channels(guild_id):
+    return [cid for (cid,) in await storage.fetchall("SELECT DISTINCT channel_id FROM reminders WHERE guild_id = ?", (guild_id,))]
+
+async def channel_exists(guild, channel_id):
+    """Cache first; an id the cache doesn't know (e.g. an archived thread) is asked from the API."""
+    if guild.get_channel_or_thread(channel_id) is not None:
+        return True
+    try:
+        await bot.fetch_channel(channel_id)
+    except discord.NotFound:
+        return False
+    except discord.HTTPException:
+        return True  # no access or a transient error: keep the rows
+    return True
+
+@metrics.timed(LOOP_SECONDS, loop="reconcile")
+async def reconcile():
+    """Park rows of guilds the bot is not in, delete rows of channels that are gone."""
+    if not bot.is_ready():
+        return
+    stored = await fetch_stored_guilds()
+    parked = deleted = 0
+    for guild_id in stored:
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            parked += await park_guild(guild_id)
+            continue
+        if guild.unavailable:
+            continue  # Discord outage, its channels aren't known right now
+        for channel_id in await fetch_stored_channels(guild_id):
+            if not await channel_exists(guild, channel_id):
+                deleted += await delete_channel_reminders(guild_id, channel_id)
+    purged = await purge_parked(int(time.time()) - PARK_DAYS * 86400)
+    await load_active_counts()  # wash out any drift of the incremental counts
+    if parked or deleted or purged:
+        print(f"🧹 Rekonsiliasi: {parked} diparkir, {deleted} dihapus (channel hilang), {purged} parkir kedaluwarsa dihapus")
+
+async def reconcile_loop():
+    while True:
+        try:
+            await reconcile()
+        except Exception:
+            traceback.print_exc()
+        await asyncio.sleep(RECONCILE_INTERVAL)
+
+# -----------------------
+# History & compaction
+# -----------------------
+# Old history goes in PRUNE_BATCH-row deletes, and the pages it and deleted
+# reminders leave free are handed back VACUUM_STEP pages at a time
+# (auto_vacuum=INCREMENTAL), so no step holds the write lock for long and
+# the file never needs a blocking VACUUM. Off-peak is re-checked before
+# every step, so a run stops as soon as reminders are being sent.
+PRUNE_BATCH = 2000
+VACUUM_STEP = 256            # pages, 1 MiB at the default 4 KiB page size
+MAINTENANCE_PAUSE = 0.2      # between steps, lets command writes in
+MAINTENANCE_INTERVAL = 900
+
+def off_peak(now=None):
+    hour = (now or datetime.now(TZ)).hour
+    lo, hi = MAINTENANCE_HOURS
+    in_hours = lo <= hour < hi if lo <= hi else (hour >= lo or hour < hi)
+    return in_hours and dispatcher.pending == 0
+
+@db_timed
+async def prune_history(before, limit=PRUNE_BATCH):
+    """Delete up to `limit` history rows done before `before`, over idx_history_done."""
+    _, count = await storage.execute(
+        "DELETE FROM reminder_history WHERE id IN (SELECT id FROM reminder_history WHERE done_at < ? LIMIT ?)", (before, limit))
+    return count
+
+@db_timed
+async def vacuum_step(pages=VACUUM_STEP):
+    return await storage.incremental_vacuum(pages)
+
+@metrics.timed(LOOP_SECONDS, loop="maintenance")
+async def maintenance():
+    pruned = freed = 0
+    if HISTORY_DAYS:
+        before = int(time.time()) - HISTORY_DAYS * 86400
+        while off_peak():
+            count = await prune_history(before)
+            pruned += count
+            if count < PRUNE_BATCH:
+                break
+            await asyncio.sleep(MAINTENANCE_PAUSE)
+    while off_peak():
+        count, left = await vacuum_step()
+        freed += count
+        DB_FREE_PAGES.set(left)
+        if count < VACUUM_STEP:
+            break
+        await asyncio.sleep(MAINTENANCE_PAUSE)
+    CLEANUP.inc(pruned, action="history_pruned")
+    if pruned or freed:
+        print(f"🗜️ Pemeliharaan: {pruned} riwayat lama dihapus, {freed} halaman dikembalikan ke disk")
+    return pruned, freed
+
+async def maintenance_loop():
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            await maintenance()
+        except Exception:
+            traceback.print_exc()
+
+# -----------------------
+# Import / export
+# -----------------------
+# Files are spooled to a temp file and read back one record at a time, rows
+# go to the DB in executemany batches; memory stays flat for 100k-row files.
+IMPORT_BATCH = 1000
+IMPORT_MAX_BYTES = 25 * 1024 * 1024
+IMPORT_ERROR_LINES = 15
+EXPORT_PAGE = 1000
+IMPORT_SQL = """
+    INSERT INTO reminders (guild_id, channel_id, user_id, message, dt_iso, hour, minute, weekday_mask, interval, month_day, nth, repeat, next_fire_utc, tz, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+async def download_attachment(attachment, fh, limit=IMPORT_MAX_BYTES):
+    if attachment.size > limit:
+        raise ValueError(f"file terlalu besar (maks {limit // (1024 * 1024)} MB)")
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                fh.write(chunk)
+    fh.seek(0)
+
+def _import_channel(guild, value, default):
+    if not value:
+        return default
+    channel = guild.get_channel(int(value)) if value.isdigit() else None
+    if channel is None:
+        raise ValueError(f"channel {value} tidak ada di server ini")
+    return channel.id
+
+def csv_record_schedule(record, guild, default_channel, tz, now):
+    """
+    CSV row -> (parsed, message, channel_id, tz); `when` is ISO or anything
+    rem!rem accepts, read in the row's `tz` column or else the importer's `tz`.
+    """
+    when, message = record["when"], record["message"]
+    if record["tz"]:
+        name = lookup_timezone(record["tz"])
+        if name is None:
+            raise ValueError(f"zona waktu tidak dikenal: {record['tz']!r}")
+        tz = zone(name)
+        now = now.astimezone(tz)
+    try:
+        dt = datetime.fromisoformat(when)
+        parsed = ("one_time", dt if dt.tzinfo else tz.localize(dt))
+    except ValueError:
+        parsed, rest = parse_reminder(when, tz, now)
+        if not parsed:
+            raise ValueError(f"waktu tidak dikenali: {when!r}")
+        message = message or rest
+    return parsed, message, _import_channel(guild, record["channel_id"], default_channel), tz
+
+# FREQ -> minutes per INTERVAL step for Rule(EVERY)
+ICS_FREQ_MINUTES = {"MINUTELY": 1, "HOURLY": 60}
+
+def ics_rule(value, start):
+    """RRULE value -> parse_reminder-style schedule, anchored at DTSTART `start`."""
+    rule = transfer.parse_rrule(value)
+    freq = rule.get("FREQ", "").upper()
+    try:
+        interval = int(rule.get("INTERVAL", "1"))
+    except ValueError:
+        interval = 0
+    if interval < 1 or "COUNT" in rule or "UNTIL" in rule:
+        raise ValueError(f"RRULE belum didukung: {value}")
+    byday = [d.strip().upper() for d in rule.get("BYDAY", "").split(",") if d.strip()]
+    h, m = start.hour, start.minute
+    if freq == "WEEKLY" and interval == 1:
+        days = [transfer.ICS_DAYS.index(d[-2:]) for d in byday if d[-2:] in transfer.ICS_DAYS]
+        return ("weekly", days or [start.weekday()], h, m)
+    if freq == "DAILY" and not byday:
+        return ("recurring", Rule(recurrence.DAILY, h, m, interval=interval))
+    if freq in ICS_FREQ_MINUTES and not byday:
+        minutes = interval * ICS_FREQ_MINUTES[freq]
+        if minutes >= recurrence.MIN_EVERY_MINUTES:
+            return ("recurring", Rule(recurrence.EVERY, interval=minutes))
+    if freq == "MONTHLY":
+        if "BYMONTHDAY" in rule and not byday:
             try:
-                day_candidate = int(re.sub(r'\D','', rest_tokens[idx+1]))
-                day = day_candidate
-            except:
-                day = None
-        if day is None:
-            return None
-        # build datetime
-        now = datetime.now(TZ)
-        year = now.year
-        dt = TZ.localize(datetime(year, month, day, *(time_part if time_part else (0,0))))
-        # if in past, bump year
-        if dt < now:
+                day = int(rule["BYMONTHDAY"])
+            except ValueError:
+                day = 0
+            if 1 <= day <= 31:
+                return ("recurring", Rule(recurrence.MONTHLY, h, m, interval=interval, month_day=day))
+        elif len(byday) == 1 and byday[0][-2:] in transfer.ICS_DAYS:
             try:
-                dt = TZ.localize(datetime(year+1, month, day, *(time_part if time_part else (0,0))))
-            except:
-                pass
-        return ("one_time", dt)
-    # try numeric date like day month as numbers (e.g., 10 11)
-    nums = [int(t) for t in rest_tokens if t.isdigit()]
-    if nums:
-        # heuristics: if len(nums) >=1 and time exists -> treat first numeric as day
-        if time_part and nums:
-            day = nums[0]
-            # try to find month from remaining tokens or default to current month
-            month = datetime.now(TZ).month
-            now = datetime.now(TZ)
+                nth = int(byday[0][:-2])
+            except ValueError:
+                nth = 0
+            if nth in recurrence.ORDINAL_NAMES:
+                mask = 1 << transfer.ICS_DAYS.index(byday[0][-2:])
+                return ("recurring", Rule(recurrence.MONTHLY_NTH, h, m, mask, interval, None, nth))
+        elif not byday:
+            return ("recurring", Rule(recurrence.MONTHLY, h, m, interval=interval, month_day=start.day))
+    raise ValueError(f"RRULE belum didukung: {value}")
+
+def ics_event_schedule(event, guild, default_channel, tz, now):
+    """
+    VEVENT -> (parsed, message, channel_id, tz); RRULEs as far as ics_rule
+    maps them, in the DTSTART's TZID zone (UTC/floating: the importer's `tz`).
+    """
+    if "DTSTART" not in event:
+        raise ValueError("VEVENT tanpa DTSTART")
+    params, value = event["DTSTART"]
+    if "TZID" in params:
+        tz = zone(lookup_timezone(params["TZID"].strip('"')) or tz.zone)
+    start = transfer.parse_ics_datetime(params, value, tz).astimezone(tz)
+    message = transfer.ics_unescape(event.get("SUMMARY", ({}, ""))[1]).strip()
+    if "RRULE" not in event:
+        return ("one_time", start), message, default_channel, tz
+    return ics_rule(event["RRULE"][1], start), message, default_channel, tz
+
+def import_row(guild_id, user_id, parsed, message, channel_id, tz, now, created, rule_fires):
+    """
+    Schedule -> IMPORT_SQL parameters, with next_fire_utc computed like
+    add_one_time/add_recurring. `rule_fires` caches next fires per
+    (Rule, zone), since every row of one import shares `now`.
+    """
+    message = message or "(tanpa pesan)"
+    if parsed[0] == "one_time":
+        dt = parsed[1].astimezone(tz).replace(second=0, microsecond=0)
+        if dt <= now:
+            raise ValueError("waktu sudah lewat")
+        return (guild_id, channel_id, user_id, message, dt.isoformat(), None, None, None, None, None, None, 0, _epoch(dt), tz.zone, created)
+    if parsed[0] == "recurring":
+        rule = parsed[1]
+    else:
+        _, wds, h, m = parsed
+        rule = Rule(recurrence.WEEKLY, h, m, weekdays_to_mask(wds))
+    fire_at = rule_fires.get((rule, tz.zone))
+    if fire_at is None:
+        fire_at = rule_fires[rule, tz.zone] = _epoch(recurrence.next_fire(rule, now, tz))
+    return (guild_id, channel_id, user_id, message, None, *rule[1:], rule.kind, fire_at, tz.zone, created)
+
+@db_timed
+async def import_reminders(guild, channel_id, user_id, records, convert):
+    """
+    Insert every (line, record) from `records` in one transaction, in
+    executemany batches. `convert(record, guild, channel_id, tz, now)`
+    returns (parsed, message, channel_id, tz) or raises ValueError for that
+    line; `tz` is the importing user's zone. Lines past the guild's
+    reminder cap fail; the per-user cap is left out, importing already
+    needs Manage Server. Returns (added, failed, first error lines).
+    """
+    room, limit = active_counts.room(guild.id, user_id, 0, GUILD_MAX_ACTIVE)
+    over = 0
+    tz = user_tz(guild.id, user_id)
+    now = datetime.now(tz)
+    created = now.isoformat()
+    added = failed = 0
+    errors, batch, upcoming, rule_fires = [], [], [], {}
+    async with storage.transaction() as db:
+        async with db.execute("SELECT COALESCE(MAX(id), 0) FROM reminders") as cur:
+            (last_id,) = await cur.fetchone()
+        for line, record in records:
+            if room is not None and added + len(batch) >= room:
+                over += 1
+                failed += 1
+                if len(errors) < IMPORT_ERROR_LINES:
+                    errors.append(f"baris {line}: {cap_message(limit)}")
+                continue
             try:
-                dt = TZ.localize(datetime(now.year, month, day, time_part[0], time_part[1]))
-                if dt < now:
-                    dt = TZ.localize(datetime(now.year+1, month, day, time_part[0], time_part[1]))
-                return ("one_time", dt)
-            except:
-                pass
-    # if only time provided -> schedule today or tomorrow if time passed
-    if time_part and not rest_tokens:
-        now = datetime.now(TZ)
-        h, m = time_part
-        dt = TZ.localize(datetime(now.year, now.month, now.day, h, m))
-        if dt < now:
-            dt = dt + timedelta(days=1)
-        return ("one_time", dt)
+                batch.append(import_row(guild.id, user_id, *convert(record, guild, channel_id, tz, now), now, created, rule_fires))
+            except ValueError as e:
+                failed += 1
+                if len(errors) < IMPORT_ERROR_LINES:
+                    errors.append(f"baris {line}: {e}")
+            if len(batch) >= IMPORT_BATCH:
+                await db.executemany(IMPORT_SQL, batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            await db.executemany(IMPORT_SQL, batch)
+            added += len(batch)
+        if added and scheduler.loaded_until is not None:
+            # only rows inside the scheduler's window go on the heap now
+            async with db.execute("SELECT id, next_fire_utc FROM reminders WHERE id > ? AND next_fire_utc <= ?",
+                                  (last_id, scheduler.loaded_until)) as cur:
+                upcoming = await cur.fetchall()
+    for rid, fire_at in upcoming:
+        scheduler.schedule(rid, fire_at)
+    if added:
+        active_counts.add(guild.id, user_id, added)
+        reminder_index.forget(guild.id, user_id)  # reloaded on next autocomplete
+    if over:
+        QUOTA_REJECTED.inc(over, limit=f"{limit}_active")
+    return added, failed, errors
+
+@db_timed
+async def fetch_export_page(guild_id, after_id=0, limit=EXPORT_PAGE, **filters):
+    where, params = _guild_filter(guild_id, **filters)
+    return await storage.fetchall(
+        f"SELECT id, channel_id, user_id, message, dt_iso, repeat, hour, minute, weekday_mask, interval, month_day, nth, tz, next_fire_utc FROM reminders WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+        (*params, after_id, limit))
+
+@db_timed
+async def fetch_export_zones(guild_id, **filters):
+    where, params = _guild_filter(guild_id, **filters)
+    rows = await storage.fetchall(f"SELECT DISTINCT COALESCE(tz, ?) FROM reminders WHERE {where}", (TZ.zone, *params))
+    return sorted(name for (name,) in rows)
+
+def ics_rrule(rule):
+    """Rule -> RRULE value; the inverse of ics_rule."""
+    kind, n = rule.kind, rule.interval
+    step = f";INTERVAL={n}" if n > 1 else ""
+    if kind == recurrence.WEEKLY:
+        return "FREQ=WEEKLY;BYDAY=" + ",".join(transfer.ICS_DAYS[d] for d in range(7) if rule.weekday_mask >> d & 1)
+    if kind == recurrence.DAILY:
+        return "FREQ=DAILY" + step
+    if kind == recurrence.EVERY:
+        return f"FREQ=HOURLY;INTERVAL={n // 60}" if n % 60 == 0 else f"FREQ=MINUTELY;INTERVAL={n}"
+    if kind == recurrence.MONTHLY:
+        return f"FREQ=MONTHLY{step};BYMONTHDAY={rule.month_day}"
+    weekday = (rule.weekday_mask & -rule.weekday_mask).bit_length() - 1
+    return f"FREQ=MONTHLY{step};BYDAY={rule.nth}{transfer.ICS_DAYS[weekday]}"
+
+# CSV `type` per repeat kind
+EXPORT_KINDS = {0: "once", recurrence.WEEKLY: "weekly", recurrence.DAILY: "daily",
+                recurrence.EVERY: "every", recurrence.MONTHLY: "monthly", recurrence.MONTHLY_NTH: "monthly"}
+
+def export_csv_chunk(rows):
+    records = []
+    for rid, channel_id, user_id, message, dt_iso, repeat, *rule, tz_name, _ in rows:
+        # `when` is an ISO time or the rem!rem text for the rule (read in `tz`), so re-import reads it back
+        when = dt_iso if repeat == 0 else recurrence.describe(row_rule(repeat, *rule))
+        records.append({"id": rid, "type": EXPORT_KINDS.get(repeat, "recurring"), "when": when, "message": message,
+                        "channel_id": channel_id, "user_id": user_id, "tz": zone(tz_name).zone})
+    return transfer.csv_chunk(records)
+
+def export_ics_chunk(rows, guild_id, stamp):
+    out = []
+    for rid, _, _, message, dt_iso, repeat, *rule, tz_name, next_fire in rows:
+        tz = zone(tz_name)
+        if repeat == 0:
+            start, rrule = datetime.fromisoformat(dt_iso), None
+        else:
+            start = datetime.fromtimestamp(next_fire, tz)
+            rrule = ics_rrule(row_rule(repeat, *rule))
+        out.append(transfer.ics_event(f"{rid}@{guild_id}.reminderbot", stamp, start, tz, message, rrule))
+    return "".join(out)
+
+async def export_reminders(guild_id, fmt, fh, **filters):
+    """Write the guild's reminders to binary `fh` page by page; returns the row count."""
+    stamp = datetime.now(TZ)
+    if fmt == "csv":
+        fh.write(transfer.csv_header().encode())
+    else:
+        zones = await fetch_export_zones(guild_id, **filters)
+        fh.write(transfer.ics_header([zone(name) for name in zones], stamp).encode())
+    count, after = 0, 0
+    while True:
+        rows = await fetch_export_page(guild_id, after, **filters)
+        if not rows:
+            break
+        chunk = export_csv_chunk(rows) if fmt == "csv" else export_ics_chunk(rows, guild_id, stamp)
+        fh.write(chunk.encode())
+        count += len(rows)
+        after = rows[-1][0]
+    if fmt == "ics":
+        fh.write(transfer.ICS_FOOTER.encode())
+    return count
+
+# -----------------------
+# Quotas
+# -----------------------
+# Stored-reminder counts are loaded once (one GROUP BY over the covering
+# idx_reminders_user) and then moved by the helpers that insert and delete
+# rows, so a cap check is a dict lookup; reconcile() reloads them now and
+# then. Buckets are keyed by user id (across guilds) and by guild id.
+active_counts = ActiveCounts()
+user_commands = RateLimiter(USER_COMMANDS_PER_MIN / 60, USER_COMMAND_BURST)
+guild_commands = RateLimiter(GUILD_COMMANDS_PER_MIN / 60, GUILD_COMMAND_BURST)
+
+@db_timed
+async def load_active_counts():
+    active_counts.load(await storage.fetchall(f"SELECT guild_id, user_id, COUNT(*) FROM reminders WHERE 1{_SHARD_SQL} GROUP BY guild_id, user_id"))
+
+def rate_refusal(guild_id, user_id):
+    """None, with a token taken from both buckets, when the command may run; else the reply."""
+    user_wait = user_commands.wait(user_id)
+    guild_wait = guild_commands.wait(guild_id)
+    if user_wait or guild_wait:
+        QUOTA_REJECTED.inc(limit="user_rate" if user_wait >= guild_wait else "guild_rate")
+        return f"⏳ Terlalu banyak perintah, coba lagi dalam **{int(max(user_wait, guild_wait)) + 1}** detik."
+    user_commands.take(user_id)
+    guild_commands.take(guild_id)
+    return None
+
+def cap_message(limit):
+    if limit == "user":
+        return f"❌ Kamu sudah punya {USER_MAX_ACTIVE} reminder (batas per user). Hapus yang lama dulu."
+    return f"❌ Server ini sudah punya {GUILD_MAX_ACTIVE} reminder (batas per server). Hapus yang lama dulu."
+
+def cap_refusal(guild_id, user_id):
+    """None when the user may add a reminder, else the reply."""
+    room, limit = active_counts.room(guild_id, user_id, USER_MAX_ACTIVE, GUILD_MAX_ACTIVE)
+    if room == 0:
+        QUOTA_REJECTED.inc(limit=f"{limit}_active")
+        return cap_message(limit)
     return None
 
 # -----------------------
-# Background checker
+# Reminder actions
 # -----------------------
-@tasks.loop(minutes=1)
-async def check_reminders_loop():
-    now = datetime.now(TZ)
-    # check one-time that match current minute
-    now_iso = now.replace(second=0, microsecond=0).isoformat()
-    rows = await fetch_due_one_time(now_iso)
-    for r in rows:
-        rid, guild_id, channel_id, user_id, message = r
-        guild = bot.get_guild(int(guild_id))
-        if not guild:
-            await delete_reminder_by_id(rid)
-            continue
-        channel = guild.get_channel(channel_id)
-        if channel:
-            await channel.send(f"⏰ <@{user_id}> {message}")
-        await delete_reminder_by_id(rid)
-    # check weekly
-    hour = now.hour
-    minute = now.minute
-    weekday = now.weekday()
-    weekly_rows = await fetch_weekly_for_time(hour, minute, weekday)
-    for rid, guild_id, channel_id, user_id, message in weekly_rows:
-        guild = bot.get_guild(int(guild_id))
-        if not guild:
-            continue
-        channel = guild.get_channel(channel_id)
-        if channel:
-            await channel.send(f"⏰ <@{user_id}> {message}")
+# What rem!rem / rem!edit / rem!hapus and their slash twins do; each returns
+# the reply text, the caller decides how to send it.
+async def create_reminder(guild_id, channel_id, user_id, text):
+    refusal = rate_refusal(guild_id, user_id) or cap_refusal(guild_id, user_id)
+    if refusal:
+        return refusal
+    # Parsing waktu + pesan sekaligus (satu kali scan), di zona waktu user
+    tz = user_tz(guild_id, user_id)
+    parsed, message = parse_reminder(text, tz)
+    if not parsed:
+        return "❌ Gagal mengenali waktu. Contoh: 'rem!rem 18 Oktober 20:00 meeting'"
+    if not message:
+        message = "(tanpa pesan)"
+    kind = parsed[0]
+    if kind == "one_time":
+        dt = parsed[1]
+        await add_one_time(guild_id, channel_id, user_id, message, dt.replace(second=0, microsecond=0).isoformat(), tz)
+        return f"✅ Reminder sekali diset untuk **{format_dt(dt, tz)}** — {message}"
+    if kind == "weekly":
+        _, wds, h, m = parsed
+        mask = weekdays_to_mask(wds)
+        await add_weekly(guild_id, channel_id, user_id, message, h, m, mask, tz)
+        return f"🔁 Reminder berulang diset setiap **{format_weekdays(mask)}** jam **{h:02d}:{m:02d}** ({tz.zone}) — {message}"
+    if kind == "recurring":
+        rule = parsed[1]
+        await add_recurring(guild_id, channel_id, user_id, message, rule, tz)
+        return f"🔁 Reminder berulang diset **{recurrence.describe(rule)}** ({tz.zone}) — {message}"
+    return "❌ Format tidak dikenali."
+
+async def edit_reminder(guild_id, user_id, rid, text):
+    refusal = rate_refusal(guild_id, user_id)
+    if refusal:
+        return refusal
+    # get existing
+    old_message = await fetch_reminder_message(rid, guild_id)
+    if old_message is None:
+        return "❌ Reminder tidak ditemukan."
+    # expect text like: "10 Oktober 18:00 pesan baru" or "08:30,senin new msg"
+    tz = user_tz(guild_id, user_id)
+    parsed, new_message = parse_reminder(text, tz)
+    if not parsed:
+        return "❌ Gagal mengenali format waktu/hari baru. Pastikan format: `ID <WAKTU/DATE> <PESAN>`"
+    if not new_message:
+        new_message = old_message  # only the schedule changes
+
+    # --- Update DB ---
+    if parsed[0] == "one_time":
+        dt = parsed[1].replace(second=0, microsecond=0).isoformat()
+        await update_one_time(rid, new_message, dt, tz)
+        human = format_dt(datetime.fromisoformat(dt), tz)
+        return f"✏️ Reminder **{rid}** diperbarui ke **{human}** — {new_message}"
+    if parsed[0] == "recurring":
+        rule = parsed[1]
+        await update_recurring(rid, new_message, rule, tz)
+        return f"✏️ Reminder **{rid}** diperbarui ke **{recurrence.describe(rule)}** ({tz.zone}) — {new_message}"
+    _, wds, h, m = parsed  # weekly
+    mask = weekdays_to_mask(wds)
+    await update_weekly(rid, new_message, h, m, mask, tz)
+    return f"✏️ Reminder **{rid}** diperbarui ke weekly **{format_weekdays(mask)}** {h:02d}:{m:02d} ({tz.zone}) — {new_message}"
+
+async def delete_reminder(guild_id, user_id, rid):
+    refusal = rate_refusal(guild_id, user_id)
+    if refusal:
+        return refusal
+    # Cek apakah ada baris yang terhapus
+    if await delete_guild_reminder(rid, guild_id):
+        return f"🗑️ Reminder **{rid}** berhasil dihapus."
+    return f"❌ Reminder **{rid}** tidak ditemukan di server ini."
 
 # -----------------------
 # Commands
@@ -271,271 +1512,486 @@ async def cmd_rem(ctx, *, rest: str):
     rem!rem 10 Oktober 18:00 ulang tahun
     rem!rem senin 08:00 olahraga
     rem!rem 08:30,senin,rabu minum air
+    rem!rem setiap hari 07:00 minum obat
+    rem!rem tiap 2 jam peregangan
+    rem!rem tanggal 1 09:00 bayar tagihan
+    rem!rem senin pertama 09:00 rapat bulanan
     """
     if ctx.guild is None:
         await ctx.send("❌ Gunakan di server (tidak di DM).")
         return
+    await ctx.send(await create_reminder(ctx.guild.id, ctx.channel.id, ctx.author.id, rest))
 
-    # Parsing waktu dulu
-    parsed = parse_date_flexible(rest)
-    
-    # Kalo parse_date_flexible gagal, coba parse untuk jam saja (seperti kode aslimu)
-    if not parsed:
-        # --- Tambahan: deteksi jam saja ---
-        # NOTE: Impor di dalam fungsi/metode tidak dianjurkan, tapi aku biarkan dulu
-        # asalkan kode ini jalan. Seharusnya datetime, timedelta, dan pytz sudah diimpor di atas.
-        
-        # NOTE: re.search(r'(\d{1,2})[:.](\d{2})', rest) ini sudah ada di time_regex di atas.
-        # Lebih baik pakai time_regex.search(rest)
-        time_only = time_regex.search(rest) # Pakai time_regex yang sudah didefinisikan
-        
-        if time_only:
-            hour, minute = map(int, time_only.groups())
-            at = datetime.now(TZ).replace(hour=hour, minute=minute, second=0, microsecond=0)
-            if at < datetime.now(TZ): # Pakai TZ yang sudah didefinisikan
-                at += timedelta(days=1)
-            message = rest[time_only.end():].strip()
-            kind = "one_time"
-            # ✅ Tambahan penting — tandai parsed agar sistem tahu parsing berhasil
-            parsed = (kind, at, message)
-        
-        # Ini adalah **perbaikan utama** di bagian if not parsed:
-        # Blok if time_only di atas, KALAU BERHASIL, akan mengisi variabel 'parsed'.
-        # Jika 'parsed' masih kosong (None) setelah mencoba deteksi jam, barulah kirim error.
-        if not parsed:
-            await ctx.send("❌ Gagal mengenali waktu. Contoh: 'rem!rem 18 Oktober 20:00 meeting'")
-            return
-    
-    # KESALAHAN UTAMA DI SINI (Indentasi dan logika):
-    # Logika yang kamu pakai di bawah ini (if len(parsed) == 3:, elif len(parsed) == 2:, else:) 
-    # MENGASUMSIKAN parse_date_flexible MENGEMBALIKAN format (at, kind, message) atau (at, kind).
-    # Padahal parse_date_flexible MENGEMBALIKAN ('kind', dt) atau ('weekly', [wds], h, m).
-    # Aku ubah logikanya untuk mengikuti *output* dari `parse_date_flexible` / blok deteksi jam saja.
+LIST_PAGE_SIZE = 15
+LIST_PREVIEW = 80  # chars of each message shown in the list
+LIST_FILTERS = {
+    "mine": "mine", "saya": "mine", "aku": "mine",
+    "channel": "channel", "ini": "channel",
+    "once": "once", "sekali": "once",
+    "weekly": "weekly", "mingguan": "weekly",
+    "ulang": "recurring", "recurring": "recurring",
+}
 
-    kind = parsed[0]
-    
-    # Ambil sisa kalimat setelah waktu/tanggal agar sisa teks jadi pesan
-    # Ini harusnya TIDAK PERLU lagi karena blok `if not parsed` sudah ambil message.
-    # Namun, karena `parse_date_flexible` tidak mengembalikan pesan, hanya waktu/tanggal,
-    # kita harus ambil pesan dari `rest` secara manual *kecuali* sudah diambil di blok deteksi jam.
-
-    # Kita cek dulu apakah `parsed` cuma berisi 2 elemen ('one_time', dt)
-    # atau 4 elemen ('weekly', wds, h, m).
-    # Kalau 3 elemen, berarti itu dari blok deteksi jam yang berhasil.
-    if kind == "one_time" and len(parsed) == 3: # Dari deteksi jam saja
-        dt = parsed[1]
-        message = parsed[2]
-    elif kind == "one_time" and len(parsed) == 2: # Dari parse_date_flexible
-        dt = parsed[1]
-        
-        # Cari posisi terakhir waktu/tanggal agar sisa teks jadi pesan
-        match = time_regex.search(rest)
-        cut_index = match.end() if match else 0
-
-        # Tambah pencarian nama bulan (dari kode kamu)
-        for month_name in MONTH_MAP.keys():
-            idx = re.search(rf"\b{month_name}\b", rest, re.IGNORECASE)
-            if idx:
-                cut_index = max(cut_index, idx.end())
-
-        # Ambil sisa kalimat setelah waktu/bulan
-        message = rest[cut_index:].strip()
-        if not message:
-            message = "(tanpa pesan)"
-
-    elif kind == "weekly": # Dari parse_date_flexible
-        _, wds, h, m = parsed
-        
-        # Ambil pesan. Karena `rest` sudah dikurangi waktu/hari di `parse_date_flexible`,
-        # kita harus menghitung ulang sisa teksnya.
-        # Lebih aman ambil pesan dari sisa string `rest` yang tidak ter-*parse*.
-        
-        # Cari posisi terakhir token waktu/hari yang ter-*parse*
-        # Ini bisa kompleks karena parse_date_flexible membuang token waktu/tanggal.
-        # Untuk kasus weekly, kita asumsikan pesan adalah sisa dari rest setelah waktu dan hari.
-        
-        # Simplifikasi: ambil sisa string *rest* setelah token waktu/tanggal yang berhasil di-parse
-        # Ini butuh logika parsing yang lebih detail, tapi untuk sekarang:
-        # Kita pakai saja logika `if kind == "one_time" and len(parsed) == 2:` di atas.
-        
-        # UNTUK WEEKLY, pesan adalah sisa dari `rest` setelah token waktu & hari.
-        time_part, rest_after_time = extract_time(rest)
-        weekdays_in_rest = [k for k in WEEKDAY_MAP.keys() if k in rest_after_time.lower()]
-        
-        # Hapus semua token hari yang ditemukan
-        message = rest_after_time
-        for day in weekdays_in_rest:
-            message = re.sub(r'\b'+day+r'\b', '', message, flags=re.IGNORECASE).strip()
-            
-        message = message.strip().strip(",. ")
-        if not message:
-            message = "(tanpa pesan)"
-            
-    else:
-        # Seharusnya tidak terjadi, karena sudah dicek di awal
-        await ctx.send("❌ Format tidak dikenali.")
-        return
+def parse_list_filters(ctx, args):
+    """rem!list-style filter words -> fetch_guild_page kwargs; None on an unknown word."""
+    filters = {}
+    for arg in args:
+        name = LIST_FILTERS.get(arg.lower())
+        if name == "mine":
+            filters["user_id"] = ctx.author.id
+        elif name == "channel":
+            filters["channel_id"] = ctx.channel.id
+        elif name in ("once", "weekly"):
+            filters["repeat"] = 0 if name == "once" else recurrence.WEEKLY
+        elif name == "recurring":
+            filters["recurring"] = True
+        else:
+            return None
+    return filters
 
+def format_reminder_line(row, tz=TZ):
+    """One rem!list line; one-time reminders are shown in the viewer's `tz`,
+    rules in their own zone (named when it differs from the viewer's)."""
+    rid, message, dt_iso, repeat, hour, minute, weekday_mask = row[:7]
+    if len(message) > LIST_PREVIEW:
+        message = message[:LIST_PREVIEW - 1] + "…"
+    if repeat == 0 and dt_iso:
+        return f"{rid}. (once) {message} — {format_dt(datetime.fromisoformat(dt_iso), tz)}"
+    row_zone = zone(row[10]).zone
+    suffix = f" ({row_zone})" if row_zone != tz.zone else ""
+    if repeat == recurrence.WEEKLY:
+        return f"{rid}. (weekly) {message} — {hour:02d}:{minute:02d} on {format_weekdays(weekday_mask or 0)}{suffix}"
+    return f"{rid}. (ulang) {message} — {recurrence.describe(row_rule(*row[3:10]))}{suffix}"
 
-    # Pengecekan akhir dan penambahan ke DB
-    if kind == "one_time":
-        await add_one_time(
-            ctx.guild.id,
-            ctx.channel.id,
-            ctx.author.id,
-            message,
-            dt.replace(second=0, microsecond=0).isoformat(),
-        )
-        human = dt.astimezone(TZ).strftime("%d %b %Y %H:%M")
-        await ctx.send(f"✅ Reminder sekali diset untuk **{human}** — {message}")
-    elif kind == "weekly":
-        await add_weekly(
-            ctx.guild.id,
-            ctx.channel.id,
-            ctx.author.id,
-            message,
-            h,
-            m,
-            wds,
-        )
-        days_str = ", ".join(
-            [
-                # Ini harusnya lebih robust untuk ambil nama hari
-                list(WEEKDAY_MAP.keys())[list(WEEKDAY_MAP.values()).index(d)]
-                for d in wds
-            ]
-        ) if wds else "N/A"
-        await ctx.send(
-            f"🔁 Reminder berulang diset setiap **{days_str.title()}** jam **{h:02d}:{m:02d}** — {message}"
-        )
-    else:
-        await ctx.send("❌ Format tidak dikenali.")
+class ReminderListView(discord.ui.View):
+    """Prev/next buttons over keyset pages; `cursors` holds the after_id of every visited page."""
+
+    def __init__(self, author_id, guild_id, filters, total, tz=TZ):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.tz = tz
+        self.filters = filters
+        self.total = total
+        self.cursors = [0]
+        self.next_cursor = None
+
+    async def render(self):
+        rows = await fetch_guild_page(self.guild_id, self.cursors[-1], LIST_PAGE_SIZE + 1, **self.filters)
+        has_next = len(rows) > LIST_PAGE_SIZE
+        rows = rows[:LIST_PAGE_SIZE]
+        self.next_cursor = rows[-1][0] if rows else None
+        self.prev_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = not has_next
+        pages = max(1, -(-self.total // LIST_PAGE_SIZE))
+        header = f"🗒️ Daftar reminder ({self.total}) — halaman {len(self.cursors)}/{pages}:\n"
+        return pack_lines([format_reminder_line(r, self.tz) for r in rows] or ["📭 (kosong)"], header=header)
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+
+    async def _show(self, interaction):
+        packed = await self.render()
+        await interaction.response.edit_message(content=packed[0][0], view=self)
+
+    @discord.ui.button(label="◀ Sebelumnya", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction, button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self._show(interaction)
+
+    @discord.ui.button(label="Berikutnya ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        if not button.disabled and self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+        await self._show(interaction)
+
+# rem!cari: words are ANDed, "..." is an exact phrase, a trailing * searches
+# by prefix; user:, channel: and jenis: narrow the results like rem!list.
+SEARCH_USAGE = "❌ Pakai: `rem!cari <kata> [user:saya|@user] [channel:ini|#channel] [jenis:once|weekly|ulang]`."
+SEARCH_ME = ("saya", "aku", "mine", "me")
+SEARCH_HERE = ("ini", "channel", "here")
+
+def fts_query(text):
+    """User words -> FTS5 expression of quoted tokens, so no input is FTS syntax; None when nothing is left."""
+    parts = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        tokens = re.findall(r"\w+", phrase or word)
+        if not tokens:
+            continue
+        if phrase:
+            parts.append('"' + " ".join(tokens) + '"')
+            continue
+        parts += [f'"{t}"' for t in tokens]
+        if word.endswith("*"):
+            parts[-1] += "*"
+    return " AND ".join(parts) or None
+
+def parse_search(ctx, rest):
+    """rem!cari text -> (search words, search_guild_reminders filters); None on a bad filter."""
+    words, filters = [], {}
+    for arg in rest.split():
+        key, sep, value = arg.partition(":")
+        key, value = key.lower(), value.lower()
+        if not sep or key not in ("user", "channel", "jenis"):
+            words.append(arg)
+            continue
+        mention = re.fullmatch(r"<[@#]!?(\d+)>|(\d+)", value)
+        if key == "jenis":
+            name = LIST_FILTERS.get(value)
+            if name in ("once", "weekly"):
+                filters["repeat"] = 0 if name == "once" else recurrence.WEEKLY
+            elif name == "recurring":
+                filters["recurring"] = True
+            else:
+                return None
+        elif value in (SEARCH_ME if key == "user" else SEARCH_HERE):
+            filters[f"{key}_id"] = ctx.author.id if key == "user" else ctx.channel.id
+        elif mention:
+            filters[f"{key}_id"] = int(mention.group(1) or mention.group(2))
+        else:
+            return None
+    return " ".join(words), filters
+
+class SearchResultView(ReminderListView):
+    """The rem!list buttons over ranked pages; cursors are row offsets."""
+
+    def __init__(self, author_id, guild_id, text, query, filters, tz=TZ):
+        super().__init__(author_id, guild_id, filters, 0, tz)
+        self.text = text
+        self.query = query
+
+    async def render(self):
+        offset = self.cursors[-1]
+        self.total, rows = await search_guild_reminders(self.guild_id, self.query, offset, LIST_PAGE_SIZE + 1, **self.filters)
+        has_next = len(rows) > LIST_PAGE_SIZE
+        rows = rows[:LIST_PAGE_SIZE]
+        self.next_cursor = offset + LIST_PAGE_SIZE
+        self.prev_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = not has_next
+        pages = max(1, -(-self.total // LIST_PAGE_SIZE))
+        order = ", terbaru dulu" if self.total > SEARCH_RANK_MAX else ""
+        header = f"🔎 Hasil untuk **{self.text}** ({self.total}{order}) — halaman {len(self.cursors)}/{pages}:\n"
+        return pack_lines([format_reminder_line(r, self.tz) for r in rows] or ["📭 (kosong)"], header=header)
+
+@bot.command(name="cari", aliases=["search", "find"])
+async def cmd_search(ctx, *, rest: str = ""):
+    """
+    Usage:
+    rem!cari ulang tahun                 (semua kata harus ada, urut paling cocok)
+    rem!cari "rapat tim" jenis:weekly    (frasa persis; jenis: once / weekly / ulang)
+    rem!cari meet* user:saya channel:ini (awalan kata; user: saya / @user, channel: ini / #channel)
+    """
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
+        return
+    parsed = parse_search(ctx, rest)
+    query = fts_query(parsed[0]) if parsed else None
+    if query is None:
+        await ctx.send(SEARCH_USAGE)
+        return
+    text, filters = parsed
+    view = SearchResultView(ctx.author.id, ctx.guild.id, text, query, filters, user_tz(ctx.guild.id, ctx.author.id))
+    packed = await view.render()
+    if not view.total:
+        await ctx.send(f"📭 Tidak ada reminder yang cocok dengan **{text}**.")
+        return
+    for content, _ in packed[:-1]:
+        await ctx.send(content)
+    await ctx.send(packed[-1][0], view=view if view.total > LIST_PAGE_SIZE else None)
 
 @bot.command(name="list", aliases=["show","all"])
-async def cmd_list(ctx):
+async def cmd_list(ctx, *args: str):
+    """
+    Usage:
+    rem!list                 (semua reminder di server)
+    rem!list mine            (punyaku)   | channel (channel ini)
+    rem!list once / weekly / ulang   (jenis reminder), bisa digabung: rem!list mine weekly
+    """
     if ctx.guild is None:
         await ctx.send("❌ Gunakan di server.")
         return
-    guild_id = str(ctx.guild.id)
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT id, message, dt_iso, hour, minute, weekdays, repeat FROM reminders WHERE guild_id = ?", (guild_id,))
-        rows = await cur.fetchall()
-    if not rows:
+    filters = parse_list_filters(ctx, args)
+    if filters is None:
+        await ctx.send("❌ Filter tidak dikenal. Pakai: `mine`, `channel`, `once`, `weekly`, `ulang`.")
+        return
+    total = await count_guild_reminders(ctx.guild.id, **filters)
+    if not total:
         await ctx.send("📭 Tidak ada reminder aktif.")
         return
-    lines = []
-    for r in rows:
-        rid, message, dt_iso, hour, minute, weekdays_json, repeat = r
-        if repeat == 0 and dt_iso:
-            dt = datetime.fromisoformat(dt_iso).astimezone(TZ)
-            lines.append(f"{rid}. (once) {message} — {dt.strftime('%d %b %Y %H:%M')}")
-        else:
-            wds = json.loads(weekdays_json) if weekdays_json else []
-            # Ubah untuk menampilkan nama hari yang lebih bagus
-            days_names = [list(WEEKDAY_MAP.keys())[list(WEEKDAY_MAP.values()).index(d)] for d in wds]
-            lines.append(f"{rid}. (weekly) {message} — {hour:02d}:{minute:02d} on {', '.join(days_names).title()}")
-    await ctx.send("🗒️ Daftar reminder:\n" + "\n".join(lines))
+    view = ReminderListView(ctx.author.id, ctx.guild.id, filters, total, user_tz(ctx.guild.id, ctx.author.id))
+    packed = await view.render()
+    for content, _ in packed[:-1]:
+        await ctx.send(content)
+    await ctx.send(packed[-1][0], view=view if total > LIST_PAGE_SIZE else None)
 
 @bot.command(name="edit")
 async def cmd_edit(ctx, rid: int, *, rest: str):
     if ctx.guild is None:
         await ctx.send("❌ Gunakan di server.")
         return
-    # get existing
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("SELECT id FROM reminders WHERE id = ? AND guild_id = ?", (rid, str(ctx.guild.id)))
-        row = await cur.fetchone()
-    if not row:
-        await ctx.send("❌ Reminder tidak ditemukan.")
-        return
-    # expect rest like: "10 Oktober 18:00 pesan baru" or "08:30,senin new msg"
-    
-    # PERBAIKAN: Logika parsing di sini terlalu kompleks. Kita panggil ulang parse_date_flexible
-    # untuk mendapatkan info waktu/hari, dan sisa stringnya diasumsikan sebagai pesan baru.
-    
-    # Kita pisahkan dulu waktu/tanggal dari pesan. Ini tricky karena pesan bisa ada angka.
-    # Asumsi: Waktu/Tanggal selalu di awal.
-    parser_input_full = rest
-    new_message = ""
-    parsed = parse_date_flexible(parser_input_full)
-
-    if parsed:
-        # Coba lagi: ambil pesan sisa. Karena parse_date_flexible hanya mengembalikan waktu/hari.
-        time_token, rest_after_time = extract_time(rest)
-
-        # Jika ada waktu, kita coba ambil pesan dari sisa setelah waktu dan hari/bulan
-        if time_token:
-            if parsed[0] == "one_time":
-                # Cari posisi terakhir tanggal/bulan
-                match = time_regex.search(rest)
-                cut_index = match.end() if match else 0
-                for month_name in MONTH_MAP.keys():
-                    idx = re.search(rf"\b{month_name}\b", rest, re.IGNORECASE)
-                    if idx:
-                        cut_index = max(cut_index, idx.end())
-                new_message = rest[cut_index:].strip()
-                
-            elif parsed[0] == "weekly":
-                # Sama seperti di cmd_rem, kita hapus token hari
-                weekdays_in_rest = [k for k in WEEKDAY_MAP.keys() if k in rest_after_time.lower()]
-                new_message = rest_after_time
-                for day in weekdays_in_rest:
-                    new_message = re.sub(r'\b'+day+r'\b', '', new_message, flags=re.IGNORECASE).strip()
-                new_message = new_message.strip().strip(",. ")
-            
-            if not new_message:
-                new_message = "(tanpa pesan)"
-        else:
-             # Tidak ada waktu/tanggal yang valid, mungkin user cuma mau ubah pesan?
-             # Tapi command edit ini harusnya selalu ubah waktu/pesan.
-             # Kita anggap seluruh rest adalah pesan baru jika parse_date_flexible gagal.
-             new_message = rest.strip()
-             parsed = None # Biar masuk ke error
+    await ctx.send(await edit_reminder(ctx.guild.id, ctx.author.id, rid, rest))
 
-    if not parsed:
-        await ctx.send("❌ Gagal mengenali format waktu/hari baru. Pastikan format: `ID <WAKTU/DATE> <PESAN>`")
+@bot.command(name="hapus", aliases=["del","delete","remove"])
+async def cmd_delete(ctx, rid: int):
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
         return
-        
-    # --- Update DB ---
-    
-    if parsed[0] == "one_time":
-        dt = parsed[1].replace(second=0, microsecond=0).isoformat()
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("UPDATE reminders SET dt_iso = ?, hour = NULL, minute = NULL, weekdays = NULL, repeat = 0, message = ? WHERE id = ?",
-                             (dt, new_message, rid))
-            await db.commit()
-        human = datetime.fromisoformat(dt).astimezone(TZ).strftime("%d %b %Y %H:%M")
-        await ctx.send(f"✏️ Reminder **{rid}** diperbarui ke **{human}** — {new_message}")
-    else:  # weekly
-        _, wds, h, m = parsed
-        wd_json = json.dumps(wds)
-        async with aiosqlite.connect(DB_FILE) as db:
-            await db.execute("UPDATE reminders SET dt_iso = NULL, hour = ?, minute = ?, weekdays = ?, repeat = 1, message = ? WHERE id = ?",
-                             (h, m, wd_json, new_message, rid))
-            await db.commit()
-        days_str = ", ".join(
-            [
-                list(WEEKDAY_MAP.keys())[list(WEEKDAY_MAP.values()).index(d)]
-                for d in wds
-            ]
-        ) if wds else "N/A"
-        await ctx.send(f"✏️ Reminder **{rid}** diperbarui ke weekly **{days_str.title()}** {h:02d}:{m:02d} — {new_message}")
+    await ctx.send(await delete_reminder(ctx.guild.id, ctx.author.id, rid))
+
+@bot.command(name="digest")
+async def cmd_digest(ctx, mode: str = None):
+    """rem!digest on|off — gabungkan reminder yang jatuh tempo bersamaan per channel."""
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
+        return
+    if mode is None:
+        state = "aktif" if get_guild_setting(ctx.guild.id, "digest") else "nonaktif"
+        await ctx.send(f"📦 Mode digest saat ini **{state}**. Ubah dengan `rem!digest on` / `rem!digest off`.")
+        return
+    if not ctx.author.guild_permissions.manage_guild:
+        await ctx.send("❌ Butuh izin **Manage Server** untuk mengubah mode digest.")
+        return
+    mode = mode.lower()
+    if mode not in ("on", "off"):
+        await ctx.send("❌ Gunakan `rem!digest on` atau `rem!digest off`.")
+        return
+    await set_guild_setting(ctx.guild.id, "digest", 1 if mode == "on" else 0)
+    if mode == "on":
+        await ctx.send("📦 Mode digest **aktif**: reminder di channel & menit yang sama dikirim dalam satu pesan.")
+    else:
+        await ctx.send("📦 Mode digest **nonaktif**: setiap reminder dikirim sebagai pesan sendiri.")
 
+LATE_POLICY_LABELS = {
+    "terlambat": "dikirim dengan tanda *terlambat*",
+    "digest": "digabung jadi satu pesan per channel",
+    "drop": "dibuang jika lebih tua dari {} menit, sisanya dikirim dengan tanda *terlambat*",
+}
 
-@bot.command(name="hapus", aliases=["del","delete","remove"])
-async def cmd_delete(ctx, rid: int):
+@bot.command(name="telat", aliases=["late"])
+async def cmd_late(ctx, mode: str = None, minutes: int = None):
+    """
+    rem!telat                  (lihat kebijakan reminder terlambat, mis. saat bot offline)
+    rem!telat terlambat        (kirim dengan tanda terlambat, bawaan)
+    rem!telat digest           (gabungkan jadi satu pesan per channel)
+    rem!telat drop <menit>     (buang yang terlambat lebih dari <menit>)
+    """
     if ctx.guild is None:
         await ctx.send("❌ Gunakan di server.")
         return
-    async with aiosqlite.connect(DB_FILE) as db:
-        cur = await db.execute("DELETE FROM reminders WHERE id = ? AND guild_id = ?", (rid, str(ctx.guild.id)))
-        # Cek apakah ada baris yang terhapus
-        rows_deleted = cur.rowcount
-        await db.commit()
-    if rows_deleted > 0:
-        await ctx.send(f"🗑️ Reminder **{rid}** berhasil dihapus.")
+    if mode is None:
+        policy = get_guild_setting(ctx.guild.id, "late_policy")
+        label = LATE_POLICY_LABELS[policy].format(get_guild_setting(ctx.guild.id, "late_max"))
+        await ctx.send(f"⏱️ Reminder yang terlambat saat ini **{label}**. Ubah dengan `rem!telat terlambat|digest|drop <menit>`.")
+        return
+    if not ctx.author.guild_permissions.manage_guild:
+        await ctx.send("❌ Butuh izin **Manage Server** untuk mengubah kebijakan reminder terlambat.")
+        return
+    mode = mode.lower()
+    if mode not in LATE_POLICIES or (mode == "drop") != (minutes is not None) or (minutes is not None and minutes < 1):
+        await ctx.send("❌ Gunakan `rem!telat terlambat`, `rem!telat digest`, atau `rem!telat drop <menit>` (contoh: `rem!telat drop 60`).")
+        return
+    await set_guild_setting(ctx.guild.id, "late_policy", mode)
+    await set_guild_setting(ctx.guild.id, "late_max", minutes)
+    await ctx.send(f"⏱️ Reminder yang terlambat sekarang **{LATE_POLICY_LABELS[mode].format(minutes)}**.")
+
+@bot.command(name="timezone", aliases=["tz", "zona"])
+async def cmd_timezone(ctx, *args: str):
+    """
+    rem!timezone                       (lihat zona waktu kamu & server)
+    rem!timezone Europe/London | WITA  (zona pribadi)   | rem!timezone reset
+    rem!timezone server Asia/Tokyo     (zona server, butuh Manage Server) | server reset
+    Reminder yang sudah ada tetap di zona saat dibuat.
+    """
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
+        return
+    guild_name = get_guild_setting(ctx.guild.id, "tz")
+    if not args:
+        mine = user_timezones.get(ctx.author.id)
+        source = "pribadi" if mine else "server" if guild_name else "bawaan"
+        current = user_tz(ctx.guild.id, ctx.author.id)
+        await ctx.send(f"🌏 Zona waktu kamu: **{current.zone}** ({source}), sekarang {format_dt(datetime.now(current), current)}.\n"
+                       f"Zona server: **{guild_name or TZ.zone}**. Ubah dengan `rem!timezone <Zona>` atau `rem!timezone server <Zona>`.")
+        return
+    for_guild = args[0].lower() == "server"
+    if for_guild:
+        args = args[1:]
+        if not ctx.author.guild_permissions.manage_guild:
+            await ctx.send("❌ Butuh izin **Manage Server** untuk mengubah zona waktu server.")
+            return
+    if len(args) != 1:
+        await ctx.send("❌ Contoh: `rem!timezone Asia/Makassar` atau `rem!timezone server Asia/Jakarta`.")
+        return
+    if args[0].lower() == "reset":
+        name = None
     else:
-        await ctx.send(f"❌ Reminder **{rid}** tidak ditemukan di server ini.")
+        name = lookup_timezone(args[0])
+        if name is None:
+            await ctx.send(f"❌ Zona waktu `{args[0]}` tidak dikenal. Pakai nama IANA seperti `Asia/Jakarta`, `Europe/London`, atau `WIB`/`WITA`/`WIT`.")
+            return
+    if for_guild:
+        await set_guild_setting(ctx.guild.id, "tz", name)
+        await ctx.send(f"🌏 Zona waktu server sekarang **{name or TZ.zone}**. Reminder yang sudah ada tidak berubah.")
+    else:
+        await set_user_timezone(ctx.author.id, name)
+        shown = name or guild_name or TZ.zone
+        await ctx.send(f"🌏 Zona waktu kamu sekarang **{shown}**{'' if name else ' (ikut server)'}. Reminder yang sudah ada tidak berubah.")
+
+@bot.command(name="import", aliases=["impor"])
+async def cmd_import(ctx):
+    """
+    rem!import   (lampirkan file .csv atau .ics)
+    CSV: header dengan kolom `when` (ISO atau format rem!rem), `message`, opsional `channel_id`, `tz`.
+    """
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
+        return
+    if not ctx.author.guild_permissions.manage_guild:
+        await ctx.send("❌ Butuh izin **Manage Server** untuk import reminder.")
+        return
+    refusal = rate_refusal(ctx.guild.id, ctx.author.id)
+    if refusal:
+        await ctx.send(refusal)
+        return
+    attachment = ctx.message.attachments[0] if ctx.message.attachments else None
+    name = attachment.filename.lower() if attachment else ""
+    if not name.endswith((".csv", ".ics")):
+        await ctx.send("❌ Lampirkan file `.csv` atau `.ics`, contoh: `rem!import` + file jadwal.csv")
+        return
+    with tempfile.TemporaryFile() as raw:
+        try:
+            await download_attachment(attachment, raw)
+        except (ValueError, aiohttp.ClientError) as e:
+            await ctx.send(f"❌ Gagal mengunduh file: {e}")
+            return
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        if name.endswith(".csv"):
+            records, convert = transfer.read_csv(text), csv_record_schedule
+        else:
+            records, convert = transfer.read_ics(text), ics_event_schedule
+        try:
+            added, failed, errors = await import_reminders(ctx.guild, ctx.channel.id, ctx.author.id, records, convert)
+        except (ValueError, csv.Error, UnicodeDecodeError) as e:
+            await ctx.send(f"❌ File tidak bisa dibaca, tidak ada yang diimport: {e}")
+            return
+        finally:
+            text.detach()
+    lines = [f"📥 Import selesai: **{added}** reminder ditambahkan, **{failed}** baris gagal."]
+    lines += errors
+    if failed > len(errors):
+        lines.append(f"… dan {failed - len(errors)} baris gagal lainnya.")
+    for content, _ in pack_lines(lines):
+        await ctx.send(content)
+
+@bot.command(name="export", aliases=["ekspor"])
+async def cmd_export(ctx, *args: str):
+    """rem!export [csv|ics] [mine|channel|once|weekly]"""
+    if ctx.guild is None:
+        await ctx.send("❌ Gunakan di server.")
+        return
+    fmt = "csv"
+    rest = []
+    for arg in args:
+        if arg.lower() in ("csv", "ics", "ical"):
+            fmt = "csv" if arg.lower() == "csv" else "ics"
+        else:
+            rest.append(arg)
+    filters = parse_list_filters(ctx, rest)
+    if filters is None:
+        await ctx.send("❌ Pakai: `rem!export [csv|ics] [mine|channel|once|weekly]`.")
+        return
+    refusal = rate_refusal(ctx.guild.id, ctx.author.id)
+    if refusal:
+        await ctx.send(refusal)
+        return
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as fh:
+        count = await export_reminders(ctx.guild.id, fmt, fh, **filters)
+        if not count:
+            await ctx.send("📭 Tidak ada reminder untuk diekspor.")
+            return
+        if fh.tell() > ctx.guild.filesize_limit:
+            await ctx.send("❌ File ekspor terlalu besar untuk Discord. Coba pakai filter, mis. `rem!export mine`.")
+            return
+        fh.seek(0)
+        await ctx.send(f"📤 {count} reminder diekspor.", file=discord.File(fh, filename=f"reminders-{ctx.guild.id}.{fmt}"))
+
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+profile_lock = asyncio.Lock()
+
+def profile_file(text, filename):
+    return discord.File(io.BytesIO(text if isinstance(text, bytes) else text.encode()), filename=filename)
+
+@bot.command(name="profile", aliases=["profil"])
+async def cmd_profile(ctx, mode: str = None, arg: str = None, sample: float = 1.0):
+    """
+    Owner only.
+    rem!profile                       status
+    rem!profile span [detik] [sampel] timing span command/DB/loop/send selama N detik
+    rem!profile laporan               span yang terkumpul sejauh ini (PROFILE_SAMPLE)
+    rem!profile cpu [detik]           cProfile selama N detik (.txt + .prof)
+    rem!profile mem [detik]           pertumbuhan memori (tracemalloc) selama N detik
+    rem!profile blok <ms>|off         peringatan kalau event loop macet > ms
+    """
+    if not await bot.is_owner(ctx.author):
+        await ctx.send("❌ Khusus owner bot.")
+        return
+    mode = (mode or "").lower()
+    if not mode:
+        window = f"aktif sejak {time.monotonic() - tracer.started:.0f} s lalu (sampel {tracer.sample:g})" if tracer.on else "mati"
+        blocks = f"> {watchdog.threshold * 1000:.0f} ms" if watchdog.on else "mati"
+        await ctx.send(f"🔬 Span: {window}\n🧱 Peringatan loop macet: {blocks}")
+        return
+    if mode == "laporan":
+        if not tracer.on:
+            await ctx.send("❌ Jendela span tetap mati (set PROFILE_SAMPLE). Untuk sekali rekam pakai `rem!profile span <detik>`.")
+            return
+        await ctx.send("🔬 Span sejauh ini:", file=profile_file(tracer.report(), "spans.txt"))
+        return
+    if mode in ("blok", "block"):
+        if arg is None or arg.lower() == "off":
+            watchdog.stop()
+            await ctx.send("🧱 Peringatan loop macet dimatikan.")
+            return
+        try:
+            ms = float(arg)
+        except ValueError:
+            ms = 0
+        if ms <= 0:
+            await ctx.send("❌ Pakai: `rem!profile blok <ms>` atau `rem!profile blok off`.")
+            return
+        watchdog.start(ms / 1000)
+        await ctx.send(f"🧱 Peringatan loop macet > **{ms:g} ms** aktif (stack dicetak ke log).")
+        return
+    if mode not in ("span", "cpu", "mem"):
+        await ctx.send("❌ Pakai: `rem!profile [span|laporan|cpu|mem|blok]`.")
+        return
+    try:
+        seconds = min(PROFILE_MAX_SECONDS, max(1, int(arg))) if arg else PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        await ctx.send("❌ Durasi harus angka (detik).")
+        return
+    if profile_lock.locked():
+        await ctx.send("⏳ Profil lain sedang berjalan.")
+        return
+    async with profile_lock:
+        await ctx.send(f"🔬 Merekam **{mode}** selama {seconds} detik…")
+        if mode == "span":
+            # its own window, so the always-on one (rem!profile laporan) keeps running
+            window = profiling.Tracer(tracer.names)
+            window.enable(sample=min(1.0, max(0.001, sample)))
+            try:
+                await asyncio.sleep(seconds)
+                report = window.report(f"spans {seconds} s")
+            finally:
+                window.disable()
+            await ctx.send("🔬 Selesai.", file=profile_file(report, "spans.txt"))
+        elif mode == "cpu":
+            text, raw = await profiling.capture_cpu(seconds)
+            await ctx.send("🔬 Selesai.", files=[profile_file(text, "cpu.txt"), profile_file(raw, "cpu.prof")])
+        else:
+            await ctx.send("🔬 Selesai.", file=profile_file(await profiling.capture_memory(seconds), "mem.txt"))
 
 @bot.command(name="bantuan", aliases=["help"])
 async def cmd_help(ctx):
@@ -546,40 +2002,205 @@ async def cmd_help(ctx):
             "   `rem!rem 08:30 minum air`\n"
             "   `rem!rem 10 Oktober 18:00 ulang tahun`\n"
             "   `rem!rem senin 08:00 olahraga`\n"
+            "**Berulang:**\n"
+            "   `rem!rem setiap hari 07:00 minum obat` / `setiap 2 hari 07:00`\n"
+            "   `rem!rem tiap 2 jam peregangan` / `tiap 30 menit` (min. 5 menit)\n"
+            "   `rem!rem tanggal 1 09:00 bayar tagihan` / `setiap 3 bulan tanggal 15 09:00`\n"
+            "   `rem!rem senin pertama 09:00 rapat` / `jumat terakhir 16:00`\n"
             "**Mengelola:**\n"
-            "`rem!list` (Lihat semua reminder)\n"
+            "`rem!list [mine|channel|once|weekly|ulang]` (Lihat reminder, per halaman)\n"
+            "`rem!cari <kata> [user:saya] [channel:ini] [jenis:weekly]` (Cari reminder dari isi pesannya)\n"
             "`rem!edit <ID> <WAKTU/DATE> <PESAN>` (Ubah reminder)\n"
-            "`rem!hapus <ID>` (Hapus reminder)\n")
+            "`rem!hapus <ID>` (Hapus reminder)\n"
+            "`rem!digest on|off` (Gabungkan reminder bersamaan per channel)\n"
+            "`rem!telat terlambat|digest|drop <menit>` (Reminder yang terlewat saat bot offline)\n"
+            "`rem!timezone [server] <Zona>` (Zona waktu pribadi/server, mis. `Europe/London`, `WITA`)\n"
+            "`rem!import` + file .csv/.ics (Import massal, butuh Manage Server)\n"
+            "`rem!export [csv|ics] [mine|channel|once|weekly|ulang]` (Unduh reminder)\n"
+            "**Slash:** `/rem`, `/edit`, `/hapus` (ID dan waktu muncul otomatis saat mengetik)\n")
+    if USER_MAX_ACTIVE or GUILD_MAX_ACTIVE:
+        teks += f"**Batas:** {USER_MAX_ACTIVE or '∞'} reminder per user, {GUILD_MAX_ACTIVE or '∞'} per server\n"
     await ctx.send(teks)
 
+# -----------------------
+# Slash commands
+# -----------------------
+# /rem, /edit and /hapus do what their rem! twins do. Their `id` and `waktu`
+# options autocomplete from reminder_index, the caller's own reminders held
+# in memory, so keystrokes are answered without a DB query; only a user's
+# first autocomplete loads their rows (one query on idx_reminders_user).
+AUTOCOMPLETE_LIMIT = 25      # Discord shows at most 25 choices
+AUTOCOMPLETE_TIMEOUT = 2.0   # Discord drops answers after 3 s
+CHOICE_NAME_LIMIT = 100
+WAKTU_EXAMPLES = ("08:30", "senin 08:00", "setiap hari 07:00", "tiap 2 jam", "tanggal 1 09:00", "senin pertama 09:00")
+APP_COMMANDS_KEY = "app_commands"
+
+def choice_name(text):
+    return text if len(text) <= CHOICE_NAME_LIMIT else text[:CHOICE_NAME_LIMIT - 1] + "…"
+
+def _soonest(item):
+    rid, entry = item
+    return entry.fire_at is None, entry.fire_at or 0, rid
+
+def id_choices(entries, current):
+    """Reminders whose id starts with, or whose message contains, what was typed; soonest first."""
+    needle = current.strip().casefold()
+    hits = [(rid, e) for rid, e in entries.items()
+            if not needle or str(rid).startswith(needle) or needle in e.message.casefold()]
+    return [app_commands.Choice(name=choice_name(f"{rid} · {e.message} — {e.schedule}"), value=rid)
+            for rid, e in heapq.nsmallest(AUTOCOMPLETE_LIMIT, hits, key=_soonest)]
+
+def waktu_choices(entries, current, first=None):
+    """Schedules the user already uses (`first` on top), then WAKTU_EXAMPLES, matching what was typed."""
+    needle = current.strip().casefold()
+    schedules = [e.schedule for _, e in sorted(entries.items(), key=_soonest)]
+    picked = [s for s in dict.fromkeys([*filter(None, [first]), *schedules, *WAKTU_EXAMPLES]) if needle in s.casefold()]
+    return [app_commands.Choice(name=choice_name(s), value=s[:CHOICE_NAME_LIMIT]) for s in picked[:AUTOCOMPLETE_LIMIT]]
+
+async def _autocomplete(interaction, choices):
+    """Run `choices(entries)` over the caller's index entries and time it, labelled by index state."""
+    t0 = time.perf_counter()
+    cold = reminder_index.peek(interaction.guild_id, interaction.user.id) is None
+    entries = await reminder_index.get(interaction.guild_id, interaction.user.id, timeout=AUTOCOMPLETE_TIMEOUT)
+    result = choices(entries or {})
+    AUTOCOMPLETE_SECONDS.observe(time.perf_counter() - t0, index="timeout" if entries is None else "load" if cold else "hit")
+    return result
+
+@bot.tree.command(name="rem", description="Buat reminder baru")
+@app_commands.guild_only()
+@app_commands.describe(waktu="Kapan, mis. 18 oktober 20:00, senin 08:00, setiap hari 07:00", pesan="Isi reminder")
+async def slash_rem(interaction: discord.Interaction, waktu: str, pesan: str = ""):
+    reply = await create_reminder(interaction.guild_id, interaction.channel_id, interaction.user.id, f"{waktu} {pesan}")
+    await interaction.response.send_message(reply)
+
+@bot.tree.command(name="edit", description="Ubah waktu/pesan reminder")
+@app_commands.guild_only()
+@app_commands.rename(rid="id")
+@app_commands.describe(rid="Reminder yang diubah", waktu="Waktu baru", pesan="Pesan baru (kosong = tetap)")
+async def slash_edit(interaction: discord.Interaction, rid: int, waktu: str, pesan: str = ""):
+    reply = await edit_reminder(interaction.guild_id, interaction.user.id, rid, f"{waktu} {pesan}")
+    await interaction.response.send_message(reply)
+
+@bot.tree.command(name="hapus", description="Hapus reminder")
+@app_commands.guild_only()
+@app_commands.rename(rid="id")
+@app_commands.describe(rid="Reminder yang dihapus")
+async def slash_hapus(interaction: discord.Interaction, rid: int):
+    await interaction.response.send_message(await delete_reminder(interaction.guild_id, interaction.user.id, rid))
+
+@slash_edit.autocomplete("rid")
+@slash_hapus.autocomplete("rid")
+async def reminder_id_autocomplete(interaction: discord.Interaction, current: str):
+    return await _autocomplete(interaction, lambda entries: id_choices(entries, current))
+
+@slash_rem.autocomplete("waktu")
+@slash_edit.autocomplete("waktu")
+async def waktu_autocomplete(interaction: discord.Interaction, current: str):
+    rid = getattr(interaction.namespace, "id", None)  # /edit: the reminder picked so far
+
+    def choices(entries):
+        entry = entries.get(rid) if isinstance(rid, int) else None
+        return waktu_choices(entries, current, entry.schedule if entry else None)
+
+    return await _autocomplete(interaction, choices)
+
+async def sync_app_commands():
+    """Push the slash commands to Discord only when they differ from the last sync (hash kept in bot_state)."""
+    payload = json.dumps([c.to_dict(bot.tree) for c in bot.tree.get_commands()], sort_keys=True)
+    digest = int(hashlib.sha1(payload.encode()).hexdigest()[:15], 16)
+    row = await storage.fetchone("SELECT value FROM bot_state WHERE key = ?", (APP_COMMANDS_KEY,))
+    if row and row[0] == digest:
+        return
+    await bot.tree.sync()
+    await storage.execute("""
+        INSERT INTO bot_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (APP_COMMANDS_KEY, digest))
+    print("✅ Slash command disinkronkan")
+
 # -----------------------
 # Startup
 # -----------------------
-@app.route("/")
-def home():
-    return "Bot is alive!"
+# Health + metrics run on the bot's own loop (aiohttp ships with discord.py),
+# no extra thread. /healthz is 503 until the gateway is ready, or when the
+# scheduler has not ticked for longer than its longest sleep.
+HEALTH_TICK_SLACK = 60
 
-def run_flask():
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+async def http_home(request):
+    return web.Response(text="Bot is alive!")
 
-def start_keep_alive():
-    Thread(target=run_flask, daemon=True).start()
+async def http_healthz(request):
+    now = time.time()
+    tick_age = now - scheduler.last_tick if scheduler.last_tick else None
+    ready = bot.is_ready() and not bot.is_closed()
+    ticking = tick_age is not None and tick_age <= MAX_SLEEP + HEALTH_TICK_SLACK
+    body = {
+        "gateway": "ready" if ready else "connecting",
+        "latency": round(bot.latency, 3) if ready else None,
+        "scheduler_last_tick": scheduler.last_tick,
+        "scheduler_tick_age": round(tick_age, 3) if tick_age is not None else None,
+        "dispatch_pending": dispatcher.pending,
+    }
+    return web.json_response(body, status=200 if ready and ticking else 503)
 
-@bot.event
-async def on_connect():
-    # init DB on connect (ensures file exists before tasks start)
-    await init_db()
+async def http_metrics(request):
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+async def start_http_server(port=PORT):
+    app = web.Application()
+    app.router.add_get("/", http_home)
+    app.router.add_get("/healthz", http_healthz)
+    app.router.add_get("/metrics", http_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    return runner
 
 @bot.event
 async def on_ready():
-    # start the check loop if not already running
-    if not check_reminders_loop.is_running():
-        check_reminders_loop.start()
+    # First ready: the scheduler loads fire times after now, and everything
+    # that came due while the bot was down is drained by recover_missed.
+    # Later on_ready calls (gateway reconnects) find the scheduler running;
+    # it kept firing meanwhile, sends go over REST, so there is nothing to
+    # recover.
+    if not scheduler.is_running():
+        now = int(time.time())
+        since = await load_watermark()
+        dispatcher.start()
+        scheduler.start(after=now)
+        bot.recovery_task = asyncio.create_task(recover_missed(since, now))
+        bot.watermark_task = asyncio.create_task(watermark_loop(bot.recovery_task))
+        bot.reconcile_task = asyncio.create_task(reconcile_loop())
+        bot.maintenance_task = asyncio.create_task(maintenance_loop())
+        if PROFILE_SAMPLE:
+            tracer.enable(sample=PROFILE_SAMPLE)
+        if LOOP_BLOCK_MS:
+            watchdog.start(LOOP_BLOCK_MS / 1000)
+        try:
+            await sync_app_commands()
+        except discord.DiscordException as e:
+            print(f"⚠️ Gagal sinkron slash command: {e}")
     print(f"✅ Bot siap sebagai {bot.user}")
 
-# start flask keep-alive and run bot
+@bot.event
+async def on_guild_remove(guild):
+    await park_guild(guild.id)
+
+@bot.event
+async def on_guild_join(guild):
+    await unpark_guild(guild.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    await delete_channel_reminders(channel.guild.id, channel.id)
+
+@bot.event
+async def on_raw_thread_delete(payload):
+    await delete_channel_reminders(payload.guild_id, payload.thread_id)
+
+# run bot (the DB and the HTTP server are started from setup_hook)
 if __name__ == "__main__":
-    start_keep_alive()
     if not TOKEN:
         print("❌ TOKEN tidak ditemukan. Pastikan env var 'reminder_bot' terpasang.")
     bot.run(TOKEN)
@@ -0,0 +1,279 @@
+# parsing.py
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from recurrence import DAILY, EVERY, MIN_EVERY_MINUTES, MONTHLY, MONTHLY_NTH, Rule
+
+# -----------------------
+# Month + weekday maps
+# -----------------------
+MONTH_MAP = {
+    # English full
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    # English abbr
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
+    "oct": 10, "nov": 11, "dec": 12,
+    # Indonesian full
+    "januari": 1, "februari": 2, "maret": 3, "april": 4, "mei": 5, "juni": 6,
+    "juli": 7, "agustus": 8, "september": 9, "oktober": 10, "november": 11, "desember": 12,
+    # Indonesian abbr variations
+    "janv":1, "okt": 10, "okt.": 10, "des": 12, "sept":9, "oktober":10, "okt":10, "okt.":10
+}
+
+WEEKDAY_MAP = {
+    "monday": 0, "mon": 0, "senin": 0,
+    "tuesday": 1, "tue": 1, "selasa": 1,
+    "wednesday": 2, "wed": 2, "rabu": 2,
+    "thursday": 3, "thu": 3, "kamis": 3,
+    "friday": 4, "fri": 4, "jumat": 4, "jum":4,
+    "saturday": 5, "sat": 5, "sabtu": 5,
+    "sunday": 6, "sun": 6, "minggu": 6
+}
+
+# -----------------------
+# Tokenizer
+# -----------------------
+def _alternation(words):
+    # longest first, so "sept" wins over "sep" and "okt." over "okt"
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+# Every schedule token in one precompiled alternation. Tokens are matched
+# one after another from the start of the text; the first token that is
+# not part of a schedule ends the scan and starts the message.
+TOKEN_RE = re.compile(rf"""
+      (?P<time>(?<!\d)(?P<h>\d{{1,2}})[:.](?P<mi>\d{{2}})(?!\d))
+    | (?P<date>(?<!\d)(?P<dd>\d{{1,2}})[/-](?P<mm>\d{{1,2}})(?:[/-](?P<yy>\d{{4}}))?(?!\d))
+    | (?P<month>\b(?:{_alternation(MONTH_MAP)})(?!\w))
+    | (?P<weekday>\b(?:{_alternation(WEEKDAY_MAP)})\b)
+    | (?P<num>(?<!\d)\d{{1,4}}(?!\d))
+    | (?P<sep>[\s,;]+)
+""", re.IGNORECASE | re.VERBOSE)
+
+TIME_RE = re.compile(r"(?<!\d)(\d{1,2})[:.](\d{2})(?!\d)")
+
+# -----------------------
+# Recurrence phrases
+# -----------------------
+_EACH = r"(?:setiap|tiap|every|each)\s+"
+_MONTHS = rf"(?:{_EACH}(?:(?P<months>\d{{1,2}})\s+)?(?:bulan|months?)\s+)"
+ORDINALS = {
+    "pertama": 1, "kedua": 2, "ketiga": 3, "keempat": 4, "terakhir": -1,
+    "ke-1": 1, "ke-2": 2, "ke-3": 3, "ke-4": 4, "ke1": 1, "ke2": 2, "ke3": 3, "ke4": 4,
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "last": -1,
+}
+
+# "tiap 2 jam", "setiap 30 menit"
+EVERY_RE = re.compile(rf"{_EACH}(?P<n>\d{{1,4}})\s*(?P<unit>jam|hours?|hrs?|menit|minutes?|mins?)(?!\w)", re.I)
+# "setiap hari 07:00", "tiap 2 hari 07:00", "harian 07:00"
+DAILY_RE = re.compile(rf"(?:{_EACH}(?:(?P<n>\d{{1,3}})\s+)?(?:hari|days?)|harian|daily)(?!\w)", re.I)
+# "tanggal 1 09:00", "setiap tanggal 15 08:00", "tiap 3 bulan tanggal 1 09:00"
+MONTHLY_RE = re.compile(rf"(?:{_MONTHS}|{_EACH})?(?:tanggal|tgl\.?)\s*(?P<day>\d{{1,2}})(?!\d)", re.I)
+# "senin pertama 09:00", "setiap jumat terakhir 16:00", "tiap 2 bulan senin ke-2 09:00"
+NTH_RE = re.compile(rf"(?:{_MONTHS}|{_EACH})?(?P<wd>{_alternation(WEEKDAY_MAP)})\s+(?P<ord>{_alternation(ORDINALS)})(?!\w)", re.I)
+EACH_RE = re.compile(_EACH, re.I)
+# the time after a recurrence phrase, optionally introduced by "jam"/"pukul"/"at"
+RULE_TIME_RE = re.compile(r"[\s,;]*(?:(?:jam|pukul|at)\s*)?(?<!\d)(\d{1,2})[:.](\d{2})(?!\d)", re.I)
+
+
+def _time_after(text, pos):
+    m = RULE_TIME_RE.match(text, pos)
+    if not m:
+        return None
+    return int(m.group(1)) % 24, int(m.group(2)) % 60, m.end()
+
+
+def _scan_rule(text):
+    """('rule', kind, hour, minute, weekday_mask, interval, month_day, nth, msg_start) or None."""
+    m = EVERY_RE.match(text)
+    if m:
+        n = int(m.group("n"))
+        minutes = n * 60 if m.group("unit").lower().startswith(("j", "h")) else n
+        return ("rule", EVERY, None, None, None, minutes, None, None, m.end())
+    for regex in (DAILY_RE, MONTHLY_RE, NTH_RE):
+        m = regex.match(text)
+        if not m:
+            continue
+        at = _time_after(text, m.end())
+        if at is None:
+            return None
+        h, mi, end = at
+        if regex is DAILY_RE:
+            return ("rule", DAILY, h, mi, None, int(m.group("n") or 1), None, None, end)
+        months = int(m.group("months") or 1)
+        if regex is MONTHLY_RE:
+            return ("rule", MONTHLY, h, mi, None, months, int(m.group("day")), None, end)
+        wd = WEEKDAY_MAP[m.group("wd").lower()]
+        return ("rule", MONTHLY_NTH, h, mi, 1 << wd, months, None, ORDINALS[m.group("ord").lower()], end)
+    return None
+
+_KINDS = ("time", "date", "month", "weekday", "num", "sep")
+
+
+def _tokens(text):
+    """(kind, match) for the leading run of schedule tokens, separators dropped."""
+    pos, out = 0, []
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            break
+        kind = next(k for k in _KINDS if m.group(k) is not None)
+        if kind != "sep":
+            out.append((kind, m))
+        pos = m.end()
+    return out
+
+
+@lru_cache(maxsize=2048)
+def scan(text):
+    """
+    Structural parse of `text`, independent of the current time (so it is
+    safe to cache). Returns None or a tuple whose last item is the index
+    where the message starts:
+      ('rule', kind, hour, minute, weekday_mask, interval, month_day, nth, msg_start)
+      ('weekly', (weekdays...), hour, minute, msg_start)
+      ('date', day, month, year|None, hour|None, minute|None, msg_start)
+      ('day', day, hour, minute, msg_start)
+      ('time', hour, minute, msg_start)
+    """
+    rule = _scan_rule(text)
+    if rule:
+        return rule
+    each = EACH_RE.match(text)
+    if each:
+        # "setiap <schedule>": weekdays stay weekly, a bare time is daily,
+        # a bare day of month is monthly; anything else is not a repeat
+        inner = scan(text[each.end():])
+        if not inner:
+            return None
+        off = each.end()
+        if inner[0] == "weekly":
+            return inner[:-1] + (inner[-1] + off,)
+        if inner[0] == "time":
+            return ("rule", DAILY, inner[1], inner[2], None, 1, None, None, inner[-1] + off)
+        if inner[0] == "day":
+            return ("rule", MONTHLY, inner[2], inner[3], None, 1, inner[1], None, inner[-1] + off)
+        return None
+    time_part = None
+    weekdays = []
+    day = month = year = None
+    loose_day = None        # bare number before the time: day of this month
+    used = set()            # number tokens already taken as the day of a month
+    end = 0                 # end of the last token that was used
+    toks = _tokens(text)
+    for i, (kind, m) in enumerate(toks):
+        nxt = toks[i + 1][0] if i + 1 < len(toks) else None
+        if kind == "time":
+            if time_part:
+                break
+            time_part = (int(m.group("h")) % 24, int(m.group("mi")) % 60)
+        elif kind == "weekday":
+            weekdays.append(WEEKDAY_MAP[m.group().lower()])
+        elif kind == "date":
+            if month:
+                break
+            day, month = int(m.group("dd")), int(m.group("mm"))
+            year = int(m.group("yy")) if m.group("yy") else None
+        elif kind == "month":
+            if month:
+                break
+            # day right before (already read as a loose number) or right after
+            if loose_day is not None and toks[i - 1][0] == "num":
+                day, loose_day = loose_day, None
+            elif nxt == "num" and len(toks[i + 1][1].group()) <= 2:
+                day = int(toks[i + 1][1].group())
+                used.add(i + 1)
+            else:
+                break
+            month = MONTH_MAP[m.group().lower()]
+        elif kind == "num":
+            value = m.group()
+            if i in used:
+                pass
+            elif month and year is None and len(value) == 4:
+                year = int(value)
+            elif not month and loose_day is None and len(value) <= 2 and (not time_part or nxt == "month"):
+                loose_day = int(value)
+            else:
+                break
+        end = m.end()
+
+    if weekdays:
+        if not time_part:
+            return None  # need a time with weekday
+        return ("weekly", tuple(dict.fromkeys(weekdays)), time_part[0], time_part[1], end)
+    if month:
+        h, mi = time_part if time_part else (None, None)
+        return ("date", day, month, year, h, mi, end)
+    if time_part and loose_day is not None:
+        return ("day", loose_day, time_part[0], time_part[1], end)
+    if time_part:
+        return ("time", time_part[0], time_part[1], end)
+    # nothing usable up front: a time anywhere, message is what follows it
+    m = TIME_RE.search(text)
+    if m:
+        return ("time", int(m.group(1)) % 24, int(m.group(2)) % 60, m.end())
+    return None
+
+
+def _resolve(struct, tz, now):
+    kind = struct[0]
+    if kind == "rule":
+        rule = Rule(*struct[1:-1])
+        if rule.interval < 1 or rule.kind == EVERY and rule.interval < MIN_EVERY_MINUTES:
+            return None
+        if rule.kind == MONTHLY and not 1 <= rule.month_day <= 31:
+            return None
+        return ("recurring", rule)
+    if kind == "weekly":
+        _, wds, h, mi, _ = struct
+        return ("weekly", list(wds), h, mi)
+    try:
+        if kind == "date":
+            _, day, month, year, h, mi, _ = struct
+            h, mi = (h, mi) if h is not None else (0, 0)
+            dt = tz.localize(datetime(year or now.year, month, day, h, mi))
+            if dt < now and year is None:
+                dt = tz.localize(datetime(now.year + 1, month, day, h, mi))
+        elif kind == "day":
+            _, day, h, mi, _ = struct
+            dt = tz.localize(datetime(now.year, now.month, day, h, mi))
+            if dt < now:
+                nxt = (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+                dt = tz.localize(datetime(nxt.year, nxt.month, day, h, mi))
+        else:
+            _, h, mi, _ = struct
+            dt = tz.localize(datetime(now.year, now.month, now.day, h, mi))
+            if dt < now:
+                tomorrow = now.date() + timedelta(days=1)
+                dt = tz.localize(datetime(tomorrow.year, tomorrow.month, tomorrow.day, h, mi))
+    except ValueError:
+        return None  # e.g. 31 Februari
+    return ("one_time", dt)
+
+
+def parse_reminder(text, tz, now=None):
+    """
+    Parse "<WAKTU/DATE> <PESAN>" in one pass. Returns (parsed, message):
+      - ('one_time', dt) with tz-aware datetime in `tz`
+      - ('weekly', [weekday_ints], hour, minute)
+      - ('recurring', recurrence.Rule) for daily / every-N / monthly rules
+      - None on fail
+    Acceptable input examples:
+      "10 Oktober 17:00", "Oktober 10 17:00", "17:00 10/10", "senin 17:00", "senin,rabu 08:30",
+      "setiap hari 07:00", "tiap 2 jam", "tanggal 1 09:00", "senin pertama 09:00"
+    """
+    text = text.strip()
+    struct = scan(text)
+    if struct is None:
+        return None, text
+    now = now or datetime.now(tz)
+    parsed = _resolve(struct, tz, now)
+    message = text[struct[-1]:].strip()
+    return parsed, message
+
+
+def parse_date_flexible(text, tz, now=None):
+    """Schedule part of parse_reminder only."""
+    return parse_reminder(text, tz, now)[0]
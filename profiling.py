@@ -0,0 +1,196 @@
+# profiling.py
+import asyncio
+import cProfile
+import io
+import linecache
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+import metrics
+
+# On-demand diagnostics for rem!profile: sampled timing spans, cProfile and
+# tracemalloc captures, and an event-loop block watchdog. All of it is off
+# by default; the only cost left in the hot path then is one `is None`
+# check in metrics.Histogram.observe.
+
+SPAN_SAMPLES = 10000  # durations kept per span name for percentiles
+
+# Tracers that are on; metrics.observer is _fan_out while there are any,
+# so an on-demand window can run next to the always-on one.
+_active = []
+
+
+def _fan_out(name, labels, value):
+    for tracer in _active:
+        tracer._observe(name, labels, value)
+
+
+class Tracer:
+    """
+    Spans are the run times the /metrics histograms already observe (DB
+    helpers, commands, loop iterations, sends), so tracing adds no wrappers:
+    while on, it hooks metrics.observer and keeps a `sample` share of the
+    observations of the histograms named in `names`, keyed by histogram and
+    labels. Each tracer has its own window; several can be on at once.
+    """
+
+    def __init__(self, names):
+        self.names = set(names)
+        self.sample = 1.0
+        self.started = None
+        self._spans = {}  # (histogram, labels) -> [count, total, max, [durations]]
+        self._timer = None
+
+    @property
+    def on(self):
+        return self.started is not None
+
+    def enable(self, seconds=None, sample=1.0):
+        """Start a fresh window; it ends by itself after `seconds` (None = until disable())."""
+        self.disable()
+        self.sample = sample
+        self._spans = {}
+        self.started = time.monotonic()
+        _active.append(self)
+        metrics.observer = _fan_out
+        if seconds:
+            self._timer = asyncio.get_running_loop().call_later(seconds, self.disable)
+
+    def disable(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self in _active:
+            _active.remove(self)
+        if not _active and metrics.observer is _fan_out:
+            metrics.observer = None
+        self.started = None
+
+    def _observe(self, name, labels, value):
+        if name not in self.names or (self.sample < 1.0 and random.random() >= self.sample):
+            return
+        span = self._spans.get((name, labels))
+        if span is None:
+            span = self._spans[name, labels] = [0, 0.0, 0.0, []]
+        span[0] += 1
+        span[1] += value
+        span[2] = max(span[2], value)
+        if len(span[3]) < SPAN_SAMPLES:
+            span[3].append(value)
+
+    def report(self, title="spans"):
+        """Text table of the current window, most total time first."""
+        lines = [f"# {title}: sample {self.sample:g}, {len(self._spans)} span names",
+                 f"{'span':<60} {'n':>8} {'total ms':>10} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8}"]
+        for (name, labels), (count, total, peak, durations) in sorted(self._spans.items(), key=lambda kv: -kv[1][1]):
+            durations = sorted(durations)
+            pct = lambda p: durations[min(len(durations) - 1, int(p * len(durations)))] * 1000
+            label = name.removeprefix("reminder_").removesuffix("_seconds") + ("{" + ",".join(map(str, labels)) + "}" if labels else "")
+            lines.append(f"{label[:60]:<60} {count:>8} {total * 1000:>10.1f} {total / count * 1000:>8.2f} "
+                         f"{pct(0.5):>8.2f} {pct(0.99):>8.2f} {peak * 1000:>8.2f}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopWatchdog:
+    """
+    Warns when the event loop is blocked for longer than `threshold`
+    seconds. A heartbeat task stamps the time every threshold / 4; a daemon
+    thread notices a stale stamp and prints the loop thread's stack, which
+    points at the blocking call. Each stall is reported once.
+    """
+
+    def __init__(self, on_block=None):
+        self.threshold = None
+        self.on_block = on_block   # fn(seconds blocked) when a stall ends
+        self._beat = 0.0
+        self._task = None
+        self._stop = None
+        self._loop_thread = None
+
+    @property
+    def on(self):
+        return self._task is not None
+
+    def start(self, threshold):
+        self.stop()
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop = threading.Event()
+        threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    async def _heartbeat(self):
+        interval = self.threshold / 4
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(interval)
+            self._beat = now = time.monotonic()
+            late = now - before - interval
+            if late > self.threshold and self.on_block:
+                self.on_block(late)
+
+    def _watch(self, stop):
+        reported = None
+        while not stop.wait(self.threshold / 2):
+            beat = self._beat
+            if time.monotonic() - beat <= self.threshold or reported == beat:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(stack tidak tersedia)\n"
+            print(f"⚠️ Event loop terblokir > {self.threshold * 1000:.0f} ms, di:\n{stack}", end="")
+
+
+async def capture_cpu(seconds):
+    """cProfile of everything the loop thread runs for `seconds`; returns (text report, .prof bytes)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats("cumulative").print_stats(60)
+    stats.sort_stats("tottime").print_stats(30)
+    profiler.create_stats()  # .prof is what Profile.dump_stats writes, for snakeviz & co.
+    return text.getvalue(), marshal.dumps(profiler.stats)
+
+
+async def capture_memory(seconds, top=30):
+    """tracemalloc growth over `seconds`, by source line; returns a text report."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(10)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    skip = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__)]
+    diff = after.filter_traces(skip).compare_to(before.filter_traces(skip), "lineno")
+    lines = [f"# tracemalloc {seconds:g} s: traced {current / 2**20:.1f} MiB now, peak {peak / 2**20:.1f} MiB",
+             f"# top {top} by growth (size diff, count diff, line)"]
+    lines += [str(stat) for stat in diff[:top]]
+    biggest = after.filter_traces(skip).statistics("lineno")[:top]
+    lines.append(f"\n# top {top} by size at the end")
+    lines += [str(stat) for stat in biggest]
+    return "\n".join(lines) + "\n"
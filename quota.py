@@ -0,0 +1,94 @@
+# quota.py
+import collections
+import time
+
+# Idle buckets are refilled to full and dropped every SWEEP_EVERY takes, so
+# memory follows the number of recently active keys, not all keys ever seen.
+SWEEP_EVERY = 1000
+
+
+class RateLimiter:
+    """
+    One token bucket per key: `burst` tokens, refilled at `rate` tokens per
+    second. rate=0 disables the limiter. Only (tokens, stamp) is kept per
+    key, and a bucket that would be full again is simply forgotten.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._buckets = {}  # key -> (tokens, stamp)
+        self._takes = 0
+
+    def _level(self, key, now):
+        tokens, stamp = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - stamp) * self.rate)
+
+    def wait(self, key, n=1):
+        """Seconds until `n` tokens are there for `key` (0.0 = now); takes nothing."""
+        if not self.rate:
+            return 0.0
+        missing = n - self._level(key, self.clock())
+        return max(0.0, missing / self.rate)
+
+    def take(self, key, n=1):
+        """Take `n` tokens, even into debt; callers check wait() first."""
+        if not self.rate:
+            return
+        now = self.clock()
+        self._buckets[key] = (self._level(key, now) - n, now)
+        self._takes += 1
+        if self._takes >= SWEEP_EVERY:
+            self._takes = 0
+            self._buckets = {k: v for k, v in self._buckets.items() if self._level(k, now) < self.burst}
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ActiveCounts:
+    """
+    Stored reminders per guild and per (guild, user), kept in memory and
+    moved by the code that inserts and deletes rows, so cap checks never
+    run COUNT(*). load() replaces everything from one GROUP BY.
+    """
+
+    def __init__(self):
+        self.guilds = collections.Counter()
+        self.users = collections.Counter()
+
+    def load(self, rows):
+        """`rows` of (guild_id, user_id, count)."""
+        self.guilds.clear()
+        self.users.clear()
+        for guild_id, user_id, count in rows:
+            self.guilds[guild_id] += count
+            self.users[guild_id, user_id] = count
+
+    def add(self, guild_id, user_id, n=1):
+        self.guilds[guild_id] += n
+        self.users[guild_id, user_id] += n
+
+    def remove(self, guild_id, user_id, n=1):
+        for counter, key in ((self.guilds, guild_id), (self.users, (guild_id, user_id))):
+            left = counter[key] - n
+            if left > 0:
+                counter[key] = left
+            else:
+                del counter[key]
+
+    def room(self, guild_id, user_id, user_max, guild_max):
+        """
+        Rows the user may still add as (count, which limit binds: 'user' or
+        'guild'); a max of 0 means no limit, reported as room None.
+        """
+        rooms = []
+        if user_max:
+            rooms.append((user_max - self.users.get((guild_id, user_id), 0), "user"))
+        if guild_max:
+            rooms.append((guild_max - self.guilds.get(guild_id, 0), "guild"))
+        if not rooms:
+            return None, None
+        left, limit = min(rooms)
+        return max(0, left), limit
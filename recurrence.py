@@ -0,0 +1,132 @@
+# recurrence.py
+import calendar
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+# Values of reminders.repeat
+ONCE, WEEKLY, DAILY, EVERY, MONTHLY, MONTHLY_NTH = range(6)
+KINDS = (ONCE, WEEKLY, DAILY, EVERY, MONTHLY, MONTHLY_NTH)
+
+MIN_EVERY_MINUTES = 5
+DAY_NAMES = ("senin", "selasa", "rabu", "kamis", "jumat", "sabtu", "minggu")
+ORDINAL_NAMES = {1: "pertama", 2: "kedua", 3: "ketiga", 4: "keempat", -1: "terakhir"}
+MONTH_NAMES = ("januari", "februari", "maret", "april", "mei", "juni",
+               "juli", "agustus", "september", "oktober", "november", "desember")
+
+
+class Rule(NamedTuple):
+    """
+    A compact RRULE subset; which fields are used depends on `kind`:
+      WEEKLY       hour, minute, weekday_mask (bit d = weekday d, Mon=0)
+      DAILY        hour, minute, every `interval` days
+      EVERY        every `interval` minutes
+      MONTHLY      hour, minute, `month_day` every `interval` months
+      MONTHLY_NTH  hour, minute, `nth` (1-4, -1 = last) weekday of
+                   weekday_mask (one bit) every `interval` months
+    """
+    kind: int
+    hour: int = None
+    minute: int = None
+    weekday_mask: int = None
+    interval: int = 1
+    month_day: int = None
+    nth: int = None
+
+
+def _at(tz, day, hour, minute):
+    # is_dst=False: a wall time skipped by DST lands an hour later (02:30 ->
+    # 03:30), a repeated one fires once, at its second (standard time) instance
+    return tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+
+
+def _add_months(year, month, n):
+    m = month - 1 + n
+    return year + m // 12, m % 12 + 1
+
+
+def nth_weekday(year, month, weekday, nth):
+    """Day of month of the `nth` `weekday` (nth=-1: the last one), or None if there is none."""
+    first_wd, days = calendar.monthrange(year, month)
+    if nth > 0:
+        day = 1 + (weekday - first_wd) % 7 + 7 * (nth - 1)
+        return day if day <= days else None
+    last_wd = (first_wd + days - 1) % 7
+    return days - (last_wd - weekday) % 7
+
+
+def weekly(hour, minute, weekday_mask, after, tz):
+    """Next tz-aware datetime strictly after `after` on a day in `weekday_mask` at hour:minute."""
+    base = after.astimezone(tz)
+    wd = base.weekday()
+    if weekday_mask >> wd & 1:
+        today = _at(tz, base, hour, minute)
+        if today > base:
+            return today
+    # rotate so bit i means "i + 1 days from today", then take the lowest set bit
+    rot = ((weekday_mask >> (wd + 1)) | (weekday_mask << (6 - wd))) & 0x7F
+    if not rot:
+        return None
+    return _at(tz, base.date() + timedelta(days=(rot & -rot).bit_length()), hour, minute)
+
+
+def next_fire(rule, after, tz):
+    """
+    Next fire time strictly after `after` (tz-aware, in `tz`), or None when
+    the rule never fires again. Only the one next occurrence is computed;
+    for DAILY/MONTHLY* an `after` past today's slot counts as a fire, so
+    the next one is `interval` days/months later.
+    """
+    base = after.astimezone(tz)
+    kind, hour, minute = rule.kind, rule.hour, rule.minute
+    if kind == WEEKLY:
+        return weekly(hour, minute, rule.weekday_mask, base, tz)
+    if kind == EVERY:
+        return tz.normalize(base + timedelta(minutes=rule.interval)).replace(second=0, microsecond=0)
+    if kind == DAILY:
+        today = _at(tz, base, hour, minute)
+        if today > base:
+            return today
+        return _at(tz, base.date() + timedelta(days=rule.interval), hour, minute)
+    if kind in (MONTHLY, MONTHLY_NTH):
+        year, month = base.year, base.month
+        weekday = (rule.weekday_mask & -rule.weekday_mask).bit_length() - 1 if kind == MONTHLY_NTH else None
+        # a 5th/short-month day can be missing for a while; a year of steps always finds one
+        for _ in range(13):
+            if kind == MONTHLY:
+                day = min(rule.month_day, calendar.monthrange(year, month)[1])
+            else:
+                day = nth_weekday(year, month, weekday, rule.nth)
+            if day is not None:
+                fire = _at(tz, date(year, month, day), hour, minute)
+                if fire > base:
+                    return fire
+            year, month = _add_months(year, month, rule.interval)
+        return None
+    return None
+
+
+def describe_once(dt):
+    """'18 oktober 2026 20:00' for a one-time fire, in dt's own zone; parse_reminder reads it back."""
+    return f"{dt.day} {MONTH_NAMES[dt.month - 1]} {dt.year} {dt:%H:%M}"
+
+
+def describe(rule):
+    """Indonesian text for `rule`, in a form parse_reminder reads back."""
+    kind = rule.kind
+    hm = f"{rule.hour:02d}:{rule.minute:02d}" if rule.hour is not None else ""
+    months = f"setiap {rule.interval} bulan " if rule.interval > 1 else "setiap "
+    if kind == WEEKLY:
+        days = ",".join(DAY_NAMES[d] for d in range(7) if rule.weekday_mask >> d & 1)
+        return f"setiap {days} {hm}"
+    if kind == DAILY:
+        return f"setiap hari {hm}" if rule.interval == 1 else f"setiap {rule.interval} hari {hm}"
+    if kind == EVERY:
+        if rule.interval % 60 == 0:
+            return f"tiap {rule.interval // 60} jam"
+        return f"tiap {rule.interval} menit"
+    if kind == MONTHLY:
+        return f"{months}tanggal {rule.month_day} {hm}"
+    if kind == MONTHLY_NTH:
+        weekday = (rule.weekday_mask & -rule.weekday_mask).bit_length() - 1
+        return f"{months}{DAY_NAMES[weekday]} {ORDINAL_NAMES[rule.nth]} {hm}"
+    return ""
@@ -1,30 +1,25 @@
-import discord
-from discord.ext import commands, tasks
-import asyncio
-from datetime import datetime, timedelta
-
-reminders = {}
-
-@commands.command()
-async def remind(ctx, waktu: str, *, pesan: str):
-    """Contoh: rem! 17:00 olahraga atau !remind 08:30 drink water"""
-    try:
-        jam, menit = map(int, waktu.split(":"))
-        now = datetime.now()
-        target = now.replace(hour=jam, minute=menit, second=0, microsecond=0)
-
-        if target < now:
-            target += timedelta(days=1)
-
-        selisih = (target - now).total_seconds()
-
-        await ctx.send(f"✅ Reminder diset untuk {target.strftime('%H:%M')} - Pesan: '{pesan}'")
-
-        await asyncio.sleep(selisih)
-        await ctx.send(f"⏰ {ctx.author.mention} Reminder: {pesan}")
-
-    except ValueError:
-        await ctx.send("⚠️ Format salah! Gunakan `rem! HH:MM pesan`")
-
-async def setup(bot):
-    bot.add_command(remind)
+from discord.ext import commands
+
+# Tidak ada lagi asyncio.sleep per reminder di sini: command ini cuma
+# memvalidasi HH:MM lalu meneruskan ke command `rem` di main.py, yang
+# menyimpan ke DB dan mendaftarkannya di scheduler bersama. Jadi reminder
+# tetap jalan setelah restart, pakai TZ yang sama, dan memori tidak naik
+# seiring jumlah reminder yang menunggu.
+
+@commands.command()
+async def remind(ctx, waktu: str, *, pesan: str):
+    """Contoh: rem!remind 17:00 olahraga atau rem!remind 08:30 drink water"""
+    try:
+        jam, menit = map(int, waktu.split(":"))
+        if not (0 <= jam < 24 and 0 <= menit < 60):
+            raise ValueError
+    except ValueError:
+        await ctx.send("⚠️ Format salah! Gunakan `rem!remind HH:MM pesan`")
+        return
+
+    await ctx.invoke(ctx.bot.get_command("rem"), rest=f"{jam:02d}:{menit:02d} {pesan}")
+
+async def setup(bot):
+    if bot.get_command("rem") is None:
+        raise commands.ExtensionError("extension reminder butuh command `rem` dari main.py", name=__name__)
+    bot.add_command(remind)
@@ -0,0 +1,197 @@
+# scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+import traceback
+
+# Upper bound for a single sleep, so a wall-clock jump (NTP, suspend) can
+# only delay a wake-up by this much. Purely in-memory, no DB traffic.
+MAX_SLEEP = 300
+
+# Only reminders due within this many seconds are kept on the heap; the rest
+# stay in the DB and are pulled in by an indexed range query every
+# HORIZON / 2, so memory does not grow with the size of the table.
+HORIZON = 3600
+
+# When on_due raises, the popped batch goes back on the heap and the loop
+# waits this long before retrying, doubling up to MAX_RETRY_BACKOFF.
+RETRY_BACKOFF = 1
+MAX_RETRY_BACKOFF = 60
+
+
+class ReminderScheduler:
+    """
+    In-process min-heap of (fire_at, seq, rid), fire_at as UTC epoch seconds.
+
+    The current fire time of every reminder lives in `_entries`; edits and
+    cancels only update that dict, stale heap items are dropped lazily when
+    they reach the top. `on_due` is awaited with every (rid, fire_at) that is
+    due at wake-up, oldest first, so a stalled loop catches up in one batch.
+    If it raises, the batch is put back and retried after a backoff.
+
+    With a `loader`, the heap only covers fire times up to `loaded_until`.
+    `await loader(lo, hi)` must return (rid, fire_at) pairs with
+    lo < fire_at <= hi (lo is None on the first load, meaning "everything up
+    to hi", overdue rows included).
+    """
+
+    def __init__(self, on_due, loader=None, clock=time.time, horizon=HORIZON):
+        self.on_due = on_due
+        self.loader = loader
+        self.clock = clock
+        self.horizon = horizon
+        self.loaded_until = None if loader else float("inf")
+        self.last_tick = None
+        self.in_flight = None  # oldest fire time of the batch on_due is handling
+        self._refilling = None
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, rid):
+        return rid in self._entries
+
+    def schedule(self, rid, fire_at):
+        """Add `rid` or move it to a new fire time."""
+        if self._refilling is not None:
+            self._refilling.add(rid)
+        if self.loaded_until is None or fire_at > self.loaded_until:
+            # outside the window, the next refill picks it up from the DB
+            self.cancel(rid)
+            return
+        head = self.next_fire()
+        self._entries[rid] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._seq), rid))
+        self._maybe_compact()
+        if head is None or fire_at < head:
+            self._wakeup.set()
+
+    def cancel(self, rid):
+        if self._refilling is not None:
+            self._refilling.add(rid)
+        if self._entries.pop(rid, None) is not None:
+            self._maybe_compact()
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+        if self.loader:
+            self.loaded_until = None
+
+    def next_fire(self):
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now):
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            fire_at, _, rid = heapq.heappop(heap)
+            if self._entries.get(rid) != fire_at:
+                continue
+            del self._entries[rid]
+            due.append((rid, fire_at))
+        return due
+
+    def requeue(self, due):
+        """
+        Put popped (rid, fire_at) pairs back, e.g. after on_due failed. A
+        later fire time set for rid meanwhile (a recurring row's next one)
+        yields to the popped one, which is retried first.
+        """
+        for rid, fire_at in due:
+            current = self._entries.get(rid)
+            if current is None or fire_at < current:
+                self.schedule(rid, fire_at)
+
+    def _maybe_compact(self):
+        # too many stale items after lots of edits/cancels -> rebuild
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(t, next(self._seq), rid) for rid, t in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    async def refill(self):
+        """Extend the window to now + horizon with one range query."""
+        lo = self.loaded_until
+        hi = int(self.clock() + self.horizon)
+        # widen first so writes racing with the query are kept, and remember
+        # them so the (possibly older) rows read below don't overwrite them
+        self.loaded_until = hi
+        self._refilling = touched = set()
+        try:
+            rows = await self.loader(lo, hi)
+        except BaseException:
+            self.loaded_until = lo
+            raise
+        finally:
+            self._refilling = None
+        for rid, fire_at in rows:
+            if rid not in touched:
+                self.schedule(rid, fire_at)
+
+    # -----------------------
+    # Loop
+    # -----------------------
+    async def run(self):
+        backoff = RETRY_BACKOFF
+        while True:
+            now = self.clock()
+            self.last_tick = now
+            if self.loader and (self.loaded_until is None or now >= self.loaded_until - self.horizon / 2):
+                try:
+                    await self.refill()
+                except Exception:
+                    traceback.print_exc()
+                    await asyncio.sleep(5)
+                continue
+            due = self.pop_due(now)
+            if due:
+                self.in_flight = due[0][1]
+                try:
+                    await self.on_due(due)
+                    self.in_flight = None
+                    backoff = RETRY_BACKOFF
+                except Exception:
+                    traceback.print_exc()
+                    self.requeue(due)
+                    self.in_flight = None
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_RETRY_BACKOFF)
+                continue
+            self._wakeup.clear()
+            head = self.next_fire()
+            wake = self.loaded_until - self.horizon / 2 if self.loader else float("inf")
+            if head is not None:
+                wake = min(wake, head)
+            timeout = min(MAX_SLEEP, max(0.0, wake - self.clock()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, after=None):
+        """
+        Start the loop. With `after` (epoch) the first load only takes fire
+        times later than it; older ones are left to the caller (recovery).
+        """
+        if not self.is_running():
+            if after is not None and self.loader and self.loaded_until is None:
+                self.loaded_until = int(after)
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,270 @@
+# storage.py
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+# Applied to every connection. WAL lets readers run next to the writer,
+# synchronous=NORMAL is durable across app crashes in WAL mode and only
+# fsyncs on checkpoint, cache_size is in KiB when negative. auto_vacuum
+# only takes on a new file (before its first table); existing files are
+# converted once by use_incremental_vacuum().
+PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# sqlite3 keeps a per-connection LRU of compiled statements, so reusing the
+# same SQL text on a long-lived connection skips re-preparing it.
+STATEMENT_CACHE = 256
+
+# Group commit for write(): ops queued while a commit is running share the
+# next transaction (and its WAL sync), up to GROUP_MAX ops per commit. While
+# a burst lasts (last group had more than one op) the next group also waits
+# GROUP_WINDOW seconds to fill up; a lone write is committed right away.
+GROUP_WINDOW = 0.002
+GROUP_MAX = 256
+
+
+class Storage:
+    """
+    Long-lived SQLite connections: a small pool of readers and one writer.
+
+    Writes are serialized through `_write_lock`, so callers never see
+    SQLITE_BUSY from each other. Reads borrow a connection from the pool.
+
+    Several processes (one per shard range) may open the same file: every
+    write transaction starts with BEGIN IMMEDIATE, so the cross-process
+    write lock is taken up front and waits on busy_timeout instead of
+    failing halfway when a read snapshot can't be upgraded.
+    """
+
+    def __init__(self, path, readers=3, group_window=GROUP_WINDOW, group_max=GROUP_MAX):
+        self.path = path
+        self.readers = readers
+        self.group_window = group_window
+        self.group_max = group_max
+        self._writer = None
+        self._pool = None
+        self._all = []
+        self._write_lock = asyncio.Lock()
+        self._queued = []          # (sql or [(sql, params)], params, fetch, future) waiting for a group commit
+        self._group_full = asyncio.Event()
+        self._group_task = None
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def _connect(self):
+        db = await aiosqlite.connect(self.path, cached_statements=STATEMENT_CACHE)
+        for pragma in PRAGMAS:
+            await db.execute(pragma)
+        self._all.append(db)
+        return db
+
+    async def open(self):
+        if self.is_open:
+            return
+        self._writer = await self._connect()
+        self._pool = asyncio.Queue()
+        for _ in range(self.readers):
+            self._pool.put_nowait(await self._connect())
+
+    async def migrate(self, migrations):
+        """
+        Bring the schema up to len(migrations) using PRAGMA user_version.
+
+        `migrations[i]` is `async def step(db)` taking the DB from version i
+        to i + 1; each step runs in its own transaction together with the
+        version bump, so a failed step leaves the previous version intact.
+        The version is re-read under the write lock, so processes starting
+        together don't run a step twice.
+        """
+        for target, step in enumerate(migrations, start=1):
+            async with self.transaction() as db:
+                async with db.execute("PRAGMA user_version") as cur:
+                    (version,) = await cur.fetchone()
+                if version >= target:
+                    continue
+                await step(db)
+                await db.execute(f"PRAGMA user_version = {target}")
+        return len(migrations)
+
+    async def use_incremental_vacuum(self):
+        """
+        Switch an existing file to auto_vacuum=INCREMENTAL, which takes one
+        full VACUUM (it rewrites the file, so startup waits for it once).
+        Returns True when it ran.
+        """
+        async with self._write_lock:
+            async with self._writer.execute("PRAGMA auto_vacuum") as cur:
+                (mode,) = await cur.fetchone()
+            if mode == 2:
+                return False
+            await self._writer.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self._writer.execute("VACUUM")
+            return True
+
+    async def close(self):
+        if self._group_task is not None:
+            await self._group_task  # queued writes still get committed
+        conns, self._all = self._all, []
+        self._writer = None
+        self._pool = None
+        for db in conns:
+            await db.close()
+
+    # -----------------------
+    # Reads
+    # -----------------------
+    @asynccontextmanager
+    async def reader(self):
+        db = await self._pool.get()
+        try:
+            yield db
+        finally:
+            self._pool.put_nowait(db)
+
+    async def fetchone(self, sql, params=()):
+        async with self.reader() as db:
+            async with db.execute(sql, params) as cur:
+                return await cur.fetchone()
+
+    async def fetchall(self, sql, params=()):
+        async with self.reader() as db:
+            async with db.execute(sql, params) as cur:
+                return await cur.fetchall()
+
+    # -----------------------
+    # Writes
+    # -----------------------
+    @asynccontextmanager
+    async def transaction(self):
+        """Exclusive use of the writer; commits on success, rolls back on error."""
+        async with self._write_lock:
+            try:
+                # a cancel while BEGIN is in flight must still roll back
+                await self._writer.execute("BEGIN IMMEDIATE")
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+    async def execute(self, sql, params=()):
+        """Run one write statement in its own transaction, returns (lastrowid, rowcount)."""
+        async with self.transaction() as db:
+            async with db.execute(sql, params) as cur:
+                return cur.lastrowid, cur.rowcount
+
+    async def executemany(self, sql, seq):
+        async with self.transaction() as db:
+            await db.executemany(sql, seq)
+
+    async def incremental_vacuum(self, pages):
+        """
+        Give up to `pages` free pages back to the file system in one short
+        write transaction; returns (pages freed, free pages left).
+        """
+        async with self._write_lock:
+            async with self._writer.execute("PRAGMA freelist_count") as cur:
+                (free,) = await cur.fetchone()
+            # the pragma frees one page per step, and execute() steps a
+            # no-column statement only once; executescript runs it to the end
+            try:
+                await self._writer.executescript(f"BEGIN IMMEDIATE; PRAGMA incremental_vacuum({int(pages)}); COMMIT;")
+            except BaseException:
+                if self._writer.in_transaction:
+                    await self._writer.rollback()
+                raise
+            async with self._writer.execute("PRAGMA freelist_count") as cur:
+                (left,) = await cur.fetchone()
+        return free - left, left
+
+    # -----------------------
+    # Group commit
+    # -----------------------
+    async def write(self, sql, params=(), fetch=False):
+        """
+        Queue one write op for the next group commit; returns (lastrowid,
+        rowcount) once the transaction holding it has committed, or with
+        fetch=True the rows of its RETURNING clause.
+        `sql` may also be a list of (sql, params) run in order as one op;
+        the result is then the last statement's, and `params` is unused.
+        Each op runs under its own savepoint, so a failing statement only
+        fails its own caller, and undoes the rest of its op.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queued.append((sql, params, fetch, future))
+        if len(self._queued) >= self.group_max:
+            self._group_full.set()
+        if self._group_task is None:
+            self._group_task = asyncio.create_task(self._group_commit())
+        return await future
+
+    async def _group_commit(self):
+        burst = False
+        try:
+            while self._queued:
+                if burst and self.group_window and len(self._queued) < self.group_max:
+                    try:
+                        await asyncio.wait_for(self._group_full.wait(), self.group_window)
+                    except asyncio.TimeoutError:
+                        pass
+                self._group_full.clear()
+                batch, self._queued = self._queued[:self.group_max], self._queued[self.group_max:]
+                burst = len(batch) > 1
+                await self._commit_group(batch)
+        finally:
+            self._group_task = None
+
+    @staticmethod
+    async def _run(db, sql, params, fetch):
+        if not isinstance(sql, str):
+            *head, (sql, params) = sql
+            for head_sql, head_params in head:
+                async with db.execute(head_sql, head_params):
+                    pass
+        async with db.execute(sql, params) as cur:
+            if fetch:
+                return await cur.fetchall()
+            return cur.lastrowid, cur.rowcount
+
+    async def _commit_group(self, batch):
+        results = []
+        try:
+            async with self.transaction() as db:
+                if len(batch) == 1:
+                    # nothing to isolate from; an error rolls back and fails the caller
+                    sql, params, fetch, future = batch[0]
+                    results.append((future, await self._run(db, sql, params, fetch), None))
+                for sql, params, fetch, future in batch if len(batch) > 1 else ():
+                    await db.execute("SAVEPOINT op")
+                    try:
+                        results.append((future, await self._run(db, sql, params, fetch), None))
+                    except sqlite3.Error as e:
+                        await db.execute("ROLLBACK TO op")
+                        results.append((future, None, e))
+                    await db.execute("RELEASE op")
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            for *_, future in batch:
+                future.cancel()
+            raise
+        for future, value, error in results:
+            if future.done():
+                continue  # caller gave up waiting; the write itself stands
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(value)
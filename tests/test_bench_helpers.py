@@ -0,0 +1,32 @@
+# tests/test_bench_helpers.py
+import asyncio
+
+import main
+from bench.common import fresh_db
+from bench.stubs import FakeGateway
+
+
+def test_gateway_install_restores_get_guild():
+    original = main.bot.get_guild
+    with FakeGateway(missing={1}).install(main.bot) as gateway:
+        assert main.bot.get_guild(1) is None
+        assert main.bot.get_guild(2) is gateway.guilds[2]
+    assert main.bot.get_guild == original
+    assert "get_guild" not in vars(main.bot)
+
+
+def test_fresh_db_starts_empty_and_puts_main_back():
+    saved = main.storage, main.scheduler, main.dispatcher, main.reminder_index, main.active_counts
+    main.active_counts.add(1, 3)  # left over by an earlier run
+
+    async def body():
+        async with fresh_db():
+            return main.reminder_index, main.active_counts
+
+    try:
+        index, counts = asyncio.run(body())
+        assert index is not saved[3] and counts is not saved[4]
+        assert not counts.guilds and not counts.users
+        assert (main.storage, main.scheduler, main.dispatcher, main.reminder_index, main.active_counts) == saved
+    finally:
+        main.active_counts.remove(1, 3)
@@ -0,0 +1,60 @@
+# tests/test_migrations.py
+import asyncio
+from datetime import datetime
+
+import main
+import recurrence
+from storage import Storage
+
+
+async def v1_database(path):
+    storage = Storage(path)
+    await storage.open()
+    await storage.migrate(main.MIGRATIONS[:1])
+    await storage.executemany(
+        "INSERT INTO reminders (guild_id, channel_id, user_id, message, dt_iso, hour, minute, weekdays, repeat, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [("1", 2, 3, "sekali", "2030-01-01T08:00:00+07:00", None, None, None, 0, "2025-01-01T00:00:00+07:00"),
+         ("1", 2, 3, "senin rabu", None, 8, 30, "[0, 2]", 1, "2025-01-01T00:00:00+07:00")])
+    return storage
+
+
+def test_v1_rows_get_their_first_fire_time(tmp_path):
+    async def body():
+        storage = await v1_database(str(tmp_path / "reminders.db"))
+        try:
+            before = int(datetime.now(main.TZ).timestamp())
+            await storage.migrate(main.MIGRATIONS)
+            rows = await storage.fetchall("SELECT message, guild_id, weekday_mask, next_fire_utc FROM reminders ORDER BY id")
+            (version,) = await storage.fetchone("PRAGMA user_version")
+        finally:
+            await storage.close()
+        return before, rows, version
+
+    before, rows, version = asyncio.run(body())
+    assert version == len(main.MIGRATIONS)
+    once, weekly = rows
+    assert once == ("sekali", 1, None, int(datetime.fromisoformat("2030-01-01T08:00:00+07:00").timestamp()))
+    message, guild_id, mask, fire_at = weekly
+    assert (message, guild_id, mask) == ("senin rabu", 1, 0b101)
+    local = datetime.fromtimestamp(fire_at, main.TZ)
+    assert fire_at > before and local.weekday() in (0, 2) and (local.hour, local.minute) == (8, 30)
+    assert fire_at - before <= 7 * 86400
+
+
+def test_v13_keeps_fire_times_that_are_already_set(tmp_path):
+    async def body():
+        storage = Storage(str(tmp_path / "reminders.db"))
+        await storage.open()
+        try:
+            await storage.migrate(main.MIGRATIONS[:12])
+            ins = ("INSERT INTO reminders (guild_id, channel_id, user_id, message, hour, minute, weekday_mask, repeat, "
+                   "next_fire_utc, parked_at, created_at) VALUES (1, 2, 3, ?, 8, 0, 127, ?, ?, ?, '2025-01-01')")
+            await storage.executemany(ins, [("terjadwal", recurrence.WEEKLY, 2000000000, None),
+                                            ("diparkir", recurrence.WEEKLY, None, 1700000000)])
+            await storage.migrate(main.MIGRATIONS)
+            return await storage.fetchall("SELECT message, next_fire_utc FROM reminders ORDER BY id")
+        finally:
+            await storage.close()
+
+    assert asyncio.run(body()) == [("terjadwal", 2000000000), ("diparkir", None)]
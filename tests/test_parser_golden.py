@@ -0,0 +1,23 @@
+# tests/test_parser_golden.py
+import json
+
+import pytest
+
+import main
+from bench.bench_parser import GOLDEN_FILE, encode, golden_now
+from parsing import parse_date_flexible, parse_reminder
+
+with open(GOLDEN_FILE, encoding="utf-8") as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"] for case in CASES])
+def test_parse_reminder_matches_golden(case):
+    assert encode(*parse_reminder(case["text"], main.TZ, golden_now())) == case["expected"]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"] for case in CASES])
+def test_parse_date_flexible_matches_golden(case):
+    expected = case["expected"]
+    parsed = parse_date_flexible(case["text"], main.TZ, golden_now())
+    assert encode(parsed, expected and expected[-1]) == expected
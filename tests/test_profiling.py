@@ -0,0 +1,40 @@
+# tests/test_profiling.py
+import metrics
+import profiling
+
+NAME = "reminder_test_seconds"
+
+
+def spans(tracer):
+    return {labels: count for (_, labels), (count, *_rest) in tracer._spans.items()}
+
+
+def test_span_window_runs_next_to_the_always_on_one():
+    hist = metrics.Histogram(NAME, "test histogram", ("op",))
+    always, window = profiling.Tracer([NAME]), profiling.Tracer([NAME])
+    always.enable()
+    try:
+        hist.observe(0.01, op="a")
+        window.enable()
+        hist.observe(0.02, op="b")
+        window.disable()
+        hist.observe(0.03, op="c")
+        assert spans(window) == {("b",): 1}
+        # the on-demand window did not reset or stop the always-on one
+        assert always.on
+        assert spans(always) == {("a",): 1, ("b",): 1, ("c",): 1}
+    finally:
+        always.disable()
+    assert metrics.observer is None
+    hist.observe(0.04, op="d")
+    assert ("d",) not in spans(always)
+
+
+def test_observer_is_cleared_only_when_the_last_tracer_stops():
+    first, second = profiling.Tracer([NAME]), profiling.Tracer([NAME])
+    first.enable()
+    second.enable()
+    first.disable()
+    assert metrics.observer is not None
+    second.disable()
+    assert metrics.observer is None
@@ -0,0 +1,133 @@
+# tests/test_recovery.py
+import asyncio
+import time
+
+import pytest
+
+import dispatch
+import main
+from bench.common import fresh_db
+from bench.stubs import FakeGateway
+from dispatch import Dispatcher
+
+
+async def add_overdue(message, seconds_ago, weekly=False):
+    if weekly:
+        rid = await main.add_weekly(1, 2, 3, message, 8, 0, 0x7F)
+    else:
+        rid = await main.add_one_time(1, 2, 3, message, "2030-01-01T08:00:00+07:00")
+    fire_at = int(time.time()) - seconds_ago
+    await main.storage.execute("UPDATE reminders SET next_fire_utc = ? WHERE id = ?", (fire_at, rid))
+    return rid, fire_at
+
+
+@pytest.fixture
+def gateway():
+    with FakeGateway().install(main.bot) as gateway:
+        yield gateway
+
+
+def test_first_start_fires_only_the_recovery_slack(gateway):
+    async def body():
+        async with fresh_db() as storage:
+            old, _ = await add_overdue("setahun lalu", 365 * 86400)
+            old_weekly, _ = await add_overdue("mingguan lama", 2 * 365 * 86400, weekly=True)
+            recent, _ = await add_overdue("lima menit lalu", 300)
+            now = int(time.time())
+            main.scheduler.clear()
+            main.dispatcher.start()
+            main.scheduler.start(after=now)
+            try:
+                assert await main.recover_missed(None, now) == 3
+                await main.dispatcher.join()
+            finally:
+                main.scheduler.stop()
+                await main.dispatcher.close()
+            history = dict(await storage.fetchall("SELECT reminder_id, status FROM reminder_history"))
+            rows = await storage.fetchall("SELECT id, next_fire_utc > ? FROM reminders", (now,))
+        sent = [m for g in gateway.guilds.values() for ch in g.channels.values() for m in ch.sent]
+        return old, old_weekly, recent, history, rows, sent
+
+    old, old_weekly, recent, history, rows, sent = asyncio.run(body())
+    assert history == {old: "skipped", old_weekly: "skipped", recent: "sent"}
+    assert len(sent) == 1 and "lima menit lalu" in sent[0]
+    # the stale weekly row moved on instead of staying below the window
+    assert rows == [(old_weekly, 1)]
+
+
+def test_failed_ack_is_retried_and_the_watermark_moves_on(monkeypatch, gateway):
+    monkeypatch.setattr(dispatch, "ACK_BACKOFF", 0.01)
+
+    async def body():
+        async with fresh_db() as storage:
+            once, once_at = await add_overdue("sekali", 60)
+            weekly, weekly_at = await add_overdue("mingguan", 60, weekly=True)
+            calls, during = [], []
+
+            async def flaky_ack(batch):
+                calls.append(len(batch))
+                if len(calls) == 1:
+                    during.append(main.current_watermark())
+                    raise RuntimeError("database is locked")
+                await main.ack_deliveries(batch)
+
+            main.dispatcher = Dispatcher(flaky_ack, ack_interval=0.01)
+            main.dispatcher.start()
+            try:
+                await main.fire_due([(once, once_at), (weekly, weekly_at)])
+                await main.dispatcher.join()
+                for _ in range(100):
+                    if main.dispatcher.oldest_unacked() is None:
+                        break
+                    await asyncio.sleep(0.01)
+                after = main.current_watermark()
+            finally:
+                await main.dispatcher.close()
+            now = int(time.time())
+            rows = await storage.fetchall("SELECT id, next_fire_utc > ?, attempt_id FROM reminders", (now,))
+            history = await storage.fetchall("SELECT reminder_id, status FROM reminder_history ORDER BY reminder_id")
+        return once, weekly, min(once_at, weekly_at), calls, during, after, rows, history
+
+    once, weekly, fire_at, calls, during, after, rows, history = asyncio.run(body())
+    assert calls == [2, 2]  # the same batch, retried whole
+    assert during[0] < fire_at
+    assert after > fire_at
+    # one-time row deleted, weekly row advanced and unclaimed, one history row each
+    assert rows == [(weekly, 1, None)]
+    assert history == [(once, "sent"), (weekly, "sent")]
+
+
+def test_watermark_stays_below_the_batch_being_fired():
+    async def body():
+        async with fresh_db():
+            main.scheduler.in_flight = int(time.time()) - 600
+            try:
+                return main.scheduler.in_flight, main.current_watermark()
+            finally:
+                main.scheduler.in_flight = None
+
+    in_flight, watermark = asyncio.run(body())
+    assert watermark == in_flight - 1
+
+
+def test_an_entry_edited_after_the_pop_is_not_fired(gateway):
+    async def body():
+        async with fresh_db() as storage:
+            rid, fire_at = await add_overdue("diubah", 60)
+            moved = fire_at + 86400
+            # edited between the scheduler's pop and fire_due's read
+            await storage.execute("UPDATE reminders SET next_fire_utc = ? WHERE id = ?", (moved, rid))
+            main.dispatcher.start()
+            try:
+                await main.fire_due([(rid, fire_at)])
+                await main.dispatcher.join()
+            finally:
+                await main.dispatcher.close()
+            row = await storage.fetchone("SELECT next_fire_utc, attempt_id FROM reminders WHERE id = ?", (rid,))
+            history = await storage.fetchall("SELECT status FROM reminder_history")
+        sent = [m for g in gateway.guilds.values() for ch in g.channels.values() for m in ch.sent]
+        return moved, row, history, sent
+
+    moved, row, history, sent = asyncio.run(body())
+    assert sent == [] and history == []
+    assert row == (moved, None)
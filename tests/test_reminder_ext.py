@@ -0,0 +1,60 @@
+# tests/test_reminder_ext.py
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import main
+import reminder
+from bench.common import fresh_db
+from bench.stubs import fake_ctx
+
+
+@pytest.fixture
+def loaded():
+    # what load_extension("reminder") does, without the import machinery
+    async def body():
+        before = asyncio.all_tasks()
+        await reminder.setup(main.bot)
+        return asyncio.all_tasks() - before
+
+    new_tasks = asyncio.run(body())
+    try:
+        yield new_tasks
+    finally:
+        main.bot.remove_command("remind")
+
+
+def test_setup_only_registers_the_command(loaded):
+    assert loaded == set()
+    assert main.bot.get_command("remind") is reminder.remind
+
+
+def test_remind_stores_the_reminder_through_rem(loaded):
+    async def body():
+        async with fresh_db() as storage:
+            ctx = fake_ctx(main.bot, 1, 2, 3)
+            await reminder.remind.callback(ctx, "7:05", pesan="minum air")
+            rows = await storage.fetchall("SELECT guild_id, channel_id, user_id, message, next_fire_utc FROM reminders")
+            return ctx.replies, rows
+
+    replies, rows = asyncio.run(body())
+    assert len(replies) == 1 and replies[0].startswith("✅")
+    [(guild_id, channel_id, user_id, message, fire_at)] = rows
+    assert (guild_id, channel_id, user_id, message) == (1, 2, 3, "minum air")
+    local = datetime.fromtimestamp(fire_at, main.TZ)
+    assert (local.hour, local.minute) == (7, 5)
+
+
+@pytest.mark.parametrize("waktu", ["25:00", "08:60", "0830", "jam8", "8:30:00"])
+def test_remind_rejects_a_bad_time(loaded, waktu):
+    async def body():
+        async with fresh_db() as storage:
+            ctx = fake_ctx(main.bot, 1, 2, 3)
+            await reminder.remind.callback(ctx, waktu, pesan="minum air")
+            (count,) = await storage.fetchone("SELECT COUNT(*) FROM reminders")
+            return ctx.replies, count
+
+    replies, count = asyncio.run(body())
+    assert replies == ["⚠️ Format salah! Gunakan `rem!remind HH:MM pesan`"]
+    assert count == 0
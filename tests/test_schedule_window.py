@@ -0,0 +1,51 @@
+# tests/test_schedule_window.py
+import asyncio
+import time
+import tracemalloc
+
+import main
+from bench.common import Clock, fresh_db
+from bench.workload import Workload, seed
+from scheduler import HORIZON, ReminderScheduler
+
+ROWS = 100_000
+
+
+async def window_count(storage, lo, hi):
+    (count,) = await storage.fetchone("SELECT COUNT(*) FROM reminders WHERE next_fire_utc > ? AND next_fire_utc <= ?", (lo, hi))
+    return count
+
+
+def test_heap_holds_only_the_horizon_over_100k_rows():
+    async def body():
+        async with fresh_db() as storage:
+            now = int(time.time())
+            assert await seed(storage, Workload(ROWS, now, seed=7).rows()) == ROWS
+            clock = Clock(now)
+            s = ReminderScheduler(main.fire_due, loader=main.fetch_schedule_window, clock=clock)
+
+            tracemalloc.start()
+            try:
+                base = tracemalloc.get_traced_memory()[0]
+                await s.refill()
+                assert len(s) == await window_count(storage, now - 1, now + HORIZON)
+                largest = len(s)
+                # a day of ticks: fire what is due, slide the window on
+                for step in range(1, 49):
+                    clock.now = now + step * HORIZON // 2
+                    s.pop_due(clock.now)
+                    await s.refill()
+                    assert s.loaded_until == clock.now + HORIZON
+                    assert len(s) == await window_count(storage, clock.now, clock.now + HORIZON)
+                    assert len(s._heap) <= 2 * len(s) + 64
+                    largest = max(largest, len(s))
+                peak = tracemalloc.get_traced_memory()[1] - base
+            finally:
+                tracemalloc.stop()
+            return largest, peak
+
+    largest, peak = asyncio.run(body())
+    # the busiest hour of the day, not the table
+    assert 0 < largest < ROWS // 10
+    # (id, fire_at) pairs plus heap items for all 100k rows would be ~25 MB
+    assert peak < 5 * 1024 * 1024
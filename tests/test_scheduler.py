@@ -0,0 +1,192 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import ReminderScheduler
+
+
+class Clock:
+    """Fake time source: the scheduler only moves when the test sets `now`."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder:
+    """on_due that records each batch; `fail` makes the next n calls raise."""
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, due):
+        self.batches.append(list(due))
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("on_due failed")
+
+
+async def run_until(s, clock, now, settle=0.05):
+    """Move the fake clock to `now`, wake the loop and let it work."""
+    clock.now = now
+    s._wakeup.set()
+    await asyncio.sleep(settle)
+
+
+def test_pop_due_is_oldest_first_and_only_due():
+    s = ReminderScheduler(Recorder(), clock=Clock(1000))
+    for rid, at in ((1, 1300), (2, 1100), (3, 1200), (4, 1100), (5, 5000)):
+        s.schedule(rid, at)
+    assert s.next_fire() == 1100
+    assert s.pop_due(1250) == [(2, 1100), (4, 1100), (3, 1200)]
+    assert s.pop_due(1250) == []
+    assert s.pop_due(2000) == [(1, 1300)]
+    assert len(s) == 1 and 5 in s
+
+
+def test_edit_on_the_heap_moves_the_fire_time():
+    s = ReminderScheduler(Recorder(), clock=Clock(1000))
+    s.schedule(1, 1100)
+    s.schedule(2, 1200)
+    s.schedule(1, 1500)  # edited to later: the old heap item is stale
+    assert s.pop_due(1300) == [(2, 1200)]
+    s.schedule(3, 1800)
+    s.schedule(3, 1400)  # edited to earlier
+    assert s.next_fire() == 1400
+    assert s.pop_due(2000) == [(3, 1400), (1, 1500)]
+    assert len(s) == 0
+
+
+def test_cancel_on_the_heap_never_fires():
+    s = ReminderScheduler(Recorder(), clock=Clock(1000))
+    s.schedule(1, 1100)
+    s.schedule(2, 1100)
+    s.cancel(1)
+    s.cancel(99)  # unknown id is a no-op
+    assert s.pop_due(2000) == [(2, 1100)]
+
+
+def test_many_edits_keep_the_heap_compact():
+    s = ReminderScheduler(Recorder(), clock=Clock(0))
+    for i in range(1000):
+        s.schedule(1, 100 + i)
+    assert len(s) == 1
+    assert len(s._heap) <= 2 * len(s) + 64
+    assert s.pop_due(10_000) == [(1, 1099)]
+
+
+def test_loop_fires_in_order_as_the_clock_moves():
+    async def body():
+        clock, on_due = Clock(1000), Recorder()
+        s = ReminderScheduler(on_due, clock=clock)
+        s.schedule(1, 1020)
+        s.schedule(2, 1010)
+        s.start()
+        try:
+            await run_until(s, clock, 1005)
+            assert on_due.batches == []
+            await run_until(s, clock, 1010)
+            assert on_due.batches == [[(2, 1010)]]
+            await run_until(s, clock, 1020)
+            assert on_due.batches == [[(2, 1010)], [(1, 1020)]]
+        finally:
+            s.stop()
+
+    asyncio.run(body())
+
+
+def test_stalled_loop_catches_up_in_one_batch():
+    async def body():
+        clock, on_due = Clock(1000), Recorder()
+        s = ReminderScheduler(on_due, clock=clock)
+        for rid, at in ((1, 1030), (2, 1010), (3, 1020), (4, 9999)):
+            s.schedule(rid, at)
+        s.start()
+        try:
+            await asyncio.sleep(0.05)
+            # the loop was stuck (or the host suspended) past three fire times
+            await run_until(s, clock, 1100)
+            assert on_due.batches == [[(2, 1010), (3, 1020), (1, 1030)]]
+            assert s.next_fire() == 9999
+        finally:
+            s.stop()
+
+    asyncio.run(body())
+
+
+def test_failed_batch_is_requeued_and_retried(monkeypatch):
+    monkeypatch.setattr(scheduler, "RETRY_BACKOFF", 0.01)
+
+    async def body():
+        clock, on_due = Clock(1000), Recorder(fail=2)
+        s = ReminderScheduler(on_due, clock=clock)
+        s.schedule(1, 990)
+        s.schedule(2, 995)
+        s.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            s.stop()
+        assert on_due.batches == [[(1, 990), (2, 995)]] * 3
+        assert len(s) == 0 and s.in_flight is None
+
+    asyncio.run(body())
+
+
+def test_requeue_prefers_the_popped_fire_time():
+    s = ReminderScheduler(Recorder(), clock=Clock(1000))
+    s.schedule(1, 900)
+    due = s.pop_due(1000)
+    s.schedule(1, 1900)  # a recurring row's next occurrence, set while firing
+    s.requeue(due)
+    assert s.pop_due(1000) == [(1, 900)]
+
+
+def test_in_flight_covers_the_batch_being_handled():
+    async def body():
+        seen = []
+        s = None
+
+        async def on_due(due):
+            seen.append(s.in_flight)
+
+        s = ReminderScheduler(on_due, clock=Clock(1000))
+        s.schedule(1, 950)
+        s.schedule(2, 900)
+        s.start()
+        await asyncio.sleep(0.05)
+        s.stop()
+        assert seen == [900]
+        assert s.in_flight is None
+
+    asyncio.run(body())
+
+
+@pytest.mark.parametrize("after", [None, 1000])
+def test_start_after_skips_the_overdue_load(after):
+    async def body():
+        clock, on_due = Clock(1000), Recorder()
+
+        async def loader(lo, hi):
+            rows = [(1, 500), (2, 1500)]
+            return [(rid, at) for rid, at in rows if (lo is None or at > lo) and at <= hi]
+
+        s = ReminderScheduler(on_due, loader=loader, clock=clock)
+        s.start(after=after)
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            s.stop()
+        return on_due.batches, sorted(s._entries)
+
+    batches, entries = asyncio.run(body())
+    if after is None:
+        assert batches == [[(1, 500)]]
+    else:
+        assert batches == []
+    assert entries == [2]
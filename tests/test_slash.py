@@ -0,0 +1,147 @@
+# tests/test_slash.py
+import asyncio
+
+import main
+from bench.common import fresh_db
+from bench.stubs import fake_interaction
+
+GUILD, OTHER_GUILD, CHANNEL = 1, 2, 10
+OWNER, MEMBER = 5, 6
+
+
+def interaction(user_id=OWNER, guild_id=GUILD, **options):
+    return fake_interaction(main.bot, guild_id, CHANNEL, user_id, **options)
+
+
+async def slash_rem(user_id, waktu, pesan):
+    inter = interaction(user_id)
+    await main.slash_rem.callback(inter, waktu, pesan)
+    rid = await main.storage.fetchone("SELECT MAX(id) FROM reminders")
+    return rid[0], inter.replies[-1]
+
+
+async def stored_message(rid):
+    row = await main.storage.fetchone("SELECT message FROM reminders WHERE id = ?", (rid,))
+    return row[0] if row else None
+
+
+def run(body):
+    async def wrapped():
+        async with fresh_db():
+            await body()
+    asyncio.run(wrapped())
+
+
+def test_id_autocomplete_lists_only_the_callers_reminders():
+    async def body():
+        natal, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+        obat, _ = await slash_rem(OWNER, "setiap hari 07:00", "minum obat")
+        mine_later, _ = await slash_rem(OWNER, "1 januari 2031 09:00", "tahun baru")
+        await slash_rem(MEMBER, "setiap hari 08:00", "punya orang lain")
+
+        choices = await main.reminder_id_autocomplete(interaction(), "")
+        assert [c.value for c in choices] == [obat, natal, mine_later]  # soonest first
+        assert choices[1].name.startswith(f"{natal} · natal — ")
+
+        assert [c.value for c in await main.reminder_id_autocomplete(interaction(), "OBAT")] == [obat]
+        assert [c.value for c in await main.reminder_id_autocomplete(interaction(), str(natal))] == [natal]
+        member = await main.reminder_id_autocomplete(interaction(MEMBER), "")
+        assert [c.name.split(" · ")[1].split(" — ")[0] for c in member] == ["punya orang lain"]
+        assert await main.reminder_id_autocomplete(interaction(guild_id=OTHER_GUILD), "") == []
+
+    run(body)
+
+
+def test_waktu_autocomplete_suggests_the_picked_reminders_schedule_first():
+    async def body():
+        await slash_rem(OWNER, "setiap hari 07:00", "minum obat")
+        natal, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+        choices = await main.waktu_autocomplete(interaction(id=natal), "")
+        assert choices[0].value == "20 desember 2030 10:00"
+        assert "setiap hari 07:00" in [c.value for c in choices]
+        assert all("senin" in c.value for c in await main.waktu_autocomplete(interaction(), "senin"))
+
+    run(body)
+
+
+def test_index_follows_slash_edits_and_deletes():
+    async def body():
+        rid, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+        assert [c.value for c in await main.reminder_id_autocomplete(interaction(), "natal")] == [rid]
+        await main.slash_edit.callback(interaction(), rid, "21 desember 2030 10:00", "natal pindah")
+        assert [c.value for c in await main.reminder_id_autocomplete(interaction(), "pindah")] == [rid]
+        await main.slash_hapus.callback(interaction(), rid)
+        assert await main.reminder_id_autocomplete(interaction(), "") == []
+
+    run(body)
+
+
+def test_edit_with_empty_pesan_keeps_the_stored_message():
+    async def body():
+        rid, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+
+        # owner, nothing loaded in the index
+        inter = interaction()
+        await main.slash_edit.callback(inter, rid, "setiap hari 07:00", "")
+        assert inter.replies[-1].endswith("— natal")
+        assert await stored_message(rid) == "natal"
+        assert main.reminder_index.peek(GUILD, OWNER) is None
+
+        # someone else in the guild, whose index never held this row
+        inter = interaction(MEMBER)
+        await main.reminder_id_autocomplete(inter, "")
+        await main.slash_edit.callback(inter, rid, "senin 08:00", "")
+        assert await stored_message(rid) == "natal"
+
+        # the prefix command goes through the same path
+        ctx_reply = await main.edit_reminder(GUILD, OWNER, rid, "tanggal 1 09:00")
+        assert ctx_reply.endswith("— natal")
+        assert await stored_message(rid) == "natal"
+
+        inter = interaction()
+        await main.slash_edit.callback(inter, rid, "20 desember 2030 10:00", "natal kantor")
+        assert await stored_message(rid) == "natal kantor"
+
+    run(body)
+
+
+def test_edit_rejects_unknown_ids_and_bad_times():
+    async def body():
+        rid, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+        inter = interaction(guild_id=OTHER_GUILD)
+        await main.slash_edit.callback(inter, rid, "21 desember 2030 10:00", "")
+        assert inter.replies == ["❌ Reminder tidak ditemukan."]
+        inter = interaction()
+        await main.slash_edit.callback(inter, rid, "kapan-kapan", "")
+        assert inter.replies[-1].startswith("❌ Gagal mengenali format")
+        assert await stored_message(rid) == "natal"
+
+    run(body)
+
+
+def test_hapus_only_reaches_reminders_of_the_callers_guild():
+    async def body():
+        rid, _ = await slash_rem(OWNER, "20 desember 2030 10:00", "natal")
+
+        outsider = interaction(OWNER, guild_id=OTHER_GUILD)
+        await main.slash_hapus.callback(outsider, rid)
+        assert outsider.replies == [f"❌ Reminder **{rid}** tidak ditemukan di server ini."]
+        assert await stored_message(rid) == "natal"
+
+        inter = interaction()
+        await main.slash_hapus.callback(inter, rid)
+        assert inter.replies == [f"🗑️ Reminder **{rid}** berhasil dihapus."]
+        assert await stored_message(rid) is None
+        (status,) = await main.storage.fetchone("SELECT status FROM reminder_history WHERE reminder_id = ?", (rid,))
+        assert status == "cancelled"
+
+        again = interaction()
+        await main.slash_hapus.callback(again, rid)
+        assert again.replies == [f"❌ Reminder **{rid}** tidak ditemukan di server ini."]
+
+    run(body)
+
+
+def test_reminder_commands_are_guild_only():
+    for command in (main.slash_rem, main.slash_edit, main.slash_hapus):
+        assert command.guild_only
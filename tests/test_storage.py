@@ -0,0 +1,67 @@
+# tests/test_storage.py
+import asyncio
+import sqlite3
+
+import pytest
+
+from storage import Storage
+
+
+def with_storage(tmp_path, body):
+    async def run():
+        storage = Storage(str(tmp_path / "t.db"))
+        await storage.open()
+        try:
+            await storage.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT NOT NULL)")
+            await storage.execute("CREATE TABLE log (id INTEGER, v TEXT)")
+            return await body(storage)
+        finally:
+            await storage.close()
+    return asyncio.run(run())
+
+
+def test_multi_statement_write_returns_the_last_statements_rows(tmp_path):
+    async def body(storage):
+        await storage.execute("INSERT INTO t (id, v) VALUES (1, 'a')")
+        rows = await storage.write([
+            ("INSERT INTO log SELECT id, v FROM t WHERE id = ?", (1,)),
+            ("DELETE FROM t WHERE id = ? RETURNING v", (1,)),
+        ], fetch=True)
+        return rows, await storage.fetchall("SELECT * FROM log"), await storage.fetchall("SELECT * FROM t")
+
+    assert with_storage(tmp_path, body) == ([("a",)], [(1, "a")], [])
+
+
+def test_failing_multi_statement_op_is_undone_alone_in_a_group(tmp_path):
+    async def body(storage):
+        commits = []
+        commit = storage._commit_group
+
+        async def counting(batch):
+            commits.append(len(batch))
+            await commit(batch)
+
+        storage._commit_group = counting
+        ops = [
+            storage.write("INSERT INTO t (id, v) VALUES (1, 'a')"),
+            # the second statement fails: the log row must not stay behind
+            storage.write([("INSERT INTO log VALUES (2, 'x')", ()), ("INSERT INTO t (id, v) VALUES (2, NULL)", ())]),
+            storage.write([("INSERT INTO log VALUES (3, 'c')", ()), ("INSERT INTO t (id, v) VALUES (3, 'c')", ())]),
+        ]
+        results = await asyncio.gather(*ops, return_exceptions=True)
+        return commits, results, await storage.fetchall("SELECT id FROM t"), await storage.fetchall("SELECT id FROM log")
+
+    commits, results, t, log = with_storage(tmp_path, body)
+    assert commits == [3]  # one shared commit
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert t == [(1,), (3,)]
+    assert log == [(3,)]
+
+
+def test_single_failing_multi_statement_op_rolls_back(tmp_path):
+    async def body(storage):
+        with pytest.raises(sqlite3.IntegrityError):
+            await storage.write([("INSERT INTO log VALUES (1, 'x')", ()), ("INSERT INTO t (id, v) VALUES (1, NULL)", ())])
+        return await storage.fetchall("SELECT * FROM log")
+
+    assert with_storage(tmp_path, body) == []
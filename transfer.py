@@ -0,0 +1,226 @@
+# transfer.py
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytz
+
+# Row formats for rem!import / rem!export. Everything here streams: readers
+# take a text file object or an iterable of lines and yield one record at a
+# time, writers turn one batch of rows into one chunk of text.
+
+# -----------------------
+# CSV
+# -----------------------
+CSV_FIELDS = ("id", "type", "when", "message", "channel_id", "user_id", "tz")
+# accepted header names on import -> canonical field
+CSV_ALIASES = {
+    "when": "when", "waktu": "when", "jadwal": "when",
+    "message": "message", "pesan": "message",
+    "channel_id": "channel_id", "channel": "channel_id",
+    "tz": "tz", "timezone": "tz", "zona": "tz",
+}
+
+
+def read_csv(fh):
+    """Yield (line number, {"when", "message", "channel_id", "tz"}) per data row of a CSV with a header."""
+    reader = csv.reader(fh)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [CSV_ALIASES.get(h.strip().lower()) for h in header]
+    if "when" not in columns:
+        raise ValueError("header CSV harus punya kolom `when` (atau `waktu`)")
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        record = {"when": "", "message": "", "channel_id": "", "tz": ""}
+        for col, cell in zip(columns, row):
+            if col:
+                record[col] = cell.strip()
+        yield reader.line_num, record
+
+
+def csv_header():
+    buf = io.StringIO()
+    csv.writer(buf).writerow(CSV_FIELDS)
+    return buf.getvalue()
+
+
+def csv_chunk(records):
+    """`records` are dicts keyed by CSV_FIELDS."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rec in records:
+        writer.writerow([rec[f] for f in CSV_FIELDS])
+    return buf.getvalue()
+
+
+# -----------------------
+# iCalendar (RFC 5545 subset)
+# -----------------------
+ICS_DAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def ics_unescape(value):
+    out, i = [], 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value):
+            nxt = value[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def ics_escape(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _unfold(lines):
+    """Join RFC 5545 folded lines; yields (line number of the first physical line, line)."""
+    current, start = None, 0
+    for n, line in enumerate(lines, start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, n
+    if current is not None:
+        yield start, current
+
+
+def _property(line):
+    """'DTSTART;TZID=Asia/Jakarta:20250101T090000' -> ('DTSTART', {'TZID': ...}, '2025...')."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+
+def read_ics(lines):
+    """Yield (line number, {property name: (params, value)}) for every VEVENT."""
+    event = None
+    for n, line in _unfold(lines):
+        if not line:
+            continue
+        name, params, value = _property(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event, start = {}, n
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            yield start, event
+            event = None
+        elif event is not None and name not in event:
+            event[name] = (params, value)
+
+
+def parse_ics_datetime(params, value, default_tz):
+    """DTSTART value -> tz-aware datetime (UTC 'Z', TZID, floating or DATE)."""
+    value = value.strip()
+    if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+        naive = datetime.strptime(value[:8], "%Y%m%d")
+    else:
+        naive = datetime.strptime(value.rstrip("Zz")[:15], "%Y%m%dT%H%M%S")
+    if value.upper().endswith("Z"):
+        return pytz.utc.localize(naive)
+    tz = default_tz
+    if "TZID" in params:
+        try:
+            tz = pytz.timezone(params["TZID"].strip('"'))
+        except pytz.UnknownTimeZoneError:
+            raise ValueError(f"TZID tidak dikenal: {params['TZID']}")
+    return tz.localize(naive)
+
+
+def parse_rrule(value):
+    """'FREQ=WEEKLY;BYDAY=MO,WE' -> {'FREQ': 'WEEKLY', 'BYDAY': 'MO,WE'}."""
+    return {k.upper(): v for k, _, v in (part.partition("=") for part in value.split(";") if part)}
+
+
+def _offset(delta):
+    minutes = int(delta.total_seconds()) // 60
+    sign = "-" if minutes < 0 else "+"
+    return f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+
+
+def _observance(kind, local_start, before, after, name):
+    return [
+        f"BEGIN:{kind}",
+        f"DTSTART:{local_start.strftime('%Y%m%dT%H%M%S')}",
+        f"TZOFFSETFROM:{_offset(before)}",
+        f"TZOFFSETTO:{_offset(after)}",
+        f"TZNAME:{name}",
+        f"END:{kind}",
+    ]
+
+
+def ics_vtimezone(tz, now, years=10):
+    """
+    VTIMEZONE for a pytz zone, with one observance per offset change from a
+    year before `now` to `years` after (no RRULEs to get wrong), so DST
+    shifts of a weekly/monthly event come out right in calendar apps.
+    """
+    lo = now.astimezone(pytz.utc).replace(tzinfo=None) - timedelta(days=366)
+    hi = lo + timedelta(days=366 * (years + 1))
+    start = pytz.utc.localize(lo).astimezone(tz)  # offset in effect at `lo` opens the first observance
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tz.zone}"]
+    lines += _observance("DAYLIGHT" if start.dst() else "STANDARD", datetime(1970, 1, 1),
+                         start.utcoffset(), start.utcoffset(), start.tzname())
+    prev = start.utcoffset()
+    # pytz keeps every transition of a DST zone; fixed zones have none
+    for when, (offset, dst, name) in zip(getattr(tz, "_utc_transition_times", ()), getattr(tz, "_transition_info", ())):
+        if lo < when < hi and offset != prev:
+            lines += _observance("DAYLIGHT" if dst else "STANDARD", when + prev, prev, offset, name)
+        if when < hi:
+            prev = offset
+    lines.append("END:VTIMEZONE")
+    return lines
+
+
+def ics_header(zones, now):
+    """Calendar header with a VTIMEZONE for every pytz zone the events use."""
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//reminderbot//rem!export//ID",
+        "CALSCALE:GREGORIAN",
+    ]
+    for tz in zones:
+        lines += ics_vtimezone(tz, now)
+    return "\r\n".join(lines) + "\r\n"
+
+
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+
+def _fold(line):
+    # 75 octets per physical line; cut on characters, counting UTF-8 bytes
+    out, size, buf = [], 0, []
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            out.append("".join(buf))
+            buf, size = [" "], 1
+        buf.append(ch)
+        size += n
+    out.append("".join(buf))
+    return "\r\n".join(out)
+
+
+def ics_event(uid, stamp, start, tz, summary, rrule=None):
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{stamp.astimezone(pytz.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART;TZID={tz.zone}:{start.astimezone(tz).strftime('%Y%m%dT%H%M%S')}",
+        f"SUMMARY:{ics_escape(summary)}",
+    ]
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) + "\r\n" for line in lines)